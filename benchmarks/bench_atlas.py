@@ -0,0 +1,114 @@
+# coding: utf-8
+# Benchmark: atlas export of a site list vs rendering the sites one by one (what MapStudio
+# does today: snapshot, then geocode, then overlays, per site). render_map_snapshot and the
+# Apple geocoder are fakes with fixed latencies; some sites repeat a location with another
+# map type, so their addresses are shared. Reports sites/s, per-site latency, snapshot and
+# geocoder calls, and checks that the PDF's cross-reference table is consistent.
+#
+#   python benchmarks/bench_atlas.py --sites 30 --workers 1,2,4,8
+
+import os, re, sys, time, argparse, tempfile
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+if importlib.util.find_spec('ui') is None:   # outside Pythonista: use the stand-in modules
+    sys.path.insert(0, os.path.join(HERE, 'stubs'))
+import recon_pipeline as rp
+from recon_core import AtlasSite, percentiles
+
+SNAPSHOT_S = 0.3            # fake snapshot latency per call
+GEOCODE_S = 0.4             # fake Apple reverse-geocode latency per call
+PX = 1024
+LAT, LON, STEP_DEG = 30.33218, -81.65565, 0.01
+
+class _Fake(object):
+    def __init__(self, seconds, result):
+        self.seconds, self.result, self.calls = seconds, result, 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        time.sleep(self.seconds)
+        return self.result(*args, **kwargs)
+
+def _sites(n):
+    """n sites on a grid; every fifth repeats the previous location as a hybrid view."""
+    sites = []
+    for i in range(n):
+        if i % 5 == 4:
+            sites.append(sites[-1]._replace(map_type='hybrid', name=f'{sites[-1].name} (hybrid)'))
+            continue
+        k = len(sites)
+        sites.append(AtlasSite(LAT + (k // 6) * STEP_DEG, LON + (k % 6) * STEP_DEG, 800.0, 'satellite',
+                               15.0 * (k % 3), f'Site {k + 1}'))
+    return sites
+
+def _reset():
+    snaps = _Fake(SNAPSHOT_S, lambda lat, lon, **kw: rp.ui.Image(kw['img_width'], kw['img_height']))
+    geo = _Fake(GEOCODE_S, lambda loc: [dict(rp.location.__dict__.get('PLACEMARK', {}),
+                                             Thoroughfare=f'{loc["latitude"]:.3f} Road')])
+    rp.location.render_map_snapshot = snaps
+    rp._geocoder.apple_fn = geo
+    rp._snapshot_store = rp.SnapshotStore(root=None)
+    rp._geocode_store = rp.GeocodeStore(path=None)
+    for c in (rp._snapshot_cache, rp._rotation_cache, rp._overlay_cache, rp._composite_cache):
+        c.clear()
+    return snaps, geo
+
+def one_by_one(sites):
+    lat = []
+    t0 = time.perf_counter()
+    for s in sites:
+        t1 = time.perf_counter()
+        snap = rp.get_snapshot(s.lat, s.lon, s.meters, s.map_type, PX)
+        rotated = rp.rotate_image_fill_square(snap, s.rotation)
+        addr = rp.reverse_geocode_compact(s.lat, s.lon)
+        rp.draw_overlays(rotated, s.meters, s.map_type, s.lat, s.lon, rotation_deg=s.rotation,
+                         full_addr=addr).to_jpeg(rp.ATLAS_JPEG_QUALITY)
+        lat.append(time.perf_counter() - t1)
+    wall = time.perf_counter() - t0
+    return {'seconds': wall, 'sites_per_s': len(sites) / wall, 'latency': percentiles(lat)}
+
+def check_pdf(path):
+    """-> (objects, pages) after checking every xref offset and stream length."""
+    with open(path, 'rb') as f:
+        b = f.read()
+    start = int(re.search(rb'startxref\n(\d+)\n%%EOF\n$', b).group(1))
+    m = re.match(rb'xref\n0 (\d+)\n', b[start:])
+    n, table = int(m.group(1)), start + m.end()
+    for i in range(1, n):
+        off = int(b[table + 20 * i:table + 20 * i + 10])
+        if not b[off:].startswith(b'%d 0 obj\n' % i):
+            raise ValueError(f'xref entry {i} points at {b[off:off + 12]!r}')
+    for s in re.finditer(rb'/Length (\d+) >>\nstream\n', b):
+        if b[s.end() + int(s.group(1)):].startswith(b'\nendstream') is False:
+            raise ValueError('stream length mismatch')
+    return n, int(re.search(rb'/Type /Pages /Kids \[[^\]]*\] /Count (\d+)', b).group(1))
+
+def run(n, workers):
+    sites = _sites(n)
+    out = tempfile.mkdtemp()
+    print(f'{n} sites at {PX} px ({len({(s.lat, s.lon) for s in sites})} locations); fake snapshot '
+          f'{SNAPSHOT_S}s, fake geocode {GEOCODE_S}s; {rp.ATLAS_GRID[0]}x{rp.ATLAS_GRID[1]} per page')
+    print(f'  {"mode":<20}{"time s":>8}{"sites/s":>9}{"p50 ms":>8}{"p95 ms":>8}{"snapshots":>11}{"geocodes":>10}')
+    snaps, geo = _reset()
+    r = one_by_one(sites)
+    base = r['sites_per_s']
+    print(f'  {"one by one":<20}{r["seconds"]:>8.2f}{base:>9.2f}{r["latency"]["p50"] * 1e3:>8.0f}'
+          f'{r["latency"]["p95"] * 1e3:>8.0f}{snaps.calls:>11}{geo.calls:>10}')
+    for w in workers:
+        snaps, geo = _reset()
+        path = os.path.join(out, f'atlas{w}.pdf')
+        st = rp.export_atlas(sites, path, PX, title='bench', workers=w)
+        objs, pages = check_pdf(path)
+        lat = st['latency']
+        print(f'  {"atlas, " + str(w) + " worker(s)":<20}{st["seconds"]:>8.2f}{st["sites_per_s"]:>9.2f}'
+              f'{lat["p50"] * 1e3:>8.0f}{lat["p95"] * 1e3:>8.0f}{snaps.calls:>11}{geo.calls:>10}'
+              f'  {st["sites_per_s"] / base:.2f}x  {pages} pages, {objs} objects, failed {len(st["failed"])}')
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sites', type=int, default=30)
+    ap.add_argument('--workers', default='1,2,4,8')
+    args = ap.parse_args()
+    run(args.sites, [int(w) for w in args.workers.split(',')])
@@ -0,0 +1,67 @@
+# coding: utf-8
+# Benchmark: full compose (rotate + every overlay + chip) vs. the second-phase address update
+# at each quality preset. On screen the update is the chip layer alone (rendered, uncached,
+# into its own view over the composite); the full-size flatten of composite + chip happens
+# only for export and is measured separately. Timings mean something only in Pythonista:
+# the stand-in ui draws nothing. There the drawing-op counters give the pixel work instead:
+# pixels allocated in contexts and pixels blitted per call.
+
+import os, sys, time
+import importlib.util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if importlib.util.find_spec('ui') is None:   # outside Pythonista: use the stand-in modules
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs'))
+import recon_pipeline as rp
+from recon_core import QUALITY_PRESETS
+
+ADDR = '1234 Riverside Avenue\nJacksonville 32204, United States'
+
+def _clear():
+    for c in (rp._rotation_cache, rp._overlay_cache, rp._composite_cache):
+        c.clear()
+
+def _best(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+def run(lat=30.33218, lon=-81.65565, meters=800, map_type='satellite', rotation=30.0, repeat=5):
+    for name, px in QUALITY_PRESETS:
+        key = rp.snapshot_key(lat, lon, meters, map_type, px)
+        snap = rp.get_snapshot(lat, lon, meters, map_type, px)
+
+        def full():
+            _clear()
+            rotated = rp.rotate_image_fill_square(snap, rotation, cache_key=key)
+            rp.draw_overlays(rotated, meters, map_type, lat, lon, rotation_deg=rotation, full_addr=ADDR)
+
+        def update():
+            rp._overlay_cache.clear()
+            rp.address_chip_layer(*base.size, ADDR)
+
+        def flatten():
+            rp.flatten_layer(base, rp.address_chip_layer(*base.size, ADDR))
+
+        rotated = rp.rotate_image_fill_square(snap, rotation, cache_key=key)
+        base = rp.compose_overlays(rotated, meters, map_type, lat, lon, rotation_deg=rotation, cache_key=key)
+        t_full = _best(full, repeat)
+        t_chip = _best(update, repeat)
+        t_flat = _best(flatten, repeat)
+        print(f'{name:<9} {px:>5} px  full compose {t_full*1000:8.1f} ms   address update '
+              f'{t_chip*1000:7.1f} ms ({t_chip/t_full:.1%})   export flatten {t_flat*1000:7.1f} ms')
+        ops = getattr(rp.ui, 'OPS', None)
+        if ops is not None:
+            work = []
+            for fn in (full, update, flatten):
+                ops.clear(); fn()
+                work.append((ops['px_alloc'], ops['px_drawn']))
+            (fa, fd), (ua, ud), (xa, xd) = work
+            print(f'{"":<17}pixels allocated {fa / 1e6:6.2f} M vs {ua / 1e6:6.3f} M ({ua / fa:.1%})   '
+                  f'blitted {fd / 1e6:6.2f} M vs {ud / 1e6:6.3f} M ({ud / fd:.1%})   '
+                  f'export flatten {xa / 1e6:.2f} M / {xd / 1e6:.2f} M')
+
+if __name__ == '__main__':
+    run()
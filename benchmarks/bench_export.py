@@ -0,0 +1,139 @@
+# coding: utf-8
+# Benchmark: export encode time, file size and peak memory per format and quality preset.
+#   buffered-png   encode the whole file into memory, then write it (the old to_png() pattern)
+#   png-1 / png-6  Pillow streaming straight into the file at zlib level 1 / 6
+#   jpeg-90 / webp-90
+#   roundtrip-webp PNG-encode, decode, then WebP-encode (the app's old WebP path)
+# Then the app's own encode_image_file for the formats it encodes in Python (WebP and leveled
+# PNG), from the raw RGBA pixels of the image. Outside Pythonista the CoreGraphics readback
+# (ui_image_to_rgba) is replaced by a stand-in that fills the same w x h x 4 buffer; in
+# Pythonista the real one runs and the ImageIO formats are measured as well.
+# "py MB" is the tracemalloc peak (Python-side buffers such as encoded bytes); "rss MB" is
+# the peak resident set growth during the encode, which also counts Pillow's and zlib's own
+# buffers (Linux only).
+
+import ctypes, io, os, re, sys, tempfile, time, tracemalloc
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+if importlib.util.find_spec('ui') is None:   # outside Pythonista: use the stand-in modules
+    sys.path.insert(0, os.path.join(HERE, 'stubs'))
+from PIL import Image
+import recon_pipeline as rp
+from recon_core import QUALITY_PRESETS
+from recon_engine import BatchJob, HeadlessRenderer, PillowBackend, SyntheticSnapshotSource
+
+CASES = ('buffered-png', 'png-1', 'png-6', 'jpeg-90', 'webp-90', 'roundtrip-webp')
+APP_CASES = (('WebP', None), ('PNG', 1), ('PNG', 6))   # (format, png_level) encoded in Python
+
+def _composite(px):
+    r = HeadlessRenderer(SyntheticSnapshotSource(), PillowBackend())
+    return r.render(BatchJob(30.33218, -81.65565, 800.0, 'satellite', 30.0, px, 'bench',
+                             '1 Main St\nJacksonville, 32202\nUnited States'))
+
+def _encode(img, case, path):
+    if case == 'buffered-png':
+        buf = io.BytesIO(); img.save(buf, 'PNG', compress_level=6)
+        with open(path, 'wb') as f:
+            f.write(buf.getvalue())
+        return
+    if case == 'roundtrip-webp':
+        buf = io.BytesIO(); img.save(buf, 'PNG')
+        pil = Image.open(io.BytesIO(buf.getvalue())); pil.load()
+        pil.save(path, 'WEBP', quality=90)
+        return
+    fmt, level = case.split('-')
+    if fmt == 'png':
+        img.save(path, 'PNG', compress_level=int(level))
+    else:
+        PillowBackend().save(img, path, fmt, int(level))
+
+try:
+    _libc = ctypes.CDLL('libc.so.6')
+except OSError:
+    _libc = None
+
+def _rss_kb(field):
+    try:
+        with open('/proc/self/status') as f:
+            return int(re.search(field + r':\s+(\d+)', f.read()).group(1))
+    except (OSError, AttributeError):
+        return None
+
+def _timed(fn):
+    """-> (seconds, tracemalloc peak bytes, peak RSS growth bytes or None) of fn()."""
+    Image.core.clear_cache()                        # Pillow's cached pixel blocks
+    if _libc is not None:
+        _libc.malloc_trim(0)                        # give freed heap back, so reuse shows up as growth
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')                                # reset VmHWM to the current RSS
+        rss0 = _rss_kb('VmRSS')
+    except OSError:
+        rss0 = None
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    hwm = _rss_kb('VmHWM') if rss0 is not None else None
+    return dt, peak, (hwm - rss0) * 1024 if hwm is not None else None
+
+def _row(label, dt, size, peak, rss):
+    rss = f'{rss / 1048576:>10.2f}' if rss is not None else f'{"-":>10}'
+    return f'{label}{dt * 1000:>10.1f}{size / 1024:>10.0f}{peak / 1048576:>10.2f}{rss}'
+
+def _measure(img, case):
+    fd, path = tempfile.mkstemp(suffix='.' + case.split('-')[-1]); os.close(fd)
+    try:
+        _encode(img.resize((16, 16)), case, path)       # warm-up: codec init
+        dt, peak, rss = _timed(lambda: _encode(img, case, path))
+        return dt, os.path.getsize(path), peak, rss
+    finally:
+        os.remove(path)
+
+def _fake_to_rgba(img):
+    """Stand-in for the CoreGraphics readback: a fresh w x h x 4 buffer, like CGBitmapContext."""
+    w, h = img.size
+    return w, h, bytearray(img.rgba), 1.0
+
+def _app_image(pil):
+    if hasattr(rp.ui, 'OPS'):
+        img = rp.ui.Image(pil.width, pil.height)
+        img.rgba = pil.convert('RGBA').tobytes()    # what CoreGraphics would draw into the buffer
+        return img
+    buf = io.BytesIO(); pil.save(buf, 'PNG')
+    return rp.ui.Image.from_data(buf.getvalue())
+
+def _app_cases():
+    """The app's encode_image_file, starting from a ui.Image."""
+    stand_in = hasattr(rp.ui, 'OPS')
+    if stand_in:
+        rp.ui_image_to_rgba = _fake_to_rgba
+    cases = list(APP_CASES) + ([] if stand_in else [('PNG', None), ('JPEG', None)])
+    print(f'\napp encode_image_file ({"stand-in readback" if stand_in else "in-process"}):')
+    for name, px in QUALITY_PRESETS:
+        img = _app_image(_composite(px))
+        for fmt, level in cases:
+            label = fmt if level is None else f'{fmt}-{level}'
+            path = tempfile.mktemp(suffix=dict(rp.EXPORT_FORMATS)[fmt])
+            try:
+                dt, peak, rss = _timed(lambda: rp.encode_image_file(img, path, fmt, png_level=level))
+            except Exception as e:
+                print(f'{name:<9}{px:>6}  {label:<15}failed: {e}')
+                continue
+            print(_row(f'{name:<9}{px:>6}  {label:<15}', dt, os.path.getsize(path), peak, rss))
+            os.remove(path)
+
+def run():
+    print(f'{"preset":<9}{"px":>6}  {"case":<15}{"encode ms":>10}{"size KB":>10}{"py MB":>10}{"rss MB":>10}')
+    for name, px in QUALITY_PRESETS:
+        img = _composite(px)
+        for case in CASES:
+            print(_row(f'{name:<9}{px:>6}  {case:<15}', *_measure(img, case)))
+    _app_cases()
+
+if __name__ == '__main__':
+    run()
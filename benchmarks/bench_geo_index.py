@@ -0,0 +1,63 @@
+# coding: utf-8
+# Benchmark: GeoPointIndex build + nearest-within-radius lookups vs. brute force.
+
+import os, sys, time, random, math
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+if importlib.util.find_spec('ui') is None:   # outside Pythonista: use the stand-in modules
+    sys.path.insert(0, os.path.join(HERE, 'stubs'))
+from recon_pipeline import GeoPointIndex, M_PER_DEG_LAT
+
+def _brute(points, lat, lon, radius_m):
+    kx = M_PER_DEG_LAT * math.cos(math.radians(lat))
+    best = None
+    for key, plat, plon in points:
+        d = math.hypot((plon - lon) * kx, (plat - lat) * M_PER_DEG_LAT)
+        if d <= radius_m and (best is None or d < best[1]):
+            best = (key, d)
+    return best
+
+def run(n_points=50000, n_queries=20000, radius_m=15.0, spread_deg=0.2, seed=7):
+    rnd = random.Random(seed)
+    lat0, lon0 = 30.33218, -81.65565
+    points = [(i, lat0 + rnd.uniform(-spread_deg, spread_deg), lon0 + rnd.uniform(-spread_deg, spread_deg))
+              for i in range(n_points)]
+    idx = GeoPointIndex()
+    t0 = time.perf_counter()
+    for key, lat, lon in points:
+        idx.add(key, lat, lon)
+    build_s = time.perf_counter() - t0
+
+    # Half the queries jitter a few metres around stored points, half are random.
+    queries = []
+    for i in range(n_queries):
+        if i % 2:
+            _, lat, lon = points[rnd.randrange(n_points)]
+            queries.append((lat + rnd.gauss(0, 4e-5), lon + rnd.gauss(0, 4e-5)))
+        else:
+            queries.append((lat0 + rnd.uniform(-spread_deg, spread_deg), lon0 + rnd.uniform(-spread_deg, spread_deg)))
+    lat_us = []
+    hits = 0
+    for lat, lon in queries:
+        t = time.perf_counter()
+        r = idx.nearest(lat, lon, radius_m)
+        lat_us.append((time.perf_counter() - t) * 1e6)
+        hits += r is not None
+    lat_us.sort()
+
+    mismatches = 0
+    for lat, lon in queries[:200]:
+        a, b = idx.nearest(lat, lon, radius_m), _brute(points, lat, lon, radius_m)
+        if (a is None) != (b is None) or (a and abs(a[1] - b[1]) > 1e-6):
+            mismatches += 1
+
+    print(f'points={n_points} queries={n_queries} radius={radius_m:.0f} m')
+    print(f'build: {build_s*1000:.1f} ms  ({n_points/build_s:,.0f} pts/s)')
+    print(f'lookup: mean {sum(lat_us)/len(lat_us):.1f} us  p50 {lat_us[len(lat_us)//2]:.1f} us  '
+          f'p99 {lat_us[int(len(lat_us)*0.99)]:.1f} us')
+    print(f'hit rate: {hits/float(n_queries):.1%}  brute-force mismatches (200 sampled): {mismatches}')
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,147 @@
+# coding: utf-8
+# Benchmark: GeocodeClient against a local stub Nominatim server and a fake Apple geocoder.
+# Two cases, both checked:
+#   hedge  several callers per point; Apple is slow on purpose for some points (OSM must be
+#          hedged in and win, well before Apple answers) and has no address for others (OSM
+#          fallback); identical lookups must coalesce into one request per point.
+#   rate   Apple off, OSM at the Nominatim policy rate of 1 request/s: the stub server must
+#          never see two requests less than a second apart, and no lookup may time out.
+# Reports latency percentiles; exits 1 when a check fails.
+
+import os, sys, json, time, threading
+import importlib.util
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if importlib.util.find_spec('ui') is None:   # outside Pythonista: use the stand-in modules
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs'))
+from recon_pipeline import GeocodeClient, percentiles
+
+APPLE_SLOW_S = 2.5
+RATE_SLACK_S = 0.05         # scheduling / socket jitter allowed below 1 / rate
+
+class _StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args):
+        HTTPServer.__init__(self, *args)
+        self.arrivals = []
+
+class _NominatimStub(BaseHTTPRequestHandler):
+    delay = 0.05
+
+    def do_GET(self):
+        self.server.arrivals.append(time.monotonic())
+        time.sleep(self.delay)
+        body = json.dumps({'address': {'house_number': '12', 'road': 'Stub Road', 'city': 'Testville',
+                                       'postcode': '00000', 'country': 'Nowhere'}}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _point(i):
+    return 30.0 + i * 1e-3, -81.0
+
+def _kind(i):
+    """What the fake Apple geocoder does for point i."""
+    return 'slow' if i % 4 == 0 else 'empty' if i % 4 == 1 else 'fast'
+
+def _fake_apple(d):
+    kind = _kind(int(round((d['latitude'] - 30.0) * 1e3)))
+    if kind == 'empty':
+        time.sleep(0.02)
+        return []
+    time.sleep(APPLE_SLOW_S if kind == 'slow' else 0.05)
+    return [{'SubThoroughfare': '1', 'Thoroughfare': 'Apple Way', 'City': 'Cupertino',
+             'ZIP': '95014', 'Country': 'United States'}]
+
+def _serve():
+    server = _StubServer(('127.0.0.1', 0), _NominatimStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, 'http://127.0.0.1:%d/reverse' % server.server_address[1]
+
+def _call_all(client, points, callers_per_point):
+    results, lock = {}, threading.Lock()
+    def caller(i):
+        t0 = time.perf_counter()
+        txt, source, shared = client.lookup(*_point(i))
+        with lock:
+            results.setdefault(i, []).append((source, shared, time.perf_counter() - t0))
+    threads = [threading.Thread(target=caller, args=(i,)) for i in points for _ in range(callers_per_point)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return results
+
+def _report(client, results):
+    st = client.stats()
+    print('  sources: apple=%(apple)d osm=%(osm)d none=%(none)d failed=%(failed)d hedged=%(hedged)d '
+          'rate_limited=%(rate_limited)d coalesced=%(coalesced)d' % st)
+    for name, p in sorted(st['latency'].items()):
+        if p['n']:
+            print(f"  {name:<7} n={p['n']:<3} p50={p['p50']*1000:7.1f} ms  p95={p['p95']*1000:7.1f} ms  p99={p['p99']*1000:7.1f} ms")
+    p = percentiles([s for calls in results.values() for _, _, s in calls])
+    print(f"  caller  n={p['n']:<3} p50={p['p50']*1000:7.1f} ms  p95={p['p95']*1000:7.1f} ms  p99={p['p99']*1000:7.1f} ms")
+    return st
+
+def hedge_case(n_points=12, callers_per_point=3, hedge_delay=0.5):
+    server, url = _serve()
+    client = GeocodeClient(apple_fn=_fake_apple, osm_url=url, hedge_delay=hedge_delay,
+                           rate=50.0, timeout=10.0, max_workers=2 * n_points)
+    t0 = time.perf_counter()
+    results = _call_all(client, range(n_points), callers_per_point)
+    wall = time.perf_counter() - t0
+    server.shutdown()
+    print(f'hedge: {n_points} points x {callers_per_point} callers, Apple slow ({APPLE_SLOW_S}s) / empty / fast '
+          f'by point, hedge after {hedge_delay}s; wall {wall:.2f}s, {len(server.arrivals)} OSM requests')
+    st = _report(client, results)
+    slow = [i for i in range(n_points) if _kind(i) == 'slow']
+    want_osm = [i for i in range(n_points) if _kind(i) != 'fast']
+    problems = []
+    if st['hedged'] != len(slow):
+        problems.append(f'hedged {st["hedged"]}, expected {len(slow)}')
+    for i in range(n_points):
+        want = 'osm' if i in want_osm else 'apple'
+        if any(src != want for src, _, _ in results[i]):
+            problems.append(f'point {i} ({_kind(i)} Apple): sources {[s for s, _, _ in results[i]]}, expected {want}')
+        if i in slow and max(s for _, _, s in results[i]) >= APPLE_SLOW_S:
+            problems.append(f'point {i}: hedged lookup waited for Apple')
+    if st['coalesced'] != n_points * (callers_per_point - 1):
+        problems.append(f'coalesced {st["coalesced"]}, expected {n_points * (callers_per_point - 1)}')
+    if sum(1 for calls in results.values() for _, shared, _ in calls if not shared) != n_points:
+        problems.append('more than one un-shared lookup per point')
+    if len(server.arrivals) != len(want_osm):
+        problems.append(f'{len(server.arrivals)} OSM requests, expected {len(want_osm)}')
+    return problems
+
+def rate_case(n_points=5, rate=1.0):
+    server, url = _serve()
+    client = GeocodeClient(osm_url=url, rate=rate, timeout=n_points / rate + 5.0, use_apple=False,
+                           max_workers=n_points)
+    t0 = time.perf_counter()
+    results = _call_all(client, range(100, 100 + n_points), 1)
+    wall = time.perf_counter() - t0
+    server.shutdown()
+    arrivals = sorted(server.arrivals)
+    gaps = [b - a for a, b in zip(arrivals, arrivals[1:])]
+    print(f'rate: {n_points} concurrent points, OSM only at {rate:g} req/s; wall {wall:.2f}s, '
+          f'{len(arrivals)} requests, smallest gap {min(gaps) if gaps else 0:.3f}s')
+    st = _report(client, results)
+    problems = []
+    if gaps and min(gaps) < 1.0 / rate - RATE_SLACK_S:
+        problems.append(f'two requests {min(gaps):.3f}s apart at {rate:g} req/s')
+    if st['osm'] != n_points or st['rate_limited']:
+        problems.append(f'{st["osm"]} of {n_points} answered by OSM, {st["rate_limited"]} rate-limited')
+    return problems
+
+if __name__ == '__main__':
+    problems = hedge_case() + rate_case()
+    for p in problems:
+        print(f'  FAIL {p}')
+    print('geocode client OK' if not problems else 'geocode client check failed')
+    sys.exit(1 if problems else 0)
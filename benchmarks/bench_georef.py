@@ -0,0 +1,96 @@
+# coding: utf-8
+# Benchmark: recon_georef.GeoTransform accuracy and throughput.
+# Accuracy: pixel -> lat/lon -> pixel round trip, agreement with the scalar Web Mercator
+# helpers in recon_core, mpp_at vs great-circle distance between neighbouring pixels, and
+# the scale bar's true ground length (old flat meters / w vs GeoTransform) across latitudes
+# and rotations. Throughput: points/s, one NumPy call vs a per-point Python loop.
+# Exits 1 when an accuracy bound is exceeded.
+#
+#   python benchmarks/bench_georef.py [--points 1000000]
+
+import os, sys, time, argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import recon_core as core
+from recon_georef import GeoTransform
+
+LATS = (0.0, 30.33218, 60.0, 78.2)
+ROTATIONS = (0.0, 17.0, 45.0, 123.4)
+METERS, PX = 800.0, 1536
+MAX_ROUNDTRIP_PX = 1e-6
+MAX_SCALAR_DIFF_M = 1e-3
+MAX_MPP_REL_ERR = 1e-4
+MAX_BAR_REL_ERR = 0.005
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(np.radians(lon2 - lon1) / 2) ** 2
+    return 2 * core.EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def _scalar_pixel_to_latlon(g, x, y):
+    """Per-point reference through recon_core's scalar helpers."""
+    a, b, c, d = g._to_world
+    dx, dy = x - g.out_w / 2.0, y - g.out_w / 2.0
+    return core.world_px_to_latlon(g.cx + a * dx + b * dy, g.cy + c * dx + d * dy, g.zoom)
+
+def accuracy():
+    ok = True
+    rnd = np.random.default_rng(7)
+    xs, ys = rnd.uniform(0, PX, 20000), rnd.uniform(0, PX, 20000)
+    print(f'accuracy ({METERS:g} m over {PX} px; bounds: round trip {MAX_ROUNDTRIP_PX:g} px, '
+          f'mpp {MAX_MPP_REL_ERR:.0e}, scale bar {MAX_BAR_REL_ERR:.1%})')
+    print(f'  {"lat":>7} {"rot":>6} {"round trip px":>14} {"vs scalar m":>12} {"mpp rel err":>12} '
+          f'{"bar old":>8} {"bar new":>8}')
+    for lat in LATS:
+        for rot in ROTATIONS:
+            g = GeoTransform(lat, -81.65565, METERS, PX, rot)
+            la, lo = g.pixel_to_latlon(xs, ys)
+            bx, by = g.latlon_to_pixel(la, lo)
+            rt = max(np.abs(bx - xs).max(), np.abs(by - ys).max())
+            ref = np.array([_scalar_pixel_to_latlon(g, x, y) for x, y in zip(xs[:500], ys[:500])])
+            vs = haversine_m(la[:500], lo[:500], ref[:, 0], ref[:, 1]).max()
+            # one-pixel steps along x and y from random points vs predicted ground resolution
+            la1, lo1 = g.pixel_to_latlon(xs + 1, ys)
+            la2, lo2 = g.pixel_to_latlon(xs, ys + 1)
+            mpp = g.mpp_at(xs + 0.5, ys + 0.5)
+            err = max(np.abs(haversine_m(la, lo, la1, lo1) / mpp - 1).max(),
+                      np.abs(haversine_m(la, lo, la2, lo2) / mpp - 1).max())
+            bars = []
+            for mpp_at in (None, g.mpp_at):
+                bar_m, bar_px, x0, y0 = core.scale_bar_geometry(PX, PX, METERS, mpp_at)
+                pl, po = g.pixel_to_latlon([x0, x0 + bar_px], [y0 + 3, y0 + 3])
+                bars.append(float(haversine_m(pl[0], po[0], pl[1], po[1])) / bar_m - 1)
+            print(f'  {lat:>7.2f} {rot:>6.1f} {rt:>14.2e} {vs:>12.2e} {err:>12.2e} {bars[0]:>+8.1%} {bars[1]:>+8.2%}')
+            ok &= rt <= MAX_ROUNDTRIP_PX and vs <= MAX_SCALAR_DIFF_M and err <= MAX_MPP_REL_ERR
+            ok &= abs(bars[1]) <= MAX_BAR_REL_ERR
+    return ok
+
+def throughput(n):
+    g = GeoTransform(30.33218, -81.65565, METERS, PX, 33.0)
+    rnd = np.random.default_rng(1)
+    xs, ys = rnd.uniform(0, PX, n), rnd.uniform(0, PX, n)
+    print(f'throughput ({n} points)')
+    t0 = time.perf_counter(); la, lo = g.pixel_to_latlon(xs, ys); t1 = time.perf_counter()
+    g.latlon_to_pixel(la, lo); t2 = time.perf_counter()
+    m = min(n, 20000)
+    t3 = time.perf_counter()
+    for x, y in zip(xs[:m].tolist(), ys[:m].tolist()):
+        _scalar_pixel_to_latlon(g, x, y)
+    t4 = time.perf_counter()
+    print(f'  pixel_to_latlon   {n / (t1 - t0) / 1e6:>7.1f} M points/s')
+    print(f'  latlon_to_pixel   {n / (t2 - t1) / 1e6:>7.1f} M points/s')
+    print(f'  per-point loop    {m / (t4 - t3) / 1e6:>7.2f} M points/s (scalar recon_core helpers)')
+    t0 = time.perf_counter()
+    for _ in range(100):
+        g.grid_labels(8)
+    print(f'  grid_labels(8)    {(time.perf_counter() - t0) * 10:>7.2f} ms (49 labels)')
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--points', type=int, default=1000000)
+    args = ap.parse_args()
+    good = accuracy()
+    throughput(args.points)
+    print('accuracy OK' if good else 'accuracy bound exceeded')
+    sys.exit(0 if good else 1)
@@ -0,0 +1,103 @@
+# coding: utf-8
+# Benchmark: cost of recon_metrics spans when instrumentation is disabled vs enabled, a
+# JSON-lines export of a synthetic run (stage mix similar to one progressive render), and
+# recon_pipeline.export_trace() after a few real pipeline renders (stand-in ui off-device),
+# whose file is read back and checked. Exits 1 when the trace is malformed.
+
+import os, sys, json, tempfile, time, timeit
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+import recon_metrics
+from recon_metrics import Instrumentation, span
+
+def _per_call(stmt, n):
+    return min(timeit.repeat(stmt, number=n, repeat=5, globals={'span': span})) / n
+
+def run(n=200000):
+    recon_metrics.metrics.enabled = False
+    base = _per_call('pass', n)
+    off = _per_call("with span('snapshot'):\n    pass", n)
+    off_tag = _per_call("with span('geocode') as sp:\n    sp.set('apple')", n)
+    recon_metrics.metrics.enabled = True
+    on = _per_call("with span('snapshot'):\n    pass", n)
+    on_tag = _per_call("with span('geocode', px=1536) as sp:\n    sp.set('apple')", n)
+    recon_metrics.metrics.enabled = False
+    print(f'{"":<26}{"ns/span":>10}')
+    for label, t in (('empty statement', base), ('disabled span', off), ('disabled span + set()', off_tag),
+                     ('enabled span', on), ('enabled span + tag/attrs', on_tag)):
+        print(f'{label:<26}{t * 1e9:>10.0f}')
+    spans_per_render = 12
+    print(f'disabled overhead per render (~{spans_per_render} spans): '
+          f'{(off_tag - base) * spans_per_render * 1e6:.2f} µs')
+
+    inst = Instrumentation(enabled=True)
+    inst.add_source('caches', lambda: {'snapshot': {'hits': 3, 'misses': 1}})
+    for i in range(200):
+        for stage, tag, ms in (('render', 'proxy', 40), ('snapshot', 'miss', 300), ('rotate', None, 25),
+                               ('overlays', None, 12), ('geocode', 'apple' if i % 3 else 'osm', 180)):
+            inst.record(stage, ms / 1000.0 * (1 + (i % 7) / 10.0), tag)
+    path = os.path.join(tempfile.mkdtemp(), 'trace.jsonl')
+    t0 = time.perf_counter()
+    n_ev = inst.export_jsonl(path)
+    dt = time.perf_counter() - t0
+    with open(path) as f:
+        summary = json.loads(f.readlines()[-1])
+    print(f'export: {n_ev} events in {dt * 1000:.1f} ms -> {path}')
+    for k in ('snapshot', 'geocode.apple', 'geocode.osm'):
+        st = summary['stages'][k]
+        print(f'  {k:<14} n={st["count"]:<4} p50 {st["p50"] * 1000:.0f} ms  p95 {st["p95"] * 1000:.0f} ms  '
+              f'p99 {st["p99"] * 1000:.0f} ms')
+
+def pipeline_trace(renders=4):
+    """Trace real snapshot -> rotate -> overlays -> chip renders and export them as the app does."""
+    if importlib.util.find_spec('ui') is None:   # outside Pythonista: use the stand-in modules
+        sys.path.insert(0, os.path.join(HERE, 'stubs'))
+    import recon_pipeline as rp
+    rp._snapshot_store = rp.SnapshotStore(root=None)
+    rp._geocode_store = rp.GeocodeStore(path=None)
+    rp.metrics.reset()
+    rp.metrics.enabled = True
+    try:
+        for i in range(renders):
+            lat, lon, deg = 30.33218 + (i % 2) * 1e-3, -81.65565, 15.0 * i
+            key = rp.snapshot_key(lat, lon, 800, 'satellite', 1024)
+            with rp.span('render', 'full', px=1024):
+                snap = rp.get_snapshot(lat, lon, 800, 'satellite', 1024)
+                img = rp.compose_overlays(rp.rotate_image_fill_square(snap, deg, cache_key=key), 800,
+                                          'satellite', lat, lon, rotation_deg=deg, cache_key=key)
+            addr = rp.reverse_geocode_compact(lat, lon)
+            if addr:
+                rp.apply_address_chip(img, addr)
+        path = os.path.join(tempfile.mkdtemp(), 'trace.jsonl')
+        n_ev = rp.export_trace(path)
+    finally:
+        rp.metrics.enabled = False
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    spans = [ev for ev in lines if ev.get('type') == 'span']
+    problems = []
+    if len(spans) != n_ev or not lines or lines[-1].get('type') != 'summary':
+        problems.append(f'{len(spans)} span lines for {n_ev} events, last line {lines[-1].get("type") if lines else None}')
+    for ev in spans:
+        if not isinstance(ev.get('stage'), str) or not isinstance(ev.get('ms'), (int, float)) or 'ts' not in ev:
+            problems.append(f'bad span line {ev}'); break
+    stages = {ev['stage'] for ev in spans}
+    for need in ('render', 'snapshot', 'rotate', 'overlays', 'geocode', 'address_chip'):
+        if need not in stages:
+            problems.append(f'no {need} span')
+    summary = lines[-1] if lines else {}
+    if 'snapshot' not in summary.get('stages', {}) or 'caches' not in summary.get('sources', {}):
+        problems.append('summary lacks stage histograms or cache counters')
+    print(f'export_trace after {renders} pipeline renders: {n_ev} spans ({", ".join(sorted(stages))}) '
+          f'+ summary -> {path}')
+    for p in problems:
+        print(f'  FAIL {p}')
+    return not problems
+
+if __name__ == '__main__':
+    run()
+    good = pipeline_trace()
+    print('trace OK' if good else 'trace check failed')
+    sys.exit(0 if good else 1)
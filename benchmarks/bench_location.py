@@ -0,0 +1,83 @@
+# coding: utf-8
+# Benchmark: "Use My Location" latency and accuracy, old sleep-poll loop vs LocationService,
+# against a scripted provider that refines from a cell-tower fix to GPS over ~2 s.
+# Scenarios: a cold pick, a repeat pick a few seconds later, and a pick with updates kept warm.
+
+import os, sys, time
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+if importlib.util.find_spec('ui') is None:   # outside Pythonista: use the stand-in modules
+    sys.path.insert(0, os.path.join(HERE, 'stubs'))
+import recon_pipeline as rp
+
+_spec = importlib.util.spec_from_file_location('stub_location', os.path.join(HERE, 'stubs', 'location.py'))
+stub_location = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(stub_location)
+
+SCRIPT = [(0.15, {'horizontal_accuracy': 1414.0, 'latitude': 30.3410}),    # cell / Wi-Fi
+          (0.60, {'horizontal_accuracy': 165.0, 'latitude': 30.3330}),
+          (1.10, {'horizontal_accuracy': 47.0, 'latitude': 30.33225}),
+          (1.80, {'horizontal_accuracy': 10.0, 'latitude': 30.33218})]
+_ACCURACY_BY_LAT = {f['latitude']: f['horizontal_accuracy'] for _, f in SCRIPT}
+REPEAT_AFTER_S = 3.0
+
+def legacy_request_location(provider, timeout=6.0, poll=0.5):
+    """The pre-LocationService loop: start, sleep-poll, stop on every pick."""
+    provider.start_updates()
+    t0 = time.time()
+    try:
+        while time.time() - t0 < timeout:
+            loc = provider.get_location()
+            if loc and 'latitude' in loc and 'longitude' in loc:
+                return loc
+            time.sleep(poll)
+        return None
+    finally:
+        provider.stop_updates()
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    r = fn()
+    return time.perf_counter() - t0, r
+
+def _row(label, dt, lat):
+    acc = _ACCURACY_BY_LAT.get(lat)
+    acc = '-' if acc is None else f'{acc:.0f} m'
+    print(f'  {label:<22}{dt * 1000:>8.0f} ms   accuracy {acc}')
+
+def run():
+    print('script: ' + ', '.join(f'{t:.2f}s→{f["horizontal_accuracy"]:.0f} m' for t, f in SCRIPT) +
+          f'; accuracy target {rp.LOCATION_ACCURACY_M:.0f} m')
+
+    print('old poll loop (0.5 s):')
+    prov = stub_location.ScriptedProvider(SCRIPT)
+    dt, loc = _timed(lambda: legacy_request_location(prov))
+    _row('cold pick', dt, loc['latitude'])
+    time.sleep(REPEAT_AFTER_S)
+    dt, loc = _timed(lambda: legacy_request_location(prov))
+    _row(f'repeat after {REPEAT_AFTER_S:g}s', dt, loc['latitude'])
+
+    print('LocationService:')
+    svc = rp.LocationService(stub_location.ScriptedProvider(SCRIPT))
+    dt, loc = _timed(svc.get)
+    _row('cold pick', dt, loc[0])
+    time.sleep(REPEAT_AFTER_S)
+    dt, loc = _timed(svc.get)
+    _row(f'repeat after {REPEAT_AFTER_S:g}s', dt, loc[0])
+    dt, loc = _timed(lambda: svc.get(accuracy=5.0, timeout=1.0))
+    _row('unreachable 5 m target', dt, loc[0])
+    print('  ', svc.stats(), svc.provider.calls)
+
+    svc = rp.LocationService(stub_location.ScriptedProvider(SCRIPT))
+    svc.keep_warm(True)
+    time.sleep(2.0)
+    dt, loc = _timed(lambda: svc.get(max_age=0.5))
+    _row('kept warm 2 s', dt, loc[0])
+    svc.keep_warm(False)
+    time.sleep(0.2)
+    print('  ', svc.stats(), svc.provider.calls)
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,69 @@
+# coding: utf-8
+# Benchmark: speculative snapshot prefetch over a scripted session.
+# After each render the "user" pauses, then switches map type, nudges coverage one step or
+# jumps somewhere new. render_map_snapshot is replaced with a fake whose latency scales with
+# pixel count. Reports foreground snapshot wait with prefetch off and on, and prefetch stats.
+
+import os, sys, time, random
+import importlib.util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if importlib.util.find_spec('ui') is None:   # outside Pythonista: use the stand-in modules
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs'))
+import recon_pipeline as rp
+from satellite_recon import PROXY_SIZE
+from recon_core import MAP_TYPES, COVERAGE_STEP, MIN_METERS, MAX_METERS, neighbor_views
+
+FULL_PX = 1536
+SNAPSHOT_S_PER_MPX = 0.25    # fake render_map_snapshot cost: ~0.6 s at 1536 px
+THINK_S = 1.5                # user pause between renders
+
+class _FakeImage(object):
+    def __init__(self, w):
+        self.size, self.scale = (w, w), 1.0
+
+def _fake_snapshot(lat, lon, width=1000, height=1000, map_type='satellite', img_width=1024, img_height=1024):
+    time.sleep(img_width * img_height / 1e6 * SNAPSHOT_S_PER_MPX)
+    return _FakeImage(img_width)
+
+def _session(n, seed):
+    rnd = random.Random(seed)
+    lat, lon, meters, mtype = 30.33218, -81.65565, 800, 'satellite'
+    steps = []
+    for _ in range(n):
+        steps.append((lat, lon, meters, mtype))
+        r = rnd.random()
+        if r < 0.4:
+            mtype = rnd.choice([t for t in MAP_TYPES if t != mtype])
+        elif r < 0.8:
+            meters = int(min(MAX_METERS, max(MIN_METERS, meters + rnd.choice((-1, 1)) * COVERAGE_STEP)))
+        else:
+            lat, lon = lat + rnd.uniform(-0.05, 0.05), lon + rnd.uniform(-0.05, 0.05)
+    return steps
+
+def run(n=20, seed=3):
+    rp.location.render_map_snapshot = _fake_snapshot
+    steps = _session(n, seed)
+    print(f'{n} renders ({PROXY_SIZE} px proxy + {FULL_PX} px), {THINK_S}s think time, '
+          f'fake snapshot {SNAPSHOT_S_PER_MPX}s/Mpx')
+    for enabled in (False, True):
+        rp._snapshot_cache.clear()
+        pf = rp._prefetcher = rp.SnapshotPrefetcher(idle_delay=0.2)
+        waits = []
+        for lat, lon, meters, mtype in steps:
+            pf.cancel()
+            t0 = time.perf_counter()
+            for px in (PROXY_SIZE, FULL_PX):
+                rp.get_snapshot(lat, lon, meters, mtype, px)
+            waits.append(time.perf_counter() - t0)
+            if enabled:
+                pf.schedule(neighbor_views(lat, lon, meters, mtype, (PROXY_SIZE, FULL_PX)))
+            time.sleep(THINK_S)
+        w = rp.percentiles(waits)
+        print(f'prefetch {"on " if enabled else "off"}: snapshot wait total {sum(waits):.2f}s  '
+              f'p50 {w["p50"] * 1000:.0f} ms  p95 {w["p95"] * 1000:.0f} ms')
+        if enabled:
+            print('  ', pf.stats())
+
+if __name__ == '__main__':
+    run()
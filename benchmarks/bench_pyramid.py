@@ -0,0 +1,72 @@
+# coding: utf-8
+# Benchmark: TilePyramid vs whole-view snapshots over a session of overlapping views
+# (zoom out / in at one spot, short pans, a revisit). render_map_snapshot is a fake whose
+# latency is a fixed overhead plus a per-pixel cost. Reports snapshot calls, pixels fetched,
+# wall time per view and the tile hit rate.
+
+import os, sys, time
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+if importlib.util.find_spec('ui') is None:   # outside Pythonista: use the stand-in modules
+    sys.path.insert(0, os.path.join(HERE, 'stubs'))
+import recon_pipeline as rp
+
+CALL_S = 0.15               # fake snapshot: fixed cost per call
+S_PER_MPX = 0.25            # ... plus this per megapixel
+PX = 1536
+M_PER_DEG = 111195.0
+LAT, LON = 30.33218, -81.65565
+SESSION = [('800 m', 0, 0, 800), ('1.2 km', 0, 0, 1200), ('2 km', 0, 0, 2000), ('pan 100 m E', 100, 0, 1200),
+           ('pan 100 m N', 100, 100, 1200), ('600 m', 100, 100, 600), ('back to 800 m', 0, 0, 800),
+           ('pan 150 m W', -150, 0, 800)]
+
+class _FakeSnapshots(object):
+    def __init__(self):
+        self.calls = self.px = 0
+
+    def __call__(self, lat, lon, width=1000, height=1000, map_type='satellite', img_width=1024, img_height=1024):
+        self.calls += 1
+        self.px += img_width * img_height
+        time.sleep(CALL_S + img_width * img_height / 1e6 * S_PER_MPX)
+        return rp.ui.Image(img_width, img_height)
+
+def _views():
+    for label, east, north, meters in SESSION:
+        lat = LAT + north / M_PER_DEG
+        lon = LON + east / (M_PER_DEG * rp.math.cos(rp.math.radians(LAT)))
+        yield label, lat, lon, meters
+
+def run():
+    print(f'{len(SESSION)} views at {PX} px; fake snapshot {CALL_S}s/call + {S_PER_MPX}s/Mpx; '
+          f'tiles {rp.PYRAMID_TILE_PX} px, {rp.PYRAMID_WORKERS} workers')
+    rp._snapshot_store = rp.SnapshotStore(root=None)     # memory only: measure the pyramid itself
+    for mode in ('whole view', 'pyramid'):
+        fake = _FakeSnapshots()
+        rp.location.render_map_snapshot = fake
+        rp._snapshot_cache.clear()
+        rp._pyramid = pyr = rp.TilePyramid(enabled=(mode == 'pyramid'))
+        print(f'{mode}:')
+        total = 0.0
+        for label, lat, lon, meters in _views():
+            calls0, px0 = fake.calls, fake.px
+            before = dict(pyr.counts)
+            t0 = time.perf_counter()
+            rp.get_snapshot(lat, lon, meters, 'satellite', PX)
+            dt = time.perf_counter() - t0
+            total += dt
+            extra = ''
+            if pyr.enabled:
+                need = pyr.counts['tiles'] - before['tiles']
+                extra = f'  tiles {need - (pyr.counts["fetched"] - before["fetched"])}/{need} reused'
+            print(f'  {label:<16}{dt * 1000:>7.0f} ms  {fake.calls - calls0:>2} calls '
+                  f'{(fake.px - px0) / 1e6:>5.1f} Mpx{extra}')
+        print(f'  total {total:.2f}s, {fake.calls} calls, {fake.px / 1e6:.1f} Mpx fetched')
+        if pyr.enabled:
+            st = pyr.stats()
+            print(f'  tile hit rate {st["hit_rate"]:.0%} ({st["memory_hits"]} memory, {st["disk_hits"]} disk, '
+                  f'{st["composed"]} from children, {st["shared"]} shared of {st["tiles"]})')
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,70 @@
+# coding: utf-8
+# Benchmark: rotate-to-fill-square implementations at each quality preset.
+#   pil-scale-rotate  enlarge by |cos|+|sin|, rotate, crop: what the ui path does per angle
+#   pil-affine        single Pillow affine pass (recon_engine's 'pil' resampler)
+#   numpy-*           recon_raster with a cold (first angle) and warm (cached map) coordinate map
+# Runs on plain Python with NumPy + Pillow; in Pythonista the ui implementation is timed too.
+
+import os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+from PIL import Image
+import recon_raster
+from recon_core import rotation_fill_scale, QUALITY_PRESETS
+from recon_engine import PillowBackend, SyntheticSnapshotSource
+
+ANGLES = (15.0, 30.0, 45.0, 72.0)
+
+def _pil_scale_rotate(img, deg):
+    side = min(img.size)
+    big = int(round(side * rotation_fill_scale(deg)))
+    out = img.resize((big, big), Image.BICUBIC).rotate(-deg, resample=Image.BICUBIC)
+    off = (big - side) // 2
+    return out.crop((off, off, off + side, off + side))
+
+def _time(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+def _ui_case(img):
+    """Time the app's ui implementation when running inside Pythonista."""
+    try:
+        import io, ui, recon_pipeline as rp
+    except ImportError:
+        return None
+    buf = io.BytesIO(); img.save(buf, 'PNG')
+    uimg = ui.Image.from_data(buf.getvalue())
+    def run():
+        rp._rotation_cache.clear()
+        for d in ANGLES:
+            rp.rotate_image_fill_square(uimg, d)
+    return run
+
+def run():
+    pil_affine = PillowBackend(resample='pil')
+    print(f'{"preset":<9}{"px":>6}  ' + '  '.join(f'{n:>18}' for n in
+          ('pil-scale-rotate', 'pil-affine', 'numpy-near cold', 'numpy-near warm',
+           'numpy-bilin cold', 'numpy-bilin warm')) + '   (ms per image, mean of %d angles)' % len(ANGLES))
+    for name, px in QUALITY_PRESETS:
+        img = SyntheticSnapshotSource().render(30.33218, -81.65565, 800, 'satellite', px)
+        arr = np.asarray(img)
+        out = np.empty_like(arr)
+        row = []
+        row.append(_time(lambda: [_pil_scale_rotate(img, d) for d in ANGLES], 1))
+        row.append(_time(lambda: [pil_affine.rotate_fill_square(img, d) for d in ANGLES], 1))
+        for mode in ('nearest', 'bilinear'):
+            recon_raster._coord_maps.clear()
+            row.append(_time(lambda: [recon_raster.rotate_fill_square(arr, d, mode, out) for d in ANGLES], 1))
+            row.append(_time(lambda: [recon_raster.rotate_fill_square(arr, d, mode, out) for d in ANGLES]))
+        print(f'{name:<9}{px:>6}  ' + '  '.join(f'{t / len(ANGLES) * 1000:>18.1f}' for t in row))
+        ui_run = _ui_case(img)
+        if ui_run is not None:
+            print(f'{"":<15}  ui rotate_image_fill_square: {_time(ui_run, 1) / len(ANGLES) * 1000:.1f} ms')
+    print('coordinate map cache:', recon_raster.coord_map_stats())
+
+if __name__ == '__main__':
+    run()
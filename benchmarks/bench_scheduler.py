@@ -0,0 +1,67 @@
+# coding: utf-8
+# Benchmark: RenderScheduler under a burst of slider events and overlapping renders,
+# using fake render/geocode delays. Checks that only the newest job's result is applied
+# and reports how much work was avoided compared with running every event. Exits 1 when a
+# stale result is applied, the newest job's address never arrives, or the last two results
+# applied are not the newest job's image then address.
+
+import os, sys, time, random, threading
+import importlib.util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if importlib.util.find_spec('ui') is None:   # outside Pythonista: use the stand-in modules
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs'))
+from recon_pipeline import RenderScheduler, SLIDER_DEBOUNCE
+
+def run(n_events=60, event_gap=0.01, render_s=0.05, geocode_s=0.2, seed=5):
+    rnd = random.Random(seed)
+    applied = []
+    busy = {'render_s': 0.0}
+    lock = threading.Lock()
+    sched = RenderScheduler(dispatch=lambda fn: fn())
+
+    def fake_job(job, value):
+        for _ in range(5):                      # five stages with checkpoints in between
+            time.sleep(render_s / 5)
+            with lock: busy['render_s'] += render_s / 5
+            job.check()
+        sched.apply(job, lambda: applied.append(('image', value)))
+
+        def geocode():
+            time.sleep(geocode_s)
+            if not job.cancelled():
+                sched.apply(job, lambda: applied.append(('address', value)))
+        threading.Thread(target=geocode, daemon=True).start()
+
+    t0 = time.perf_counter()
+    for i in range(n_events):
+        sched.submit(fake_job, i, delay=SLIDER_DEBOUNCE if i % 10 else 0.0)
+        time.sleep(event_gap * rnd.uniform(0.5, 1.5))
+    last = i
+    timed_out = False
+    while sched._pending is not None or not applied or applied[-1] != ('address', last):
+        time.sleep(0.01)
+        if time.perf_counter() - t0 > 30:
+            timed_out = True
+            break
+    wall = time.perf_counter() - t0
+
+    c = sched.counts
+    naive = n_events * render_s
+    print(f'events={n_events} wall={wall:.2f}s  submitted={c["submitted"]} run={c["run"]} '
+          f'dropped={c["dropped"]} cancelled={c["cancelled"]} completed={c["completed"]}')
+    print(f'render CPU: {busy["render_s"]:.2f}s vs {naive:.2f}s if every event rendered '
+          f'({1 - busy["render_s"] / naive:.0%} saved)')
+    stale = sum(1 for _, v in applied if v != last)
+    print(f'applied results: {applied}  stale results applied: {stale}')
+    final_ok = applied[-2:] == [('image', last), ('address', last)]
+    if timed_out:
+        print(f'timed out waiting for job {last}\'s address')
+    if not final_ok:
+        print(f'last results applied {applied[-2:]}, expected image then address of job {last}')
+    return stale == 0 and not timed_out and final_ok
+
+if __name__ == '__main__':
+    good = run()
+    print('scheduler OK' if good else 'scheduler check failed')
+    sys.exit(0 if good else 1)
@@ -0,0 +1,127 @@
+# coding: utf-8
+# Benchmark: persistent SnapshotStore. Simulates app restarts over a set of previously seen
+# sites: the first session pays the (fake) network snapshot, later sessions start with empty
+# memory caches and a fresh store instance on the same directory. Also checks the size cap,
+# a corrupted blob and concurrent put/get from several threads, then races put (of shared
+# blobs) against eviction and exits 1 if an index row is left pointing at a missing blob or
+# the counters lose updates.
+#
+# Outside Pythonista the ui.Image <-> RGBA conversions are replaced by NumPy stand-ins that
+# produce / touch the same number of bytes (the real ones draw through CoreGraphics).
+
+import os, sys, time, shutil, tempfile, threading
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+if importlib.util.find_spec('ui') is None:   # outside Pythonista: use the stand-in modules
+    sys.path.insert(0, os.path.join(HERE, 'stubs'))
+import numpy as np
+import recon_pipeline as rp
+
+SITES = [(30.33218 + i * 0.01, -81.65565 - i * 0.01) for i in range(6)]
+SNAPSHOT_DELAY = 0.6        # fake render_map_snapshot latency, s
+PX = 1536                   # High preset
+
+def _fake_snapshot(lat, lon, width=1000, height=1000, map_type='satellite', img_width=1024, img_height=1024):
+    time.sleep(SNAPSHOT_DELAY)
+    img = rp.ui.Image(img_width, img_height)
+    img.seed = int(abs(lat * 1e5) + abs(lon * 1e5))   # distinct pixels per site
+    return img
+
+def _fake_to_rgba(img):
+    w, h = int(img.size[0] * img.scale), int(img.size[1] * img.scale)
+    rnd = np.random.default_rng(img.seed)
+    return w, h, rnd.integers(0, 255, w * h * 4, dtype=np.uint8).tobytes(), img.scale
+
+def _fake_from_rgba(px):
+    np.frombuffer(px.buf, dtype=np.uint8).sum(dtype=np.uint64)   # touch every page, like the draw
+    return rp.ui.Image(px.width / px.scale, px.height / px.scale, px.scale)
+
+def _session(root):
+    rp._snapshot_cache.clear()
+    rp._snapshot_store = store = rp.SnapshotStore(root)
+    t0 = time.perf_counter()
+    for lat, lon in SITES:
+        rp.get_snapshot(lat, lon, 800, 'satellite', PX)
+    rp._snapshot_writer.submit(lambda: None).result()     # wait for background writes
+    return (time.perf_counter() - t0) / len(SITES), store
+
+def run():
+    if not hasattr(rp.ui, 'OPS'):
+        print('needs the stand-in modules: run it outside Pythonista'); return True
+    rp.location.render_map_snapshot = _fake_snapshot
+    rp.ui_image_to_rgba, rp.rgba_to_ui_image = _fake_to_rgba, _fake_from_rgba
+    root = tempfile.mkdtemp()
+    print(f'{len(SITES)} sites at {PX} px ({PX * PX * 4 >> 20} MB raw each), fake snapshot {SNAPSHOT_DELAY}s')
+    for n in range(3):
+        per, store = _session(root)
+        label = 'first launch' if n == 0 else f'restart {n}'
+        print(f'  {label:<14} {per * 1000:>7.1f} ms per site   {store.stats()}')
+
+    big = PX * PX * 4 + 32
+    capped = rp.SnapshotStore(root, max_bytes=3 * big)
+    blob = bytes(PX * PX * 4)
+    capped.put(('extra',), PX, PX, blob)
+    st = capped.stats()
+    print(f'cap 3 blobs: entries {st["entries"]}, {st["bytes"] >> 20} MB, evicted {st["evicted"]}')
+
+    key = rp.snapshot_key(SITES[-1][0], SITES[-1][1], 800, 'satellite', PX)
+    digest = capped._conn().execute('SELECT digest FROM snapshots WHERE key = ?', (capped._key(key),)).fetchone()[0]
+    with open(capped._path(digest), 'r+b') as f:
+        f.seek(1000); f.write(b'\xff' * 16)
+    print(f'corrupted blob -> get: {capped.get(key)}, corrupt={capped.counts["corrupt"]}, '
+          f'still indexed: {key in capped}')
+
+    shared = rp.SnapshotStore(root, max_bytes=8 * big)
+    errors = []
+    def worker(i):
+        try:
+            rnd = np.random.default_rng(i)
+            for j in range(6):
+                k = ('t', i, j % 3)
+                shared.put(k, 256, 256, rnd.integers(0, 255, 256 * 256 * 4, dtype=np.uint8).tobytes())
+                px = shared.get(k)
+                if px is not None and len(px.buf) != 256 * 256 * 4:
+                    errors.append(k)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    print(f'4 threads x 6 put/get: errors {errors or 0}, {shared.stats()}')
+    ok = not errors and _race(os.path.join(root, 'race'))
+    shutil.rmtree(root)
+    return ok
+
+def _race(root, threads=6, puts=200, side=64):
+    """Puts of four shared blobs under many keys into a store capped at ~2 blobs, so dedup
+    hits and evictions of the same blobs interleave. Each put is read straight back: a
+    'corrupt' read means the index pointed at a blob that was gone."""
+    blobs = [bytes([i]) * (side * side * 4) for i in range(4)]
+    store = rp.SnapshotStore(root, max_bytes=2 * (side * side * 4 + 32) + 1)
+    done = []
+    def worker(i):
+        n = 0
+        for j in range(puts):
+            if store.put(('race', i, j), side, side, blobs[(i + j) % len(blobs)]) is not None:
+                n += 1
+                store.get(('race', i, j))
+        done.append(n)
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    with store._lock:
+        rows = store._conn().execute('SELECT digest FROM snapshots').fetchall()
+    missing = sum(1 for (d,) in rows if not os.path.exists(store._path(d)))
+    st = store.stats()
+    counted = st['writes'] + st['deduped']
+    print(f'put vs evict race, {threads} threads x {puts}: rows {len(rows)}, missing blobs {missing}, '
+          f'corrupt reads {st["corrupt"]}, writes+deduped {counted} of {sum(done)} puts, '
+          f'evicted {st["evicted"]}')
+    return missing == 0 and st['corrupt'] == 0 and counted == sum(done)
+
+if __name__ == '__main__':
+    good = run()
+    print('store OK' if good else 'store check failed')
+    sys.exit(0 if good else 1)
@@ -0,0 +1,141 @@
+# coding: utf-8
+# Benchmark: app cold start. Each run is a fresh interpreter (stubs when Pythonista's modules
+# are missing) on a private copy of the app, timing
+#   startup      running satellite_recon.py the way Pythonista does: the main script is
+#                compiled from source on every launch, modules it imports load from cached
+#                bytecode (one untimed warm-up run writes the caches)
+#   view         MapStudio() construction
+#   first frame  the first proxy image: snapshot (disk store warm, as on a relaunch) ->
+#                rotate -> static overlays
+# and recording which deferrable modules are loaded and how many strings were measured by
+# the end of each phase. Anything in DEFERRED loaded at startup, or any font measurement
+# at startup, is a regression regardless of timing noise.
+#
+#   python benchmarks/bench_startup.py --runs 15 --out start.json
+#   python benchmarks/bench_startup.py --compare start.json --threshold 0.25
+#   python benchmarks/bench_startup.py --app-dir /tmp/old-checkout      # another revision
+
+import argparse, glob, json, os, shutil, statistics, subprocess, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+PHASES = ('startup', 'view', 'first_frame')
+DEFERRED = ('numpy', 'PIL', 'requests', 'photos', 'dialogs', 'console', 'concurrent.futures',
+            'recon_georef', 'recon_raster', 'hashlib', 'tempfile')
+LAT, LON = 30.33218, -81.65565
+
+def _child(app_dir):
+    """One launch inside the fresh interpreter; prints a JSON result line."""
+    import runpy
+    preloaded = set(sys.modules)   # the interpreter's own startup (site hooks) is not the app's
+    sys.path.insert(0, app_dir)
+    try:
+        import ui
+    except ImportError:
+        sys.path.insert(0, os.path.join(HERE, 'stubs'))
+        import ui
+    measured = [0]
+    measure_string = ui.measure_string
+    def _counting(*args, **kwargs):
+        measured[0] += 1
+        return measure_string(*args, **kwargs)
+    ui.measure_string = _counting
+    out = {'ms': {}, 'loaded': {}, 'measured': {}}
+    def _mark(phase, t0):
+        out['ms'][phase] = (time.perf_counter() - t0) * 1e3
+        out['loaded'][phase] = sorted(m for m in DEFERRED if m in sys.modules and m not in preloaded)
+        out['measured'][phase] = measured[0]
+    t0 = time.perf_counter()
+    ns = runpy.run_path(os.path.join(app_dir, 'satellite_recon.py'), run_name='startup')   # not __main__: no present()
+    _mark('startup', t0)
+    t0 = time.perf_counter()
+    view = ns['MapStudio']()
+    _mark('view', t0)
+    view.latlon = (LAT, LON)
+    t0 = time.perf_counter()
+    view._render_view(*view._view_params(ns['PROXY_SIZE']))
+    _mark('first_frame', t0)
+    print(json.dumps(out))
+
+def _launch(app_dir):
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    res = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', app_dir],
+                         capture_output=True, text=True, env=env)
+    if res.returncode:
+        raise RuntimeError(res.stderr.strip().splitlines()[-1])
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+def run(app_dir, runs):
+    work = tempfile.mkdtemp()
+    try:
+        for path in glob.glob(os.path.join(app_dir, '*.py')):
+            shutil.copy(path, work)
+        _launch(work)   # warm-up: bytecode caches and the snapshot disk store
+        launches = [_launch(work) for _ in range(runs)]
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    last = launches[-1]
+    results = {}
+    for phase in PHASES:
+        ms = [l['ms'][phase] for l in launches]
+        results[phase] = {'best_ms': min(ms), 'median_ms': statistics.median(ms),
+                          'loaded': last['loaded'][phase], 'measured': last['measured'][phase]}
+    total = [sum(l['ms'].values()) for l in launches]
+    results['total'] = {'best_ms': min(total), 'median_ms': statistics.median(total)}
+    return {'meta': {'app_dir': app_dir, 'runs': runs, 'python': sys.version.split()[0],
+                     'time': time.strftime('%Y-%m-%dT%H:%M:%S')}, 'results': results}
+
+def report(cur):
+    r = cur['results']
+    print(f'{cur["meta"]["runs"]} launches of {cur["meta"]["app_dir"]}')
+    print(f'  {"phase":<13}{"best ms":>9}{"median ms":>11}{"measured":>10}  deferrable modules loaded')
+    for phase in PHASES:
+        p = r[phase]
+        print(f'  {phase:<13}{p["best_ms"]:>9.1f}{p["median_ms"]:>11.1f}{p["measured"]:>10}  '
+              f'{", ".join(p["loaded"]) or "-"}')
+    print(f'  {"total":<13}{r["total"]["best_ms"]:>9.1f}{r["total"]["median_ms"]:>11.1f}')
+
+def check(cur, base=None, threshold=0.25, min_delta_ms=2.0):
+    """-> [problem]; deferred modules or font metrics at startup, or startup / total median
+    slower than base (work moved from startup to the first frame is fine)."""
+    problems = []
+    start = cur['results']['startup']
+    if start['loaded']:
+        problems.append(f'loaded at startup: {", ".join(start["loaded"])}')
+    if start['measured']:
+        problems.append(f'{start["measured"]} font measurement(s) at startup')
+    for phase in ('startup', 'total') if base else ():
+        b, c = base['results'][phase]['median_ms'], cur['results'][phase]['median_ms']
+        if c > b * (1 + threshold) and c - b > min_delta_ms:
+            problems.append(f'{phase}: {b:.1f} -> {c:.1f} ms median ({c / b:.2f}x)')
+    return problems
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='App cold-start benchmark.')
+    ap.add_argument('--app-dir', default=ROOT, help='directory holding satellite_recon.py and its modules')
+    ap.add_argument('--runs', type=int, default=15)
+    ap.add_argument('--out', help='write results JSON here')
+    ap.add_argument('--compare', metavar='BASELINE', help='results JSON to compare against')
+    ap.add_argument('--threshold', type=float, default=0.25, help='allowed median slowdown, e.g. 0.25 = 25%%')
+    ap.add_argument('--child', help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        _child(args.child)
+        sys.exit(0)
+    cur = run(os.path.abspath(args.app_dir), args.runs)
+    report(cur)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(cur, f, indent=1, sort_keys=True)
+    base = None
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        print(f'vs {args.compare} ({base["meta"]["app_dir"]}), threshold {args.threshold:.0%}')
+    problems = check(cur, base, args.threshold)
+    for p in problems:
+        print(f'  REGRESSION {p}')
+    if not problems:
+        print('no regressions')
+    sys.exit(1 if problems else 0)
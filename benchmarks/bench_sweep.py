@@ -0,0 +1,93 @@
+# coding: utf-8
+# Benchmark: rotation-sweep animation export. Baseline is what an operator does today:
+# one full render per angle (rotate + every overlay redrawn; the snapshot is cached, as
+# in the app) and each frame appended to the APNG. SweepExporter reuses the fixed
+# overlays and generates and compresses frames on 1..N threads; the main thread only writes.
+# Compression dominates, so on one core expect parity in time and a lower peak RSS, with
+# extra threads costing time and memory.
+#
+# Each mode runs in its own process, so peak RSS is that mode's own.
+#
+#   python benchmarks/bench_sweep.py --px 1536 --step 10 --workers 1,2,4
+
+import os, sys, json, time, argparse, resource, subprocess, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import recon_engine as eng
+import recon_raster
+
+JOB = eng.BatchJob(30.33218, -81.65565, 800.0, 'satellite', 0.0, 'High', 'sweep',
+                   '1 Independent Drive\nJacksonville, 32202, United States')
+
+class _OnceSource(eng.SnapshotSource):
+    """Synthetic snapshot rendered once and then served from memory (the app's snapshot cache);
+    calls counts the snapshot requests."""
+    def __init__(self):
+        self.snap, self.calls = None, 0
+
+    def render(self, lat, lon, meters, map_type, img_w):
+        self.calls += 1
+        if self.snap is None:
+            self.snap = eng.SyntheticSnapshotSource().render(lat, lon, meters, map_type, img_w)
+        return self.snap
+
+def _peak_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0 * 1024.0) if sys.platform == 'darwin' else rss / 1024.0
+
+def naive(job, angles, path):
+    r = eng.HeadlessRenderer(_OnceSource(), eng.PillowBackend())
+    out = None
+    for deg in angles:
+        frame = np.asarray(r.render(job._replace(rotation=deg)).convert('RGB'))
+        if out is None:
+            out = recon_raster.StreamingAPNGWriter(path, frame.shape[1], frame.shape[0], len(angles), eng.SWEEP_FPS)
+        out.add_frame(frame)
+    out.close()
+
+def _one(mode, px, step, out_dir):
+    job = JOB._replace(quality=px)
+    path = os.path.join(out_dir, f'{mode}.png')
+    t0 = time.perf_counter()
+    if mode == 'naive':
+        naive(job, eng.sweep_angles(step), path)
+        calls = len(eng.sweep_angles(step))
+    else:
+        src = _OnceSource()
+        eng.SweepExporter(src, eng.PillowBackend(), int(mode)).render_to_file(job, path, step)
+        calls = src.calls
+    return {'seconds': time.perf_counter() - t0, 'peak_mb': _peak_mb(), 'mb': os.path.getsize(path) / 1e6,
+            'calls': calls}
+
+def run(px, step, workers):
+    n = len(eng.sweep_angles(step))
+    out_dir = tempfile.mkdtemp()
+    print(f'{n} frames at {px} px (step {step:g}°), APNG level 1, {os.cpu_count()} CPU(s)')
+    print(f'  {"mode":<22}{"time s":>7}{"frames/s":>10}{"APNG MB":>9}{"peak RSS MB":>13}{"snapshots":>11}')
+    base = None
+    for mode in ['naive'] + [str(w) for w in workers]:
+        res = subprocess.run([sys.executable, os.path.abspath(__file__), '--one', mode, str(px), str(step), out_dir],
+                             capture_output=True, text=True)
+        if res.returncode:
+            print(f'  {mode}: failed: {res.stderr.strip().splitlines()[-1]}')
+            continue
+        r = json.loads(res.stdout)
+        fps = n / r['seconds']
+        base = base or fps
+        label = 'render per angle' if mode == 'naive' else f'sweep, {mode} thread(s)'
+        print(f'  {label:<22}{r["seconds"]:>7.2f}{fps:>10.2f}{r["mb"]:>9.1f}{r["peak_mb"]:>13.0f}{r["calls"]:>11}'
+              f'  {fps / base:.2f}x')
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--px', type=int, default=1536)
+    ap.add_argument('--step', type=float, default=10.0)
+    ap.add_argument('--workers', default='1,2,4')
+    ap.add_argument('--one', nargs=4, metavar=('MODE', 'PX', 'STEP', 'OUT'), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.one:
+        mode, px, step, out = args.one
+        print(json.dumps(_one(mode, int(px), float(step), out)))
+    else:
+        run(args.px, args.step, [int(w) for w in args.workers.split(',')])
@@ -0,0 +1,110 @@
+# coding: utf-8
+# Benchmark: address-chip wrapping with per-trial measurement vs glyph-advance tables.
+# Wraps a corpus of real addresses (plus long unbreakable words) at the app's chip widths and
+# a few narrow ones, checks TextMetrics produces identical lines and chip boxes, and counts
+# calls into the real measure function. Measurement is Pillow's, plain and with synthetic
+# pair kerning (CoreText kerns; Pillow's basic layout does not) to exercise the error margin.
+
+import os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from recon_core import FONT_CHIP, QUALITY_PRESETS, TextMetrics, address_chip_layout
+from recon_engine import load_font
+
+CORPUS = [
+    '1600 Pennsylvania Avenue NW\nWashington, 20500\nUnited States',
+    '350 Fifth Avenue\nNew York, 10118\nUnited States',
+    '1 Infinite Loop\nCupertino, 95014\nUnited States',
+    '221B Baker Street\nLondon, NW1 6XE\nUnited Kingdom',
+    '10 Downing Street\nLondon, SW1A 2AA\nUnited Kingdom',
+    'Champ de Mars, 5 Avenue Anatole France\nParis, 75007\nFrance',
+    'Piazza del Colosseo, 1\nRoma, 00184\nItalia',
+    'Platz der Republik 1\nBerlin, 11011\nDeutschland',
+    'Bahnhofstrasse 1\nZürich, 8001\nSchweiz',
+    'Calle de Alcalá 50\nMadrid, 28014\nEspaña',
+    'Praça do Comércio\nLisboa, 1100-148\nPortugal',
+    'Dam 1\nAmsterdam, 1012 JS\nNederland',
+    'Stortorget 2\nStockholm, 111 29\nSverige',
+    'Rynek Główny 1\nKraków, 31-042\nPolska',
+    'Václavské náměstí 68\nPraha, 110 00\nČesko',
+    '1 Macquarie Street\nSydney, 2000\nAustralia',
+    '301 Front Street West\nToronto, M5V 2T6\nCanada',
+    'Avenida Paulista, 1578\nSão Paulo, 01310-200\nBrasil',
+    'Plaza de la Constitución S/N\nCiudad de México, 06000\nMéxico',
+    '1 Chome-1-2 Oshiage\nSumida City, 131-0045\nJapan',
+    '1 Fullerton Square\nSingapore, 049178\nSingapore',
+    '2 Dr Christiaan Barnard Street\nCape Town, 8001\nSouth Africa',
+    '1 Sheikh Mohammed bin Rashid Boulevard\nDubai\nUnited Arab Emirates',
+    '4059 Mt Lee Drive\nLos Angeles, 90068\nUnited States',
+    '1060 West Addison Street\nChicago, 60613\nUnited States',
+    '1 Jacksonville Landing Drive\nJacksonville, 32202\nUnited States',
+    '400 Broad Street\nSeattle, 98109\nUnited States',
+    'Golden Gate Bridge\nSan Francisco, 94129\nUnited States',
+    '1 Rue de la Paix\nParis, 75002\nFrance',
+    'Hauptstraße 1\nHeidelberg, 69117\nDeutschland',
+    'Llanfairpwllgwyngyllgogerychwyrndrobwllllantysiliogogogoch\nAnglesey, LL61 5UJ\nUnited Kingdom',
+    'Taumatawhakatangihangakoauauotamateaturipukakapikimaungahoronukupokaiwhenuakitanatahu\nHawke\'s Bay\nNew Zealand',
+    'Donaudampfschifffahrtsgesellschaftskapitänswitwenrentenversicherungsanstalt 7\nWien, 1010\nÖsterreich',
+    'Unit 4B, Riverside Industrial Estate, Off Old Kent Road\nLondon, SE1 5HE\nUnited Kingdom',
+    'Avenue des Champs-Élysées 101\nParis, 75008\nFrance',
+    'Via della Conciliazione 4\nCittà del Vaticano, 00120\nVatican City',
+    '600 Montgomery Street\nSan Francisco, 94111\nUnited States',
+    'Ocean Drive 1001\nMiami Beach, 33139\nUnited States',
+    'Nyhavn 17\nKøbenhavn, 1051\nDanmark',
+    'Aleje Jerozolimskie 54\nWarszawa, 00-024\nPolska',
+]
+WIDTHS = sorted({px for _, px in QUALITY_PRESETS} | {384, 220, 150})   # canvas px -> chip text width
+
+_KERN = {'AV': -1.1, 'VA': -1.1, 'To': -1.4, 'Ty': -1.2, 'Wa': -0.9, 'We': -0.8, 'Yo': -1.3,
+         'LT': -1.2, 'r.': -0.7, 'y,': -0.6, 'fi': -0.3, 'ff': -0.2}
+
+def _pillow_measure(kerned):
+    font = load_font(FONT_CHIP)
+    lh = sum(font.getmetrics())
+    def measure(text):
+        w = font.getlength(text)
+        if kerned:
+            w += sum(_KERN.get(text[i:i + 2], 0.0) for i in range(len(text) - 1)) + 0.013 * len(text)
+        return w, lh
+    return measure
+
+def _counting(fn):
+    calls, seen = [0], set()
+    def measure(text):
+        calls[0] += 1; seen.add(text)
+        return fn(text)
+    return measure, calls, seen
+
+def run():
+    line_h = 18
+    print(f'{"measure":<9}{"layouts":>8}{"match":>7}{"old calls":>11}{"old ui calls":>14}'
+          f'{"new ui calls":>14}{"(table)":>9}{"old ms":>9}{"new ms":>9}   new cache')
+    for kerned in (False, True):
+        raw = _pillow_measure(kerned)
+        old, calls, seen = _counting(raw)
+        metrics = TextMetrics(raw)
+        metrics.width('')                      # builds the glyph table + calibration once
+        build = metrics.measure_calls
+        matched = total = 0
+        t_old = t_new = 0.0
+        for w in WIDTHS:
+            for addr in CORPUS:
+                t0 = time.perf_counter()
+                a = address_chip_layout(w, w, addr, old, line_h)
+                t1 = time.perf_counter()
+                b = address_chip_layout(w, w, addr, metrics, line_h)
+                t_new += time.perf_counter() - t1; t_old += t1 - t0
+                total += 1
+                if a == b:
+                    matched += 1
+                else:
+                    print('  MISMATCH', w, repr(addr), a[0], b[0])
+        st = metrics.stats()
+        # old ui calls: distinct strings, i.e. what the unbounded dict cache sent to ui.measure_string
+        print(f'{"kerned" if kerned else "plain":<9}{total:>8}{matched:>7}{calls[0]:>11}{len(seen):>14}'
+              f'{st["measure_calls"]:>14}{build:>9}{t_old * 1000:>9.1f}{t_new * 1000:>9.1f}'
+              f'   {st["entries"]} entries, {st["glyphs"]} glyphs, {st["glyph_fallbacks"]} fallbacks, '
+              f'err {st["err_per_char"]:.3f} px/char')
+
+if __name__ == '__main__':
+    run()
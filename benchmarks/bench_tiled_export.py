@@ -0,0 +1,59 @@
+# coding: utf-8
+# Benchmark: peak RSS and time vs output size, single-pass render (whole canvas in memory)
+# vs TiledExporter (sub-snapshots + strips streamed into the PNG). Each run is a separate
+# process so ru_maxrss is that run's own peak. Synthetic snapshot source, PNG level 1.
+#
+#   python benchmarks/bench_tiled_export.py --sizes 2048,4096,8192,16384 --rotation 30
+
+import os, sys, json, argparse, resource, subprocess, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import recon_engine as eng
+
+SINGLE_PASS_MAX_PX = 8192   # beyond this the single-pass baseline needs several GB
+
+def _peak_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0 * 1024.0) if sys.platform == 'darwin' else rss / 1024.0
+
+def _one(mode, px, rotation, out_dir):
+    job = eng.BatchJob(30.33218, -81.65565, 800.0, 'satellite', rotation, px, f'{mode}_{px}',
+                       '1 Independent Drive\nJacksonville, 32202, United States')
+    r = eng.HeadlessRenderer(eng.SyntheticSnapshotSource(), eng.PillowBackend())
+    base = _peak_mb()
+    t0 = time.perf_counter()
+    path, _ = r.render_to_file(job, out_dir, 'png', png_level=1, tiled_px=px if mode == 'tiled' else None)
+    return {'seconds': time.perf_counter() - t0, 'peak_mb': _peak_mb(), 'base_mb': base,
+            'file_mb': os.path.getsize(path) / 1e6}
+
+def run(sizes, rotation):
+    out_dir = tempfile.mkdtemp()
+    print(f'rotation {rotation:g}°, strips of {eng.STRIP_PIXELS} px, tiles ≤ {eng.MAX_SNAPSHOT_PX} px, '
+          f'tile cache {eng.TILE_CACHE_BYTES >> 20} MB')
+    print(f'{"px":>6} {"mode":<8}{"bitmap MB":>10}{"peak RSS MB":>13}{"time s":>9}{"PNG MB":>9}')
+    for px in sizes:
+        for mode in ('single', 'tiled'):
+            if mode == 'single' and px > SINGLE_PASS_MAX_PX:
+                print(f'{px:>6} {mode:<8}{px * px * 4 / 2 ** 20:>10.0f}{"(skipped)":>13}')
+                continue
+            res = subprocess.run([sys.executable, os.path.abspath(__file__), '--one', mode, str(px),
+                                  str(rotation), out_dir], capture_output=True, text=True)
+            if res.returncode:
+                print(f'{px:>6} {mode:<8} failed: {res.stderr.strip().splitlines()[-1]}')
+                continue
+            r = json.loads(res.stdout)
+            print(f'{px:>6} {mode:<8}{px * px * 4 / 2 ** 20:>10.0f}{r["peak_mb"]:>13.0f}'
+                  f'{r["seconds"]:>9.1f}{r["file_mb"]:>9.1f}')
+    print(f'(interpreter + imports ≈ {r["base_mb"]:.0f} MB of each peak)')
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--sizes', default='2048,4096,8192,16384')
+    ap.add_argument('--rotation', type=float, default=30.0)
+    ap.add_argument('--one', nargs=4, metavar=('MODE', 'PX', 'ROT', 'OUT'), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.one:
+        mode, px, rot, out = args.one
+        print(json.dumps(_one(mode, int(px), float(rot), out)))
+    else:
+        run([int(s) for s in args.sizes.split(',')], args.rotation)
@@ -0,0 +1,16 @@
+# coding: utf-8
+# Stand-in for Pythonista's console module.
+
+quicklooked = []
+
+def quicklook(path):
+    quicklooked.append(path)
+
+def hud_alert(message, icon='success', duration=1.8):
+    pass
+
+def show_activity(message=''):
+    pass
+
+def hide_activity():
+    pass
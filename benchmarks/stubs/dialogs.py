@@ -0,0 +1,19 @@
+# coding: utf-8
+# Stand-in for Pythonista's dialogs module: alerts are recorded and answered with button 1.
+
+alerts = []
+
+def alert(title, message='', button1='OK', button2='', button3='', hide_cancel_button=False):
+    alerts.append((title, message))
+    return 1
+
+def hud_alert(message, icon='success', duration=1.8):
+    alerts.append(('hud', message))
+
+def input_alert(title, message='', input='', ok_button_title='OK', hide_cancel_button=False):
+    return input
+
+document = None   # path pick_document returns (None: the picker was cancelled)
+
+def pick_document(types=('public.data',)):
+    return document
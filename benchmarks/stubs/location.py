@@ -0,0 +1,78 @@
+# coding: utf-8
+# Stand-in for Pythonista's location module: a fixed GPS fix, deterministic snapshots and a
+# fixed Apple placemark. SNAPSHOT_DELAY / GEOCODE_DELAY (seconds) simulate network latency.
+# ScriptedProvider replays a timed sequence of fixes for LocationService.
+
+import time
+
+import ui
+
+FIX = {'latitude': 30.33218, 'longitude': -81.65565, 'altitude': 5.0,
+       'horizontal_accuracy': 8.0, 'vertical_accuracy': 10.0, 'speed': 0.0, 'course': -1.0}
+PLACEMARK = {'SubThoroughfare': '1', 'Thoroughfare': 'Independent Drive', 'City': 'Jacksonville',
+             'ZIP': '32202', 'State': 'FL', 'Country': 'United States', 'CountryCode': 'US',
+             'SubAdministrativeArea': 'Duval County'}
+SNAPSHOT_DELAY = 0.0
+GEOCODE_DELAY = 0.0
+calls = {'render_map_snapshot': 0, 'reverse_geocode': 0}
+_updating = [False]
+
+def is_authorized():
+    return True
+
+def start_updates():
+    _updating[0] = True
+
+def stop_updates():
+    _updating[0] = False
+
+def get_location():
+    return dict(FIX, timestamp=time.time()) if _updating[0] else None
+
+def render_map_snapshot(lat, lng, width=1000, height=1000, map_type='standard', img_width=1024,
+                        img_height=1024, show_poi=True):
+    calls['render_map_snapshot'] += 1
+    if SNAPSHOT_DELAY:
+        time.sleep(SNAPSHOT_DELAY)
+    return ui.Image(img_width, img_height)
+
+def reverse_geocode(loc):
+    calls['reverse_geocode'] += 1
+    if GEOCODE_DELAY:
+        time.sleep(GEOCODE_DELAY)
+    return [dict(PLACEMARK)]
+
+def geocode(address):
+    return [dict(FIX)]
+
+class ScriptedProvider(object):
+    """Location provider replaying [(seconds after start_updates, fix dict)].
+
+    get_location returns the latest fix that is due, stamped with the wall time
+    it became due, or None while updates are stopped or nothing is due yet.
+    Each start_updates replays the script from the beginning.
+    """
+    def __init__(self, script):
+        self.script = sorted(script, key=lambda e: e[0])
+        self._t0 = None
+        self.calls = {'start_updates': 0, 'stop_updates': 0, 'get_location': 0}
+
+    def start_updates(self):
+        self.calls['start_updates'] += 1
+        if self._t0 is None:
+            self._t0 = time.monotonic(), time.time()
+
+    def stop_updates(self):
+        self.calls['stop_updates'] += 1
+        self._t0 = None
+
+    def get_location(self):
+        self.calls['get_location'] += 1
+        if self._t0 is None:
+            return None
+        elapsed = time.monotonic() - self._t0[0]
+        due = [(t, fix) for t, fix in self.script if t <= elapsed]
+        if not due:
+            return None
+        t, fix = due[-1]
+        return dict(FIX, timestamp=self._t0[1] + t, **fix)
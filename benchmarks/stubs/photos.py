@@ -0,0 +1,11 @@
+# coding: utf-8
+# Stand-in for Pythonista's photos module: records saved asset paths instead of touching Photos.
+
+saved = []
+
+def create_image_asset(path):
+    saved.append(path)
+    return path
+
+def get_assets(media_type='image'):
+    return []
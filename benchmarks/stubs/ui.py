@@ -0,0 +1,245 @@
+# coding: utf-8
+# Stand-in for Pythonista's ui module so benchmarks run on plain Python.
+# Deterministic: images are size records, text is measured from a fixed advance table, and
+# every drawing call is tallied in OPS so a benchmark can report the work done per call.
+# Views accept any attribute; in_background and delay run synchronously.
+
+import struct
+from collections import Counter
+
+OPS = Counter()   # 'context', 'px_alloc', 'image_draw', 'px_drawn', 'fill', 'stroke', 'clip', ...
+
+def reset_ops():
+    OPS.clear()
+
+ALIGN_LEFT, ALIGN_CENTER, ALIGN_RIGHT, ALIGN_JUSTIFIED, ALIGN_NATURAL = 0, 1, 2, 3, 4
+LB_WORD_WRAP, LB_CHAR_WRAP, LB_CLIP, LB_TRUNCATE_HEAD, LB_TRUNCATE_TAIL, LB_TRUNCATE_MIDDLE = range(6)
+CONTENT_SCALE_TO_FILL, CONTENT_SCALE_ASPECT_FIT, CONTENT_SCALE_ASPECT_FILL = 0, 1, 2
+
+# ---------- Images ----------
+class Image(object):
+    def __init__(self, width=1, height=1, scale=1.0):
+        self.size = (width, height)
+        self.scale = scale
+
+    def draw(self, x=0, y=0, width=None, height=None):
+        w = self.size[0] if width is None else width
+        h = self.size[1] if height is None else height
+        OPS['image_draw'] += 1
+        OPS['px_drawn'] += int(abs(w * h))
+
+    def _encoded(self, magic):
+        w, h = int(self.size[0] * self.scale), int(self.size[1] * self.scale)
+        return magic + struct.pack('>II', w, h) + bytes(64)
+
+    def to_png(self):
+        OPS['encode'] += 1
+        return self._encoded(b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR')
+
+    def to_jpeg(self, quality=0.9):
+        OPS['encode'] += 1
+        return self._encoded(b'\xff\xd8\xff\xe0')
+
+    @classmethod
+    def from_data(cls, data, scale=1.0):
+        if data[:4] == b'\x89PNG' and len(data) >= 24:
+            w, h = struct.unpack('>II', data[16:24])
+            return cls(w / scale, h / scale, scale)
+        return cls(1, 1, scale)
+
+    @classmethod
+    def named(cls, name):
+        return cls(64, 64)
+
+class ImageContext(object):
+    def __init__(self, width, height, scale=1.0):
+        self.width, self.height, self.scale = width, height, scale
+
+    def __enter__(self):
+        OPS['context'] += 1
+        OPS['px_alloc'] += int(self.width * self.height * self.scale * self.scale)
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get_image(self):
+        return Image(self.width, self.height, self.scale)
+
+# ---------- Drawing ----------
+class Transform(object):
+    def __init__(self, kind='identity', args=()):
+        self.kind, self.args = kind, args
+
+    @classmethod
+    def rotation(cls, rad):
+        return cls('rotation', (rad,))
+
+    @classmethod
+    def translation(cls, tx, ty):
+        return cls('translation', (tx, ty))
+
+    @classmethod
+    def scale(cls, sx, sy):
+        return cls('scale', (sx, sy))
+
+    def concat(self, other):
+        return Transform('concat', (self, other))
+
+    def invert(self):
+        return Transform('invert', (self,))
+
+def concat_ctm(transform):
+    OPS['ctm'] += 1
+
+def set_color(color):
+    OPS['set_color'] += 1
+
+def set_blend_mode(mode):
+    pass
+
+class GState(object):
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+class Path(object):
+    def __init__(self):
+        self.line_width = 1.0
+        self.line_cap_style = self.line_join_style = 0
+        self.segments = 0
+
+    @classmethod
+    def rect(cls, x, y, w, h):
+        p = cls(); p.segments = 4; return p
+
+    @classmethod
+    def oval(cls, x, y, w, h):
+        p = cls(); p.segments = 4; return p
+
+    @classmethod
+    def rounded_rect(cls, x, y, w, h, corner_radius):
+        p = cls(); p.segments = 8; return p
+
+    def move_to(self, x, y): self.segments += 1
+    def line_to(self, x, y): self.segments += 1
+    def add_arc(self, *args): self.segments += 1
+    def add_curve(self, *args): self.segments += 1
+    def add_quad_curve(self, *args): self.segments += 1
+    def append_path(self, other): self.segments += other.segments
+    def close(self): pass
+    def set_line_dash(self, *args): pass
+
+    def fill(self):
+        OPS['fill'] += 1
+
+    def stroke(self):
+        OPS['stroke'] += 1
+
+    def add_clip(self):
+        OPS['clip'] += 1
+
+# ---------- Text ----------
+# Advance widths in em; deterministic and roughly proportional like the system font.
+_ADV = {}
+for _chars, _em in (('il.,:;|!\'`', 0.26), ('fjrtI()[]{}-/ ', 0.34), ('mwMW@%', 0.86),
+                    ('0123456789', 0.56), ('ABCDEFGHJKLNOPQRSTUVXYZ', 0.66), ('•°', 0.40)):
+    for _c in _chars:
+        _ADV[_c] = _em
+_DEFAULT_EM = 0.53
+
+def _line_width(line, size, bold):
+    em = sum(_ADV.get(c, _DEFAULT_EM) for c in line)
+    return round(em * size * (1.05 if bold else 1.0), 2)
+
+def measure_string(s, max_width=0, font=('<System>', 12), alignment=ALIGN_LEFT, line_break_mode=LB_WORD_WRAP):
+    OPS['measure_string'] += 1
+    name, size = font
+    lines = str(s).split('\n')
+    w = max(_line_width(line, size, 'Bold' in name) for line in lines)
+    if max_width:
+        w = min(w, max_width)
+    return (w, round(size * 1.2 * len(lines), 2))
+
+def draw_string(s, rect=(0, 0, 0, 0), font=('<System>', 12), color=None, alignment=ALIGN_LEFT,
+                line_break_mode=LB_WORD_WRAP):
+    OPS['draw_string'] += 1
+
+# ---------- Views (attribute bags) ----------
+class View(object):
+    def __init__(self, frame=(0, 0, 100, 100), **kwargs):
+        self.x, self.y, self.width, self.height = frame
+        self.subviews = []
+        self.hidden = False
+        self.enabled = True
+        self.flex = ''
+        self.name = ''
+        self.superview = None
+        for k, v in kwargs.items():
+            setattr(self, k, v)
+
+    @property
+    def frame(self):
+        return (self.x, self.y, self.width, self.height)
+
+    @frame.setter
+    def frame(self, f):
+        self.x, self.y, self.width, self.height = f
+
+    def add_subview(self, v):
+        v.superview = self
+        self.subviews.append(v)
+
+    def remove_subview(self, v):
+        if v in self.subviews:
+            self.subviews.remove(v)
+
+    def set_needs_display(self):
+        pass
+
+    def present(self, style='default', **kwargs):
+        pass
+
+    def close(self):
+        pass
+
+class Button(View): pass
+class Label(View):
+    def __init__(self, frame=(0, 0, 100, 32), **kwargs):
+        self.text = ''
+        super(Label, self).__init__(frame, **kwargs)
+
+class ImageView(View):
+    def __init__(self, frame=(0, 0, 100, 100), **kwargs):
+        self.image = None
+        super(ImageView, self).__init__(frame, **kwargs)
+
+class Switch(View): pass
+class TextView(View): pass
+class ScrollView(View): pass
+class ActivityIndicator(View):
+    def start(self): pass
+    def stop(self): pass
+
+class Slider(View):
+    def __init__(self, frame=(0, 0, 100, 24), **kwargs):
+        self.value = 0.0
+        super(Slider, self).__init__(frame, **kwargs)
+
+class SegmentedControl(View):
+    def __init__(self, frame=(0, 0, 100, 32), **kwargs):
+        self.segments = []
+        self.selected_index = 0
+        super(SegmentedControl, self).__init__(frame, **kwargs)
+
+# ---------- Threading helpers ----------
+def in_background(fn):
+    return fn
+
+def delay(fn, seconds):
+    fn()
+
+def cancel_delays():
+    pass
+
+def get_screen_size():
+    return (430.0, 932.0)
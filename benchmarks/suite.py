@@ -0,0 +1,196 @@
+# coding: utf-8
+# Benchmark suite for the compositing core, runnable on plain Python: when Pythonista's
+# modules are missing, the stand-ins in benchmarks/stubs are used (deterministic images,
+# text metrics and drawing-op counters).
+#
+#   python benchmarks/suite.py --out base.json                 # record
+#   python benchmarks/suite.py --compare base.json --threshold 0.15
+#
+# Cases cover draw_overlays, rotate_image_fill_square, _wrap_text_to_width, the compact
+# address formatters and get_snapshot's cache paths, over QUALITY_PRESETS, grid divisions,
+# rotation angles and address lengths. Each case records best / median microseconds per call
+# and, under the stubs, drawing ops per call. Ops are deterministic, so any increase is
+# reported as a regression regardless of timing noise.
+
+import argparse, json, os, platform, statistics, subprocess, sys, time, timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+try:
+    import ui
+except ImportError:
+    sys.path.insert(0, os.path.join(HERE, 'stubs'))
+    import ui
+
+import recon_pipeline as rp
+from recon_core import QUALITY_PRESETS, FONT_CHIP, _format_compact_apple, _format_compact_osm
+
+LAT, LON, METERS = 30.33218, -81.65565, 800
+GRID_DIVISIONS = (2, 4, 5)
+ROTATIONS = (0.0, 30.0, 45.0)
+ADDRESSES = {
+    'short': '1 Main St\nOcala, 34470',
+    'medium': '1600 Pennsylvania Avenue NW\nWashington, 20500, United States',
+    'long': 'Unit 4B, Riverside Industrial Estate, Off Old Kent Road\nLondon, SE1 5HE, United Kingdom',
+    'xlong': 'Taumatawhakatangihangakoauauotamateaturipukakapikimaungahoronukupokaiwhenuakitanatahu '
+             'Road, Porangahau Station\nHawke\'s Bay 4292, New Zealand',
+}
+WRAP_WIDTHS = (120, 304)
+APPLE_PLACEMARKS = {
+    'full': {'SubThoroughfare': '1600', 'Thoroughfare': 'Pennsylvania Avenue NW', 'City': 'Washington',
+             'ZIP': '20500', 'State': 'DC', 'Country': 'United States', 'SubAdministrativeArea': 'District of Columbia'},
+    'sparse': {'SubLocality': 'Mitte', 'AdministrativeArea': 'Berlin', 'Country': 'Germany'},
+}
+OSM_RESULTS = {
+    'full': {'address': {'house_number': '10', 'road': 'Downing Street', 'city': 'London',
+                         'postcode': 'SW1A 2AA', 'country': 'United Kingdom', 'county': 'Greater London'}},
+    'sparse': {'address': {'hamlet': 'Porangahau', 'country': 'New Zealand'}},
+}
+
+# ---------- Cases ----------
+def _clear_render_caches():
+    rp._overlay_cache.clear(); rp._composite_cache.clear()
+
+def _cases():
+    """-> [(name, fn)]; fn() is one call of the thing being measured."""
+    cases = []
+    for preset, px in QUALITY_PRESETS:
+        base = ui.Image(px, px)
+        for n in GRID_DIVISIONS:
+            for rot in ROTATIONS:
+                def overlays(cold, base=base, n=n, rot=rot):
+                    if cold:
+                        _clear_render_caches()
+                    rp.draw_overlays(base, METERS, 'satellite', LAT, LON, rotation_deg=rot,
+                                     grid_divisions=n, full_addr=ADDRESSES['medium'])
+                tag = f'{preset.lower()}/grid{n}/rot{rot:g}'
+                cases.append((f'overlays/{tag}/cold', lambda f=overlays: f(True)))
+                cases.append((f'overlays/{tag}/warm', lambda f=overlays: f(False)))
+        for rot in ROTATIONS[1:]:
+            key = rp.snapshot_key(LAT, LON, METERS, 'satellite', px)
+            def rotate(cold, base=base, rot=rot, key=key):
+                if cold:
+                    rp._rotation_cache.clear()
+                rp.rotate_image_fill_square(base, rot, cache_key=key)
+            cases.append((f'rotate/{preset.lower()}/rot{rot:g}/cold', lambda f=rotate: f(True)))
+            cases.append((f'rotate/{preset.lower()}/rot{rot:g}/warm', lambda f=rotate: f(False)))
+        def snapshot(hit, px=px):
+            if not hit:
+                rp._snapshot_cache.clear()
+            rp.get_snapshot(LAT, LON, METERS, 'satellite', px)
+        cases.append((f'snapshot/{preset.lower()}/miss', lambda f=snapshot: f(False)))
+        cases.append((f'snapshot/{preset.lower()}/hit', lambda f=snapshot: f(True)))
+    for name, text in ADDRESSES.items():
+        for width in WRAP_WIDTHS:
+            def wrap(cold, text=text, width=width):
+                if cold:
+                    for m in list(rp._text_metrics.values()):
+                        m._cache.clear()
+                for para in text.split('\n'):
+                    rp._wrap_text_to_width(para, FONT_CHIP, width)
+            cases.append((f'wrap/{name}/w{width}/cold', lambda f=wrap: f(True)))
+            cases.append((f'wrap/{name}/w{width}/warm', lambda f=wrap: f(False)))
+    for name, d in APPLE_PLACEMARKS.items():
+        cases.append((f'format/apple/{name}', lambda d=d: _format_compact_apple(d)))
+    for name, d in OSM_RESULTS.items():
+        cases.append((f'format/osm/{name}', lambda d=d: _format_compact_osm(d)))
+    return cases
+
+# ---------- Measurement ----------
+def _ops_per_call(fn):
+    ops = getattr(ui, 'OPS', None)
+    if ops is None:
+        return None
+    fn()
+    ui.reset_ops()
+    fn()
+    return dict(sorted(ops.items()))
+
+def measure(fn, repeat=5, min_time=0.02):
+    fn()                                           # warm-up (also builds one-off tables)
+    number, t = 1, 0.0
+    while True:
+        t = timeit.timeit(fn, number=number)
+        if t >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if t <= 0 else max(2, min(10, int(min_time / t) + 1))
+    runs = [t] + timeit.repeat(fn, number=number, repeat=repeat - 1)
+    per = [r / number * 1e6 for r in runs]
+    return {'best_us': min(per), 'median_us': statistics.median(per), 'number': number,
+            'ops': _ops_per_call(fn)}
+
+def _meta():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+            'stubs': hasattr(ui, 'OPS'), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+def run_suite(filter_=None, repeat=5, min_time=0.02, verbose=True):
+    results = {}
+    for name, fn in _cases():
+        if filter_ and filter_ not in name:
+            continue
+        results[name] = r = measure(fn, repeat, min_time)
+        if verbose:
+            print(f'{name:<40}{r["best_us"]:>11.1f} µs best{r["median_us"]:>11.1f} µs median')
+    return {'meta': _meta(), 'results': results}
+
+# ---------- Comparison ----------
+def compare(base, cur, threshold=0.15, min_delta_us=1.0):
+    """-> (regressions, improvements) as [(name, base_us, cur_us, ratio, note)].
+
+    A case regresses when best time grows by more than threshold (and min_delta_us), or
+    when any drawing-op count grows.
+    """
+    regressions, improvements = [], []
+    for name, c in cur['results'].items():
+        b = base['results'].get(name)
+        if b is None:
+            continue
+        ratio = c['best_us'] / b['best_us'] if b['best_us'] else 1.0
+        grown = sorted(k for k, v in (c.get('ops') or {}).items() if v > (b.get('ops') or {}).get(k, 0))
+        row = (name, b['best_us'], c['best_us'], ratio, ('ops up: ' + ', '.join(grown)) if grown else '')
+        if grown or (ratio > 1 + threshold and c['best_us'] - b['best_us'] > min_delta_us):
+            regressions.append(row)
+        elif ratio < 1 - threshold and b['best_us'] - c['best_us'] > min_delta_us:
+            improvements.append(row)
+    return regressions, improvements
+
+def _print_rows(title, rows):
+    if rows:
+        print(f'\n{title}:')
+        for name, b, c, ratio, note in rows:
+            print(f'  {name:<40}{b:>10.1f} ->{c:>10.1f} µs  {ratio:>5.2f}x  {note}')
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Compositing-core benchmark suite.')
+    ap.add_argument('--out', help='write results JSON here')
+    ap.add_argument('--compare', metavar='BASELINE', help='results JSON to compare against')
+    ap.add_argument('--threshold', type=float, default=0.15, help='allowed slowdown, e.g. 0.10 = 10%%')
+    ap.add_argument('--filter', help='only cases whose name contains this')
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--quick', action='store_true', help='shorter timing runs (noisier)')
+    args = ap.parse_args(argv)
+    cur = run_suite(args.filter, args.repeat if not args.quick else 3, 0.005 if args.quick else 0.02)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(cur, f, indent=1, sort_keys=True)
+        print(f'\nwrote {len(cur["results"])} results to {args.out}')
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        regressions, improvements = compare(base, cur, args.threshold)
+        print(f'\nvs {args.compare} (commit {base["meta"].get("commit")}), threshold {args.threshold:.0%}')
+        _print_rows('Improvements', improvements)
+        _print_rows('Regressions', regressions)
+        if regressions:
+            return 1
+        print('no regressions')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,617 @@
+# coding: utf-8
+# Satellite Recon — pure compute core shared by the Pythonista app and the headless engine
+# No Pythonista imports: formatting, overlay geometry, caches, Web Mercator helpers
+
+import bisect, csv, io, json, math, threading
+from itertools import accumulate
+from collections import OrderedDict, namedtuple
+
+# ===== Appearance =====
+GRID_ALPHA       = 0.10
+GRID_LABEL_ALPHA = 0.45
+CHIP_ALPHA       = 0.06
+CROSSHAIR_ALPHA  = 0.85
+WHITE            = (1, 1, 1, 1)
+RED              = (1, 0.2, 0.2, 1)
+CAPTION_OFFSET_Y = 26
+OVERLAY_PAD      = 14
+CHIP_PAD         = 8
+NORTH_ARROW_SIZE = 44
+
+MAP_TYPES = ['standard', 'satellite', 'hybrid']
+QUALITY_PRESETS = [
+    ('Standard', 1024),
+    ('High', 1536),
+    ('Ultra', 2048),
+]
+
+MIN_METERS, MAX_METERS = 150.0, 6000.0
+COVERAGE_STEP = 50.0
+ROT_STEP = 1.0
+
+# ===== Fonts (name, size); the app measures them with ui, the engine with Pillow =====
+FONT_CHIP = ('<System>', 12)
+FONT_CAPTION = ('<System>', 12)
+FONT_SCALE = ('<System>', 13)
+FONT_NORTH = ('<System-Bold>', 14)
+FONT_GRID = ('<System>', 10)
+
+# ===== Caches =====
+class LRUCache(object):
+    """Thread-safe LRU map with an approximate byte budget and hit/miss/eviction counters."""
+    def __init__(self, max_bytes=None, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._data = OrderedDict()   # key -> (value, nbytes)
+        self._lock = threading.RLock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes=1):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[key] = (value, nbytes)
+            self.bytes += nbytes
+            self._evict()
+        return value
+
+    def items(self):
+        """Snapshot of (key, value) pairs, oldest first; does not touch recency."""
+        with self._lock:
+            return [(k, v[0]) for k, v in self._data.items()]
+
+    def discard(self, key):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def _evict(self):
+        # Always keep the newest entry, even if it alone exceeds the budget.
+        while len(self._data) > 1 and (
+                (self.max_bytes is not None and self.bytes > self.max_bytes) or
+                (self.max_entries is not None and len(self._data) > self.max_entries)):
+            _, (_, nb) = self._data.popitem(last=False)
+            self.bytes -= nb
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'entries': len(self._data), 'bytes': self.bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'hit_rate': (self.hits / float(total)) if total else 0.0}
+
+def image_nbytes(img):
+    """Approximate decoded RGBA footprint of a ui.Image or PIL image (pixels, not points)."""
+    w, h = img.size
+    scale = getattr(img, 'scale', 1.0) or 1.0
+    return int(w * scale) * int(h * scale) * 4
+
+def percentiles(samples, ps=(50, 95, 99)):
+    """Nearest-rank percentiles of a sequence of numbers -> {'p50': .., 'p95': .., 'n': ..}."""
+    data = sorted(samples)
+    out = {'n': len(data)}
+    for p in ps:
+        out['p%d' % p] = data[min(len(data) - 1, int(math.ceil(p / 100.0 * len(data))) - 1)] if data else None
+    return out
+
+# ---------- Units & sliders ----------
+def meters_label(m):
+    return f'{int(m)} m' if m < 1000 else f'{m/1000.0:.1f} km'
+
+def nice_scale_length(mpp, max_px=140):
+    for L in [25,50,100,200,250,500,1000,2000,2500,5000,10000,20000][::-1]:
+        if L / mpp <= max_px:
+            return L
+    return 25
+
+def cov_slider_to_meters(v):
+    m = MIN_METERS + v * (MAX_METERS - MIN_METERS)
+    return max(MIN_METERS, min(MAX_METERS, round(m / COVERAGE_STEP) * COVERAGE_STEP))
+
+def meters_to_cov_slider(m):
+    m = max(MIN_METERS, min(MAX_METERS, m))
+    return (m - MIN_METERS) / (MAX_METERS - MIN_METERS)
+
+def rot_slider_to_degrees(v):
+    d = round((v * 360.0) / ROT_STEP) * ROT_STEP
+    return max(0.0, min(360.0, d))
+
+def degrees_to_rot_slider(d):
+    return max(0.0, min(360.0, d)) / 360.0
+
+def rotation_fill_scale(degrees):
+    """Scale that lets a rotated square fully cover the unrotated square canvas."""
+    theta = math.radians(degrees)
+    return abs(math.cos(theta)) + abs(math.sin(theta))
+
+def sweep_angles(step, start=0.0, span_deg=360.0):
+    """Frame angles of a rotation sweep: start, start + step, ... short of start + span_deg."""
+    if step <= 0:
+        raise ValueError('sweep step must be positive')
+    n = max(1, int(math.ceil(span_deg / float(step) - 1e-9)))
+    return [(start + i * step) % 360.0 for i in range(n)]
+
+# ---------- Prefetch candidates ----------
+_TYPE_NEIGHBORS = {'standard': ('satellite', 'hybrid'), 'satellite': ('hybrid', 'standard'),
+                   'hybrid': ('satellite', 'standard')}
+
+def neighbor_views(lat, lon, meters, map_type, sizes):
+    """Views likely to be asked for next, most likely first: other map types, then ±1 coverage step.
+
+    -> [(lat, lon, meters, map_type, img_w)], each view once per size (smallest first).
+    """
+    views = [(meters, t) for t in _TYPE_NEIGHBORS.get(map_type, ())]
+    for m in (meters - COVERAGE_STEP, meters + COVERAGE_STEP):
+        if MIN_METERS <= m <= MAX_METERS:
+            views.append((m, map_type))
+    return [(lat, lon, m, t, w) for m, t in views for w in sorted(set(sizes))]
+
+# ---------- Text metrics (glyph advance tables) ----------
+MEASURE_CACHE_ENTRIES = 512      # real measurements kept per font
+GLYPH_TABLE_CHARS = ''.join(chr(c) for c in range(0x21, 0x7f))
+# Kerning / ligature probes; the worst per-character drift bounds the advance-sum error.
+_CALIBRATION_TEXTS = ('AVAWAYATAVTo Ty Yo We Wa', 'office affluent flight 1111 7777',
+                      '1600 Pennsylvania Avenue NW', 'Jacksonville, FL 32202 United States',
+                      'WWWW iiii MMMM llll ....', 'Lat 30.33218, Lon -81.65565 • Rot 45°')
+
+class TextMetrics(object):
+    """Per-font measurement: glyph advance table for layout decisions, real measurement for sizes.
+
+    measure_fn(text) -> (w, h) is the real (slow) measurement. Advances for GLYPH_TABLE_CHARS are
+    measured once on first use; unknown glyphs are measured one at a time as they appear.
+    Decisions whose advance-sum estimate falls within the calibrated error margin are confirmed
+    with measure_fn, so line breaks match measuring every trial string. Callable as measure(text).
+    """
+    def __init__(self, measure_fn, charset=GLYPH_TABLE_CHARS, cache_entries=MEASURE_CACHE_ENTRIES):
+        self._measure_fn = measure_fn
+        self._charset = charset
+        self._cache = LRUCache(max_entries=cache_entries)   # {text: (w, h)}
+        self._adv = None
+        self._lock = threading.Lock()
+        self.err_per_char = 0.0
+        self.measure_calls = 0      # calls into measure_fn, table build included
+        self.glyph_fallbacks = 0    # glyphs measured individually after the build
+
+    def _raw(self, text):
+        self.measure_calls += 1
+        return self._measure_fn(text)
+
+    def measure(self, text):
+        """Real (w, h) of text, through the bounded LRU."""
+        m = self._cache.get(text)
+        if m is None:
+            m = self._cache.put(text, tuple(self._raw(text)))
+        return m
+
+    __call__ = measure
+
+    def _table(self):
+        if self._adv is None:
+            with self._lock:
+                if self._adv is None:
+                    adv = {ch: self._raw(ch)[0] for ch in self._charset}
+                    adv[' '] = self._raw('x x')[0] - self._raw('xx')[0]   # lone spaces may measure 0
+                    err = 0.0
+                    for t in _CALIBRATION_TEXTS:
+                        est = sum(adv[ch] if ch in adv else self._raw(ch)[0] for ch in t)
+                        err = max(err, abs(self._raw(t)[0] - est) / len(t))
+                    self.err_per_char = err
+                    self._adv = adv
+        return self._adv
+
+    def _advance(self, adv, ch):
+        a = adv.get(ch)
+        if a is None:
+            self.glyph_fallbacks += 1
+            a = adv[ch] = self._raw(ch)[0]
+        return a
+
+    def prefix(self, text):
+        """Cumulative advance-sum widths: p[i] is the estimated width of text[:i]."""
+        adv = self._table()
+        return list(accumulate((self._advance(adv, ch) for ch in text), initial=0.0))
+
+    def width(self, text):
+        """Estimated width: sum of glyph advances (no kerning)."""
+        adv = self._table()
+        return sum(self._advance(adv, ch) for ch in text)
+
+    def slack(self, n_chars):
+        return 0.5 + self.err_per_char * n_chars
+
+    def fits(self, text, max_w, est=None):
+        """measure(text)[0] <= max_w, measuring only when the estimate is too close to call."""
+        if est is None:
+            est = self.width(text)
+        s = self.slack(len(text))
+        if est <= max_w - s:
+            return True
+        if est > max_w + s:
+            return False
+        return self.measure(text)[0] <= max_w
+
+    def fit_prefix(self, text, max_w, prefix=None, start=0):
+        """Largest end such that text[start:end] fits max_w; at least start + 1."""
+        p = prefix if prefix is not None else self.prefix(text)
+        base, n = p[start], len(text)
+        end = max(start, bisect.bisect_right(p, base + max_w - self.slack(n - start), start) - 1)
+        while end < n and p[end + 1] - base <= max_w + self.slack(end + 1 - start):
+            if self.measure(text[start:end + 1])[0] > max_w:
+                break
+            end += 1
+        return max(end, start + 1)
+
+    def max_width(self, texts, cap):
+        """max(min(measure(t)[0], cap)) over texts, measuring only lines that could be the widest."""
+        spans = [(self.width(t), self.slack(len(t)), t) for t in texts]
+        if not spans:
+            return 0
+        floor = max(min(e - sl, cap) for e, sl, _ in spans)
+        best = 0
+        for e, sl, t in spans:
+            if e - sl > cap:
+                return cap
+            if min(e + sl, cap) >= floor:
+                best = max(best, min(self.measure(t)[0], cap))
+        return best
+
+    def stats(self):
+        st = self._cache.stats()
+        st.update(measure_calls=self.measure_calls, glyph_fallbacks=self.glyph_fallbacks,
+                  glyphs=len(self._adv or ()), err_per_char=self.err_per_char)
+        return st
+
+# ---------- Overlay geometry (backend independent) ----------
+# measure(text) -> (width, height) in canvas units for the font in question.
+def overlay_caption(map_type, meters, lat, lon, rotation_deg=0.0):
+    rot_txt = f' • Rot {rotation_deg:.0f}°' if abs(rotation_deg) >= 1.0 else ''
+    return f'{map_type.capitalize()} • {meters_label(meters)} • Lat {lat:.5f}, Lon {lon:.5f}{rot_txt}'
+
+def scale_bar_label(bar_len_m):
+    return f'{int(bar_len_m)} m' if bar_len_m < 1000 else f'{bar_len_m/1000:.1f} km'
+
+def scale_bar_geometry(w, h, meters, mpp_at=None):
+    """-> (bar_len_m, bar_len_px, x_bar, y_bar); the label sits in the 18 px above the bar.
+
+    mpp_at(x, y) gives the true ground resolution (recon_georef.GeoTransform.mpp_at, which
+    accounts for latitude and the rotation fill scale); without it meters / w is used.
+    """
+    pad = OVERLAY_PAD
+    x_bar, y_bar = pad*1.5, h - 20 - pad
+    mpp = meters / float(w) if mpp_at is None else mpp_at(x_bar, y_bar + 3)
+    bar_len_m = nice_scale_length(mpp, max_px=min(180, int(w*0.4)))
+    bar_len_px = bar_len_m / mpp
+    return bar_len_m, bar_len_px, x_bar, y_bar
+
+def grid_label_box(x, y, text_w, text_h):
+    """Background box for a grid-intersection label drawn just below-right of (x, y)."""
+    return (x + 3, y + 3, text_w + 6, text_h + 2)
+
+def north_arrow_rect(w, h):
+    pad = OVERLAY_PAD
+    return (w - NORTH_ARROW_SIZE - pad, pad, NORTH_ARROW_SIZE, NORTH_ARROW_SIZE)
+
+def north_arrow_triangle(w, h, rotation_deg):
+    na_x, na_y, na_size, _ = north_arrow_rect(w, h)
+    cx0, cy0, r = na_x + na_size/2.0, na_y + na_size/2.0, na_size*0.36
+    tri = [(0, -r), (-r*0.72, r*0.72), (r*0.72, r*0.72)]
+    th = math.radians(rotation_deg); ct, st = math.cos(th), math.sin(th)
+    return [(x*ct - y*st + cx0, x*st + y*ct + cy0) for x, y in tri]
+
+def caption_box(w, h, caption_text, measure):
+    """-> ((bx, by, box_w, box_h), (text_w, text_h)) for the bottom-right caption."""
+    pad = OVERLAY_PAD
+    cap_pad = CHIP_PAD
+    text_w, text_h = measure(caption_text)
+    text_h = max(18, text_h)
+    box_w, box_h = text_w + 2*cap_pad, text_h + 2*cap_pad
+    bx, by = w - box_w - pad, h - box_h - pad - CAPTION_OFFSET_Y
+    return (bx, by, box_w, box_h), (text_w, text_h)
+
+def wrap_text(text, max_text_w, measure):
+    """Greedy word wrap; words wider than max_text_w are hard-broken by binary search."""
+    if isinstance(measure, TextMetrics):
+        return _wrap_text_advances(text, max_text_w, measure)
+    words = text.split()
+    lines, cur = [], ''
+    for w in words:
+        trial = (cur + ' ' + w).strip()
+        tw, _ = measure(trial)
+        if tw <= max_text_w or not cur:
+            cur = trial
+        else:
+            lines.append(cur)
+            # Hard-break long words by binary search
+            while True:
+                tw, _ = measure(w)
+                if tw <= max_text_w:
+                    break
+                lo, hi = 1, len(w); fit = 1
+                while lo <= hi:
+                    mid = (lo + hi) // 2
+                    ttw, _ = measure(w[:mid])
+                    if ttw <= max_text_w:
+                        fit = mid; lo = mid + 1
+                    else:
+                        hi = mid - 1
+                lines.append(w[:fit]); w = w[fit:]
+                if not w: break
+            cur = w if w else ''
+    if cur:
+        lines.append(cur)
+    return lines
+
+def _wrap_text_advances(text, max_text_w, metrics):
+    """wrap_text's line breaks from running advance sums: linear in len(text)."""
+    space = metrics.width(' ')
+    lines, cur, cur_w = [], '', 0.0
+    for w in text.split():
+        ww = metrics.width(w)
+        if not cur:
+            cur, cur_w = w, ww
+            continue
+        if metrics.fits(cur + ' ' + w, max_text_w, cur_w + space + ww):
+            cur, cur_w = cur + ' ' + w, cur_w + space + ww
+            continue
+        lines.append(cur)
+        p, start = metrics.prefix(w), 0
+        while not metrics.fits(w[start:], max_text_w, p[-1] - p[start]):
+            end = metrics.fit_prefix(w, max_text_w, p, start)
+            lines.append(w[start:end]); start = end
+        cur, cur_w = w[start:], p[-1] - p[start]
+    if cur:
+        lines.append(cur)
+    return lines
+
+def address_chip_layout(w, h, addr_text, measure, line_h):
+    """Wrap the address and size its chip -> (lines, max_text_w, (bx, by, box_w, box_h))."""
+    pad = OVERLAY_PAD
+    cap_pad = CHIP_PAD
+    max_chip_w = min(int(w * 0.80), 320)
+    max_text_w = max_chip_w - 2 * cap_pad
+
+    paragraphs = [p.strip() for p in addr_text.split('\n') if p.strip()]
+    lines = []
+    for para in paragraphs:
+        lines.extend(wrap_text(para, max_text_w, measure))
+
+    if isinstance(measure, TextMetrics):
+        text_w = measure.max_width(lines, max_text_w)
+    else:
+        text_w = 0
+        for line in lines:
+            lw, _ = measure(line)
+            text_w = max(text_w, min(lw, max_text_w))
+    text_h = line_h * max(1, len(lines))
+
+    box_w, box_h = min(max_chip_w, text_w + 2*cap_pad), text_h + 2*cap_pad
+    return lines, max_text_w, (pad, pad, box_w, box_h)
+
+def pixel_rect(x, y, w, h):
+    """Smallest integer rect covering (x, y, w, h)."""
+    x0, y0 = math.floor(x), math.floor(y)
+    return (x0, y0, int(math.ceil(x + w) - x0), int(math.ceil(y + h) - y0))
+
+# ---------- Address formatting (Address, City, ZIP, Country ONLY) ----------
+def _fmt_nonempty(parts, sep=' '):
+    return sep.join([p for p in parts if p])
+
+def _first_nonempty(*vals):
+    for v in vals:
+        if v:
+            return v
+    return None
+
+def _format_compact_apple(d):
+    """Apple placemark -> 'house+street' on first line, 'City ZIP, Country' on second."""
+    # Street/house
+    house = _first_nonempty(d.get('SubThoroughfare'), d.get('HouseNumber'))
+    street = _first_nonempty(d.get('Thoroughfare'), d.get('Street'))
+    addr_line = _fmt_nonempty([house, street])
+
+    # City: prefer Locality/City; avoid county (SubAdministrativeArea) unless nothing else exists.
+    city = _first_nonempty(
+        d.get('Locality'),
+        d.get('City'),
+        d.get('SubLocality'),            # neighborhoods like Mitte (only if no City)
+        None                             # explicit stop: don't auto-pick county/state below
+    )
+    if not city:
+        # Last-resort fallback — if there's absolutely no city; still avoid showing county if possible
+        city = _first_nonempty(d.get('AdministrativeArea')) or _first_nonempty(d.get('SubAdministrativeArea'))
+
+    # ZIP: Apple may use PostalCode or legacy ZIP
+    zipc = _first_nonempty(d.get('PostalCode'), d.get('ZIP'))
+
+    country = d.get('Country')
+
+    top = addr_line or ''
+    city_zip = _fmt_nonempty([city, zipc]) if (city or zipc) else ''
+    bottom = _fmt_nonempty([city_zip, country], sep=', ')
+    text = (top + '\n' + bottom).strip()
+    return text if text else None
+
+def _format_compact_osm(data):
+    """OSM -> same two-line format."""
+    a = data.get('address') or {}
+    # Address line
+    house = a.get('house_number')
+    road = _first_nonempty(a.get('road'), a.get('pedestrian'), a.get('footway'), a.get('path'))
+    addr_line = _fmt_nonempty([house, road])
+
+    # City
+    city = _first_nonempty(a.get('city'), a.get('town'), a.get('village'), a.get('hamlet'),
+                           a.get('municipality'), a.get('suburb'))
+
+    # ZIP
+    zipc = a.get('postcode')
+
+    country = a.get('country')
+
+    top = addr_line or ''
+    city_zip = _fmt_nonempty([city, zipc]) if (city or zipc) else ''
+    bottom = _fmt_nonempty([city_zip, country], sep=', ')
+    text = (top + '\n' + bottom).strip()
+    return text if text else None
+
+# ---------- Web Mercator ----------
+EARTH_RADIUS_M = 6378137.0          # WGS84 / EPSG:3857 sphere
+TILE_SIZE = 256
+
+def ground_mpp(lat, zoom, tile_size=TILE_SIZE):
+    """Ground metres per pixel of a Web Mercator tile pyramid at lat, zoom."""
+    return math.cos(math.radians(lat)) * 2 * math.pi * EARTH_RADIUS_M / (tile_size * 2 ** zoom)
+
+def latlon_to_world_px(lat, lon, zoom, tile_size=TILE_SIZE):
+    """Lat/lon -> global pixel coordinates (x right, y down) at zoom."""
+    n = tile_size * 2 ** zoom
+    lat = max(-85.05112878, min(85.05112878, lat))
+    s = math.sin(math.radians(lat))
+    x = (lon + 180.0) / 360.0 * n
+    y = (0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)) * n
+    return x, y
+
+def world_px_to_latlon(x, y, zoom, tile_size=TILE_SIZE):
+    n = tile_size * 2 ** zoom
+    lon = x / n * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    return lat, lon
+
+# ---------- Tile pyramid addressing ----------
+def pyramid_zoom(lat, meters, img_w, tile_px=TILE_SIZE, zooms=range(0, 21)):
+    """Zoom whose tiles come closest to the requested ground resolution (log scale)."""
+    zooms = list(zooms)
+    want = meters / float(img_w)
+    z = math.log2(math.cos(math.radians(lat)) * 2 * math.pi * EARTH_RADIUS_M / (tile_px * want))
+    return max(zooms[0], min(zooms[-1], int(round(z))))
+
+def pyramid_cover(lat, lon, meters, img_w, tile_px=TILE_SIZE, zooms=range(0, 21)):
+    """Tiles covering a meters-square view at img_w px -> (zoom, [(tx, ty, dx, dy, dsize)]).
+
+    (dx, dy, dsize) is where tile (tx, ty) lands on the img_w x img_w output, so
+    drawing every tile there crops and resamples the pyramid into the view.
+    """
+    z = pyramid_zoom(lat, meters, img_w, tile_px, zooms)
+    cx, cy = latlon_to_world_px(lat, lon, z, tile_px)
+    half = meters / 2.0 / ground_mpp(lat, z, tile_px)
+    x0, y0 = cx - half, cy - half
+    k = img_w / (2.0 * half)
+    n = 2 ** z
+    tiles = []
+    for ty in range(max(0, int(math.floor(y0 / tile_px))), min(n - 1, int(math.floor((cy + half) / tile_px))) + 1):
+        for tx in range(int(math.floor(x0 / tile_px)), int(math.floor((cx + half) / tile_px)) + 1):
+            tiles.append((tx % n, ty, (tx * tile_px - x0) * k, (ty * tile_px - y0) * k, tile_px * k))
+    return z, tiles
+
+def pyramid_tile_view(tx, ty, z, tile_px=TILE_SIZE):
+    """Snapshot request for one tile -> (lat, lon, meters) of its centre and ground width."""
+    lat, lon = world_px_to_latlon((tx + 0.5) * tile_px, (ty + 0.5) * tile_px, z, tile_px)
+    return lat, lon, tile_px * ground_mpp(lat, z, tile_px)
+
+# ---------- Site lists & contact sheets (atlas export) ----------
+AtlasSite = namedtuple('AtlasSite', 'lat lon meters map_type rotation name')
+
+_SITE_COLUMNS = {'latitude': 'lat', 'lng': 'lon', 'longitude': 'lon', 'coverage': 'meters',
+                 'type': 'map_type', 'title': 'name'}
+
+def _site(fields, where, default_meters, default_map_type):
+    """One CSV row / GeoJSON properties dict -> AtlasSite; ValueError names the row or feature."""
+    f = {}
+    for k, v in fields.items():
+        if k is not None and v not in (None, ''):
+            k = str(k).strip().lower()
+            f[_SITE_COLUMNS.get(k, k)] = v.strip() if isinstance(v, str) else v
+    try:
+        lat, lon = float(f['lat']), float(f['lon'])
+        meters = float(f.get('meters', default_meters))
+        rotation = float(f.get('rotation', 0.0))
+    except KeyError as e:
+        raise ValueError(f'{where}: missing {e.args[0]}')
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'{where}: {e}')
+    map_type = str(f.get('map_type', default_map_type)).lower()
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise ValueError(f'{where}: lat/lon out of range ({lat}, {lon})')
+    if meters <= 0:
+        raise ValueError(f'{where}: coverage must be positive')
+    if map_type not in MAP_TYPES:
+        raise ValueError(f'{where}: unknown map type {map_type!r}')
+    name = f.get('name')
+    return AtlasSite(lat, lon, meters, map_type, rotation, str(name) if name is not None else None)
+
+def parse_sites(text, kind='csv', default_meters=800.0, default_map_type='satellite'):
+    """Site list -> [AtlasSite]. kind 'csv': a header row with lat and lon (or latitude / lng /
+    longitude) and optional meters (coverage), map_type (type), rotation and name (title).
+    kind 'geojson': Point features (or a bare Point / Feature), the same keys as properties.
+    Missing coverage and map type take the defaults."""
+    if kind == 'geojson':
+        doc = json.loads(text)
+        if not isinstance(doc, dict):
+            raise ValueError('GeoJSON must be a FeatureCollection, Feature or Point object')
+        feats = doc.get('features', []) if doc.get('type') == 'FeatureCollection' else [doc]
+        if not isinstance(feats, list):
+            raise ValueError('GeoJSON features must be a list')
+        sites = []
+        for i, feat in enumerate(feats, 1):
+            geom = (feat.get('geometry', feat) if isinstance(feat, dict) else None) or {}
+            if not isinstance(geom, dict) or geom.get('type') != 'Point':
+                raise ValueError(f'feature {i}: only Point geometries are supported')
+            coords = geom.get('coordinates')
+            if not isinstance(coords, list) or len(coords) < 2:
+                raise ValueError(f'feature {i}: Point needs [lon, lat] coordinates')
+            lon, lat = coords[:2]
+            props = dict(feat.get('properties') or {}, lat=lat, lon=lon)
+            sites.append(_site(props, f'feature {i}', default_meters, default_map_type))
+        return sites
+    rows = csv.DictReader(io.StringIO(text.lstrip('\ufeff')))
+    return [_site(row, f'row {i}', default_meters, default_map_type) for i, row in enumerate(rows, 2)]
+
+def load_sites(path, default_meters=800.0, default_map_type='satellite'):
+    """parse_sites() on a .csv / .geojson / .json file."""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    kind = 'geojson' if path.lower().endswith(('.geojson', '.json')) else 'csv'
+    sites = parse_sites(text, kind, default_meters, default_map_type)
+    if not sites:
+        raise ValueError(f'no sites in {path}')
+    return sites
+
+def contact_sheet_layout(n, page_w, page_h, cols, rows, margin=36.0, gap=12.0, header_h=24.0, label_h=22.0):
+    """Grid placement of n square images over pages -> [(page, x, y, size)] in points from the
+    page's top-left; each cell is the image with label_h for its caption below."""
+    cell_w = (page_w - 2 * margin - (cols - 1) * gap) / cols
+    cell_h = (page_h - 2 * margin - header_h - (rows - 1) * gap) / rows
+    size = max(0.0, min(cell_w, cell_h - label_h))
+    cells = []
+    for i in range(n):
+        page, k = divmod(i, cols * rows)
+        r, c = divmod(k, cols)
+        cells.append((page, margin + c * (cell_w + gap) + (cell_w - size) / 2.0,
+                      margin + header_h + r * (cell_h + gap), size))
+    return cells
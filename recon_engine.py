@@ -0,0 +1,722 @@
+# coding: utf-8
+# Satellite Recon — headless batch render engine (no Pythonista required)
+# Same snapshot -> rotate -> overlays -> address chip pipeline as recon_pipeline.py,
+# behind a raster backend (Pillow) and a pluggable snapshot source, fanned over a process pool.
+#
+#   python recon_engine.py jobs.csv --out renders/ --source synthetic --workers 4
+#   python recon_engine.py jobs.csv --source fixtures:fixtures/ --scaling 1,2,4
+#   python recon_engine.py jobs.csv --source tiles:/data/tiles --tiled-px 16384   # print size, PNG
+#   python recon_engine.py jobs.csv --sweep 5 --fps 24                             # rotating APNG
+#
+# Jobs are CSV (header: lat,lon[,meters,map_type,rotation,quality,name,address]) or JSON lines.
+
+import os, csv, json, math, time, glob, hashlib, argparse
+from collections import namedtuple, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from recon_core import (
+    GRID_ALPHA, GRID_LABEL_ALPHA, CHIP_ALPHA, CROSSHAIR_ALPHA, WHITE, RED, CHIP_PAD,
+    MAP_TYPES, QUALITY_PRESETS, FONT_CHIP, FONT_CAPTION, FONT_SCALE, FONT_NORTH, FONT_GRID,
+    LRUCache, TextMetrics, image_nbytes, percentiles, rotation_fill_scale, sweep_angles,
+    overlay_caption, scale_bar_label, scale_bar_geometry, north_arrow_rect, north_arrow_triangle,
+    caption_box, grid_label_box, address_chip_layout, pixel_rect,
+    ground_mpp, latlon_to_world_px, world_px_to_latlon, EARTH_RADIUS_M, TILE_SIZE,
+)
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:   # the engine module stays importable; backends fail on use
+    Image = ImageDraw = ImageFont = None
+try:
+    import numpy as np
+    import recon_raster
+    from recon_georef import GeoTransform
+except ImportError:
+    np = recon_raster = GeoTransform = None
+
+DEFAULT_METERS = 800.0
+
+BatchJob = namedtuple('BatchJob', 'lat lon meters map_type rotation quality name address')
+BatchJob.__new__.__defaults__ = (DEFAULT_METERS, 'satellite', 0.0, 'High', None, None)
+
+def quality_px(quality):
+    """'Ultra' / 'ultra' / 2048 / '2048' -> pixel width."""
+    for name, px in QUALITY_PRESETS:
+        if str(quality).lower() == name.lower():
+            return px
+    return int(quality)
+
+def job_name(job):
+    if job.name:
+        return job.name
+    return f'{job.lat:.5f}_{job.lon:.5f}_{int(job.meters)}m_{job.map_type}_{job.rotation:.0f}deg'
+
+# ---------- Snapshot sources (stand-ins for location.render_map_snapshot) ----------
+class SnapshotSource(object):
+    """Returns a square RGBA PIL image covering meters x meters around (lat, lon)."""
+    def render(self, lat, lon, meters, map_type, img_w):
+        raise NotImplementedError
+
+class SyntheticSnapshotSource(SnapshotSource):
+    """Deterministic pseudo-imagery seeded by the snapshot key; for benchmarks and dry runs."""
+    PALETTE = {'standard': (236, 232, 224), 'satellite': (62, 84, 58), 'hybrid': (58, 76, 60)}
+
+    def render(self, lat, lon, meters, map_type, img_w):
+        seed = hashlib.sha1(f'{lat:.5f},{lon:.5f},{int(meters)},{map_type}'.encode('utf-8')).digest()
+        n = int(img_w)
+        base = self.PALETTE.get(map_type, (128, 128, 128))
+        img = Image.new('RGB', (n, n), base)
+        noise = Image.effect_noise((n, n), 24 + seed[0] % 16).convert('RGB')
+        img = Image.blend(img, noise, 0.18)
+        d = ImageDraw.Draw(img)
+        step = max(8, int(n * 40.0 / max(meters, 1.0)))   # ~40 m blocks
+        off = seed[1] % step
+        road = (250, 250, 245) if map_type == 'standard' else (150, 150, 140)
+        for i in range(-1, n // step + 2):
+            x = off + i * step
+            d.line([(x, 0), (x, n)], fill=road, width=max(1, step // 10))
+            d.line([(0, x), (n, x)], fill=road, width=max(1, step // 10))
+        return img.convert('RGBA')
+
+class FixtureSnapshotSource(SnapshotSource):
+    """Fixture images from a directory, resized to img_w.
+
+    Lookup order: '<lat5>_<lon5>_<meters>_<map_type>.png', '<map_type>.png',
+    'default.png', then the first image in the directory.
+    """
+    EXTS = ('.png', '.jpg', '.jpeg', '.webp')
+
+    def __init__(self, root):
+        self.root = root
+        self._cache = LRUCache(max_bytes=128 * 1024 * 1024)
+
+    def _find(self, lat, lon, meters, map_type):
+        stems = [f'{lat:.5f}_{lon:.5f}_{int(meters)}_{map_type}', map_type, 'default']
+        for stem in stems:
+            for ext in self.EXTS:
+                path = os.path.join(self.root, stem + ext)
+                if os.path.exists(path):
+                    return path
+        found = sorted(p for p in glob.glob(os.path.join(self.root, '*')) if p.lower().endswith(self.EXTS))
+        if not found:
+            raise IOError(f'no fixture images in {self.root}')
+        return found[0]
+
+    def render(self, lat, lon, meters, map_type, img_w):
+        path = self._find(lat, lon, meters, map_type)
+        key = (path, int(img_w))
+        img = self._cache.get(key)
+        if img is None:
+            with Image.open(path) as src:
+                img = src.convert('RGBA').resize((int(img_w), int(img_w)), Image.LANCZOS)
+            self._cache.put(key, img, image_nbytes(img))
+        return img.copy()
+
+class TileDirSnapshotSource(SnapshotSource):
+    """Slippy-map tiles on disk: <root>/<map_type>/<z>/<x>/<y>.png, or <root>/<z>/<x>/<y>.png.
+
+    Picks the shallowest available zoom that is at least as sharp as the request,
+    stitches the covering tiles and resamples the square to img_w.
+    """
+    def __init__(self, root, tile_size=TILE_SIZE, max_zoom=19):
+        self.root = root
+        self.tile_size = tile_size
+        self.max_zoom = max_zoom
+        self._tiles = LRUCache(max_bytes=128 * 1024 * 1024)
+
+    def _tile_dir(self, map_type):
+        d = os.path.join(self.root, map_type)
+        return d if os.path.isdir(d) else self.root
+
+    def _zooms(self, map_type):
+        d = self._tile_dir(map_type)
+        return sorted(int(z) for z in os.listdir(d) if z.isdigit())
+
+    def _tile(self, map_type, z, x, y):
+        key = (map_type, z, x, y)
+        t = self._tiles.get(key)
+        if t is None:
+            n = 2 ** z
+            path = os.path.join(self._tile_dir(map_type), str(z), str(x % n), f'{y}.png')
+            if os.path.exists(path):
+                with Image.open(path) as src:
+                    t = src.convert('RGBA')
+            else:
+                t = Image.new('RGBA', (self.tile_size, self.tile_size), (0, 0, 0, 255))
+            self._tiles.put(key, t, image_nbytes(t))
+        return t
+
+    def render(self, lat, lon, meters, map_type, img_w):
+        zooms = self._zooms(map_type) or [self.max_zoom]
+        want = meters / float(img_w)
+        z = next((z for z in zooms if ground_mpp(lat, z, self.tile_size) <= want), zooms[-1])
+        cx, cy = latlon_to_world_px(lat, lon, z, self.tile_size)
+        half = meters / 2.0 / ground_mpp(lat, z, self.tile_size)
+        x0, y0, x1, y1 = cx - half, cy - half, cx + half, cy + half
+        ts = self.tile_size
+        tx0, ty0 = int(math.floor(x0 / ts)), int(math.floor(y0 / ts))
+        tx1, ty1 = int(math.floor(x1 / ts)), int(math.floor(y1 / ts))
+        mosaic = Image.new('RGBA', ((tx1 - tx0 + 1) * ts, (ty1 - ty0 + 1) * ts))
+        for tx in range(tx0, tx1 + 1):
+            for ty in range(ty0, ty1 + 1):
+                mosaic.paste(self._tile(map_type, z, tx, ty), ((tx - tx0) * ts, (ty - ty0) * ts))
+        box = (x0 - tx0 * ts, y0 - ty0 * ts, x1 - tx0 * ts, y1 - ty0 * ts)
+        return mosaic.resize((int(img_w), int(img_w)), Image.BICUBIC, box=box)
+
+def make_source(spec):
+    """'synthetic', 'fixtures:<dir>' or 'tiles:<dir>' -> SnapshotSource."""
+    kind, _, arg = spec.partition(':')
+    if kind == 'synthetic':
+        return SyntheticSnapshotSource()
+    if kind == 'fixtures':
+        return FixtureSnapshotSource(arg)
+    if kind == 'tiles':
+        return TileDirSnapshotSource(arg)
+    raise ValueError(f'unknown snapshot source: {spec}')
+
+# ---------- Raster backends ----------
+class RasterBackend(object):
+    """Compositing primitives the engine needs; mirrors the ui-based functions in the app."""
+    name = None
+
+    def rotate_fill_square(self, img, degrees, cache=True):
+        raise NotImplementedError
+
+    def compose_overlays(self, base, meters, map_type, lat, lon, rotation_deg=0.0, show_grid=True,
+                         show_crosshair=True, grid_divisions=4, show_caption=True):
+        raise NotImplementedError
+
+    def apply_address_chip(self, img, addr_text):
+        raise NotImplementedError
+
+    def save(self, img, path, fmt='png', quality=90, png_level=1):
+        raise NotImplementedError
+
+def _rgba(color, alpha=None):
+    r, g, b, a = color
+    return (int(r * 255), int(g * 255), int(b * 255), int(255 * (a if alpha is None else alpha)))
+
+_FONT_FILES = {
+    False: ['Helvetica.ttc', 'Arial.ttf', 'DejaVuSans.ttf', 'LiberationSans-Regular.ttf',
+            '/System/Library/Fonts/Helvetica.ttc', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'],
+    True: ['Helvetica-Bold.ttf', 'Arial Bold.ttf', 'DejaVuSans-Bold.ttf', 'LiberationSans-Bold.ttf',
+           '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'],
+}
+
+def load_font(spec):
+    """FONT_* spec ('<System>', 12) -> a Pillow font of that pixel size."""
+    name, size = spec
+    bold = 'Bold' in name
+    for path in _FONT_FILES[bold] + _FONT_FILES[False]:
+        try:
+            return ImageFont.truetype(path, size)
+        except (OSError, IOError):
+            continue
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:   # Pillow < 10.1
+        return ImageFont.load_default()
+
+class PillowBackend(RasterBackend):
+    """Pillow implementation of the overlay pipeline, pixel-for-point with the app layout."""
+    name = 'pillow'
+
+    def __init__(self, resample='bilinear'):
+        # resample: 'bilinear' / 'nearest' use the cached NumPy resampler; 'pil' a Pillow affine pass.
+        self.resample = resample if recon_raster is not None else 'pil'
+        self.fonts = {spec: load_font(spec) for spec in (FONT_CHIP, FONT_CAPTION, FONT_SCALE, FONT_NORTH, FONT_GRID)}
+        ascent, descent = self.fonts[FONT_CHIP].getmetrics()
+        self.chip_line_h = max(18, ascent + descent)
+        self.metrics = {}
+
+    def measure(self, font_spec):
+        """TextMetrics for font_spec (callable as measure(text) -> (w, h))."""
+        m = self.metrics.get(font_spec)
+        if m is None:
+            font = self.fonts[font_spec]
+            lh = sum(font.getmetrics())
+            m = self.metrics[font_spec] = TextMetrics(lambda text: (font.getlength(text), lh))
+        return m
+
+    def rotate_fill_square(self, img, degrees, cache=True):
+        """Rotate clockwise around center, scaled by |cos|+|sin| so the square stays covered.
+
+        One inverse-mapped pass (no enlarged intermediate image); the NumPy path also
+        reuses the coordinate map for every image rotated by the same angle (cache=False:
+        do not keep a new one).
+        """
+        if abs(degrees) < 0.01:
+            return img
+        if self.resample != 'pil':
+            arr = recon_raster.rotate_fill_square(np.asarray(img), degrees, mode=self.resample, cache=cache)
+            return Image.fromarray(arr, img.mode)
+        w, h = img.size
+        side = int(min(w, h))
+        th = math.radians(degrees)
+        k = 1.0 / rotation_fill_scale(degrees)
+        kx, ky = k * w / float(side), k * h / float(side)
+        ct, st = math.cos(th), math.sin(th)
+        a, b, d, e = ct * kx, st * kx, -st * ky, ct * ky
+        c0 = side / 2.0
+        coeffs = (a, b, w / 2.0 - (a + b) * c0, d, e, h / 2.0 - (d + e) * c0)
+        return img.transform((side, side), Image.AFFINE, coeffs, resample=Image.BICUBIC)
+
+    def _text(self, d, text, rect, font_spec, color, align='left'):
+        x, y, w, h = rect
+        font = self.fonts[font_spec]
+        if align == 'center':
+            x += (w - font.getlength(text)) / 2.0
+        d.text((x, y), text, font=font, fill=color)
+
+    def draw_static_overlays(self, d, w, h, meters, rotation_deg, grid_divisions, show_crosshair, caption,
+                             geo=None, label_divisions=0):
+        """Draw grid, scale bar, north arrow, caption, grid labels and crosshair with ImageDraw d.
+
+        geo (a recon_georef.GeoTransform for the canvas) sizes the scale bar and places the
+        grid labels; label_divisions > 0 labels that grid's intersections with lat/lon.
+        """
+        self._draw_grid(d, w, h, grid_divisions)
+        self.draw_heading_overlays(d, w, h, meters, rotation_deg, caption, geo, label_divisions)
+        if show_crosshair:
+            self._draw_crosshair(d, w, h)
+
+    def draw_fixed_overlays(self, d, w, h, grid_divisions, show_crosshair):
+        """The overlays that do not depend on rotation: grid and crosshair."""
+        self._draw_grid(d, w, h, grid_divisions)
+        if show_crosshair:
+            self._draw_crosshair(d, w, h)
+
+    def draw_heading_overlays(self, d, w, h, meters, rotation_deg, caption, geo=None, label_divisions=0):
+        """The overlays that change with rotation: scale bar (the fill scale changes the
+        ground resolution), north arrow, caption and grid labels."""
+        bar_len_m, bar_len_px, x_bar, y_bar = scale_bar_geometry(w, h, meters, geo.mpp_at if geo else None)
+        d.rectangle([x_bar, y_bar, x_bar + bar_len_px, y_bar + 6], fill=_rgba(WHITE))
+        self._text(d, scale_bar_label(bar_len_m), (x_bar, y_bar - 18, bar_len_px, 18), FONT_SCALE,
+                   _rgba(WHITE), align='center')
+        na_x, na_y, na_size, _ = north_arrow_rect(w, h)
+        d.polygon(north_arrow_triangle(w, h, rotation_deg), fill=_rgba(WHITE))
+        self._text(d, 'N', (na_x, na_y + na_size - 18, na_size, 18), FONT_NORTH, _rgba(RED), align='center')
+        if caption:
+            (bx, by, box_w, box_h), _ = caption_box(w, h, caption, self.measure(FONT_CAPTION))
+            d.rounded_rectangle([bx, by, bx + box_w, by + box_h], 8, fill=_rgba((0, 0, 0, 1), CHIP_ALPHA))
+            self._text(d, caption, (bx + CHIP_PAD, by + CHIP_PAD, 0, 0), FONT_CAPTION, _rgba(WHITE))
+        if geo is not None and label_divisions > 1:
+            measure = self.measure(FONT_GRID)
+            for x, y, text in geo.grid_labels(label_divisions):
+                lx, ly, lw, lh = grid_label_box(x, y, *measure(text))
+                d.rectangle([lx, ly, lx + lw, ly + lh], fill=_rgba((0, 0, 0, 1), GRID_LABEL_ALPHA))
+                self._text(d, text, (lx + 3, ly + 1, 0, 0), FONT_GRID, _rgba(WHITE))
+
+    def _draw_grid(self, d, w, h, grid_divisions):
+        if grid_divisions > 0:
+            c = _rgba(WHITE, GRID_ALPHA)
+            for i in range(1, grid_divisions):
+                x = i * (w / grid_divisions); y = i * (h / grid_divisions)
+                d.line([(x, 0), (x, h)], fill=c, width=1)
+                d.line([(0, y), (w, y)], fill=c, width=1)
+
+    def _draw_crosshair(self, d, w, h):
+        cx, cy = w/2.0, h/2.0
+        c = _rgba(WHITE, CROSSHAIR_ALPHA)
+        d.line([(cx-18, cy), (cx+18, cy)], fill=c, width=1)
+        d.line([(cx, cy-18), (cx, cy+18)], fill=c, width=1)
+        d.ellipse([cx-2, cy-2, cx+2, cy+2], fill=c)
+
+    def compose_overlays(self, base, meters, map_type, lat, lon, rotation_deg=0.0, show_grid=True,
+                         show_crosshair=True, grid_divisions=4, show_caption=True, show_grid_labels=False):
+        w, h = base.size
+        caption = overlay_caption(map_type, meters, lat, lon, rotation_deg) if show_caption else None
+        divs = grid_divisions if show_grid else 0
+        layer = Image.new('RGBA', (w, h), (0, 0, 0, 0))
+        self.draw_static_overlays(ImageDraw.Draw(layer), w, h, meters, rotation_deg, divs, show_crosshair,
+                                  caption, _geo(lat, lon, meters, w, rotation_deg),
+                                  divs if show_grid_labels else 0)
+        return Image.alpha_composite(base.convert('RGBA'), layer)
+
+    def address_chip(self, w, h, addr_text):
+        """The chip for a w x h canvas -> (RGBA image of its bounding box, (bx, by))."""
+        lines, max_text_w, box = address_chip_layout(w, h, addr_text, self.measure(FONT_CHIP), self.chip_line_h)
+        bx, by, bw, bh = pixel_rect(*box)
+        chip = Image.new('RGBA', (bw, bh), (0, 0, 0, 0))
+        d = ImageDraw.Draw(chip)
+        d.rounded_rectangle([box[0] - bx, box[1] - by, box[0] - bx + box[2], box[1] - by + box[3]], 8,
+                            fill=_rgba((0, 0, 0, 1), CHIP_ALPHA))
+        ty = CHIP_PAD
+        for line in lines:
+            d.text((CHIP_PAD, ty), line, font=self.fonts[FONT_CHIP], fill=_rgba(WHITE))
+            ty += self.chip_line_h
+        return chip, (bx, by)
+
+    def apply_address_chip(self, img, addr_text):
+        """Dirty-rect update: composite the chip over its own bounding box, in place."""
+        chip, dest = self.address_chip(img.size[0], img.size[1], addr_text)
+        img.alpha_composite(chip, dest=dest)
+        return img
+
+    def compose_strip(self, strip, y0, w, h, meters, map_type, lat, lon, rotation_deg=0.0,
+                      grid_divisions=4, show_crosshair=True, show_caption=True, chip=None, geo=None,
+                      show_grid_labels=False):
+        """Overlays (and an address_chip() result) for rows [y0, y0 + strip height) of a w x h canvas.
+
+        Pass geo (the canvas GeoTransform) to reuse it across strips.
+        """
+        sh = strip.size[1]
+        caption = overlay_caption(map_type, meters, lat, lon, rotation_deg) if show_caption else None
+        layer = Image.new('RGBA', (w, sh), (0, 0, 0, 0))
+        geo = geo or _geo(lat, lon, meters, w, rotation_deg)
+        self.draw_static_overlays(_OffsetDraw(ImageDraw.Draw(layer), y0), w, h, meters, rotation_deg,
+                                  grid_divisions, show_crosshair, caption, geo,
+                                  grid_divisions if show_grid_labels else 0)
+        out = Image.alpha_composite(strip.convert('RGBA'), layer)
+        if chip is not None:
+            img, (bx, by) = chip
+            if by < y0 + sh and by + img.size[1] > y0:
+                top = max(0, y0 - by)
+                out.alpha_composite(img, dest=(bx, max(0, by - y0)), source=(0, top))
+        return out
+
+    def save(self, img, path, fmt='png', quality=90, png_level=1):
+        fmt = fmt.lower()
+        if fmt in ('jpg', 'jpeg'):
+            img.convert('RGB').save(path, 'JPEG', quality=quality)
+        elif fmt == 'webp':
+            img.save(path, 'WEBP', quality=quality)
+        else:
+            img.save(path, 'PNG', compress_level=png_level)
+
+def _geo(lat, lon, meters, w, rotation_deg):
+    """GeoTransform for a w-wide canvas, or None without NumPy (flat meters / w scale bar)."""
+    return GeoTransform(lat, lon, meters, w, rotation_deg) if GeoTransform is not None else None
+
+class _OffsetDraw(object):
+    """ImageDraw proxy shifting y by -dy, so whole-canvas overlay code can draw into one strip."""
+    def __init__(self, d, dy):
+        self._d, self._dy = d, dy
+
+    def _pts(self, pts):
+        return [(x, y - self._dy) for x, y in pts]
+
+    def _box(self, box):
+        x0, y0, x1, y1 = box
+        return [x0, y0 - self._dy, x1, y1 - self._dy]
+
+    def line(self, xy, **kw): self._d.line(self._pts(xy), **kw)
+    def polygon(self, xy, **kw): self._d.polygon(self._pts(xy), **kw)
+    def rectangle(self, box, **kw): self._d.rectangle(self._box(box), **kw)
+    def rounded_rectangle(self, box, radius=0, **kw): self._d.rounded_rectangle(self._box(box), radius, **kw)
+    def ellipse(self, box, **kw): self._d.ellipse(self._box(box), **kw)
+    def text(self, xy, text, **kw): self._d.text((xy[0], xy[1] - self._dy), text, **kw)
+
+BACKENDS = {'pillow': PillowBackend}
+
+# ---------- Engine ----------
+class HeadlessRenderer(object):
+    """One job -> one file, via a snapshot source and a raster backend."""
+    def __init__(self, source, backend):
+        self.source = source
+        self.backend = backend
+
+    def render(self, job):
+        img_w = quality_px(job.quality)
+        snap = self.source.render(job.lat, job.lon, job.meters, job.map_type, img_w)
+        rotated = self.backend.rotate_fill_square(snap, job.rotation)
+        img = self.backend.compose_overlays(rotated, int(job.meters), job.map_type, job.lat, job.lon,
+                                            rotation_deg=job.rotation)
+        if job.address:
+            img = self.backend.apply_address_chip(img, job.address)
+        return img
+
+    def render_sweep_to_file(self, job, out_dir, step=None, fps=None, frames_only=False, png_level=1,
+                             workers=None):
+        """Rotation sweep of job -> (APNG path or frame directory, SweepExporter stats)."""
+        path = os.path.join(out_dir, job_name(job) + ('_sweep' if frames_only else '_sweep.png'))
+        exporter = SweepExporter(self.source, self.backend, workers or SWEEP_WORKERS)
+        return path, exporter.render_to_file(job, path, step or SWEEP_STEP_DEG, fps or SWEEP_FPS,
+                                             frames_only, png_level)
+
+    def render_to_file(self, job, out_dir, fmt='png', quality=90, png_level=1, tiled_px=None):
+        t0 = time.perf_counter()
+        path = os.path.join(out_dir, job_name(job) + '.' + ('jpg' if fmt == 'jpeg' else fmt))
+        if tiled_px:
+            if fmt != 'png':
+                raise ValueError('tiled export writes PNG only')
+            TiledExporter(self.source, self.backend).render_to_file(job, path, tiled_px, png_level)
+        else:
+            self.backend.save(self.render(job), path, fmt, quality, png_level)
+        return path, time.perf_counter() - t0
+
+# ---------- Tiled export (beyond the snapshot size limit, bounded memory) ----------
+MAX_SNAPSHOT_PX = 2048                  # largest single snapshot requested (the Ultra preset)
+STRIP_PIXELS = 1 << 20                  # output pixels resampled, overlaid and encoded per strip
+TILE_CACHE_BYTES = 256 * 1024 * 1024    # decoded sub-snapshots kept while strips need them
+
+TileSpec = namedtuple('TileSpec', 'col row lat lon meters img_w')
+
+def tile_grid(lat, lon, meters, px, max_tile_px=MAX_SNAPSHOT_PX):
+    """Split a px x px north-up view into sub-snapshots -> (step, cols, [TileSpec]).
+
+    Tile (c, r) covers view pixels [c*step, c*step + step] on each axis, sharing one
+    column / row with its neighbour. Centres are offset in Web Mercator pixels at the
+    (fractional) zoom whose ground resolution at lat is meters / px, and each tile's
+    meters use the resolution at its own latitude, so the tiles stitch like one snapshot.
+    """
+    cols = max(1, int(math.ceil((px - 1) / float(max_tile_px - 1))))
+    step = int(math.ceil((px - 1) / float(cols)))
+    mpp = meters / float(px)
+    zoom = math.log2(math.cos(math.radians(lat)) * 2 * math.pi * EARTH_RADIUS_M / (TILE_SIZE * mpp))
+    cx, cy = latlon_to_world_px(lat, lon, zoom)
+    mid = (px - 1) / 2.0
+    tiles = []
+    for r in range(cols):
+        for c in range(cols):
+            t_lat, t_lon = world_px_to_latlon(cx + c * step + step / 2.0 - mid, cy + r * step + step / 2.0 - mid, zoom)
+            tiles.append(TileSpec(c, r, t_lat, t_lon, (step + 1) * ground_mpp(t_lat, zoom), step + 1))
+    return step, cols, tiles
+
+class TiledExporter(object):
+    """Render one job at px (up to 16k and beyond) into a PNG without the full bitmap.
+
+    Output rows are produced in strips of ~strip_pixels: each strip is resampled
+    (rotation included) from the sub-snapshots it touches, overlaid and streamed to
+    recon_raster.StreamingPNGWriter. Sub-snapshots are rendered on first use and held
+    in an LRU of tile_cache_bytes, so memory is the band of tiles under the current
+    strip (one tile row when unrotated) plus a few strips.
+    """
+    def __init__(self, source, backend, max_tile_px=MAX_SNAPSHOT_PX, strip_pixels=STRIP_PIXELS,
+                 tile_cache_bytes=TILE_CACHE_BYTES):
+        if recon_raster is None:
+            raise RuntimeError('tiled export needs NumPy')
+        self.source, self.backend = source, backend
+        self.max_tile_px = max_tile_px
+        self.strip_pixels = strip_pixels
+        self.tile_cache_bytes = tile_cache_bytes
+
+    def render_to_file(self, job, path, px, png_level=1):
+        """-> {'px', 'tiles', 'tile_renders', 'strips', 'seconds'}."""
+        t0 = time.perf_counter()
+        px = int(px)
+        step, cols, specs = tile_grid(job.lat, job.lon, job.meters, px, self.max_tile_px)
+        specs = {(t.col, t.row): t for t in specs}
+        cache = LRUCache(max_bytes=self.tile_cache_bytes)
+        renders = [0]
+
+        def tile(c, r):
+            arr = cache.get((c, r))
+            if arr is None:
+                t = specs[(c, r)]
+                img = self.source.render(t.lat, t.lon, t.meters, job.map_type, t.img_w)
+                arr = np.asarray(img.convert('RGBA'))
+                cache.put((c, r), arr, arr.nbytes)
+                renders[0] += 1
+            return arr
+
+        chip = self.backend.address_chip(px, px, job.address) if job.address else None
+        geo = GeoTransform(job.lat, job.lon, job.meters, px, job.rotation)
+        rows = max(1, min(px, self.strip_pixels // px))
+        buf = np.empty((rows, px, 4), dtype=np.uint8)
+        strips = 0
+        with recon_raster.StreamingPNGWriter(path, px, px, 3, png_level) as out:
+            for y0 in range(0, px, rows):
+                h = min(rows, px - y0)
+                xs, ys = recon_raster.strip_coords(px, job.rotation, y0, y0 + h)
+                recon_raster.sample_tiles(xs.ravel(), ys.ravel(), px, step, cols, tile, buf[:h].reshape(-1, 4))
+                strip = self.backend.compose_strip(Image.fromarray(buf[:h], 'RGBA'), y0, px, px, int(job.meters),
+                                                   job.map_type, job.lat, job.lon, job.rotation, chip=chip,
+                                                   geo=geo)
+                out.write_rows(np.asarray(strip.convert('RGB')))
+                strips += 1
+        return {'px': px, 'tiles': len(specs), 'tile_renders': renders[0], 'strips': strips,
+                'seconds': time.perf_counter() - t0}
+
+# ---------- Rotation sweep (one snapshot, a frame per heading) ----------
+SWEEP_STEP_DEG = 10.0
+SWEEP_FPS = 12.0
+# Frame threads. The NumPy gather, Pillow compositing and zlib release the GIL, but a
+# second thread only pays off with a second core: on one core it is slower and holds more frames.
+SWEEP_WORKERS = min(2, os.cpu_count() or 1)
+
+class SweepExporter(object):
+    """Render a rotating reveal of one job (job.rotation, + step, ... round to 360°) as an APNG.
+
+    The snapshot is fetched once. Grid, crosshair and the address chip do not change with
+    heading, so they are drawn once; each frame copies that layer, adds the scale bar, north
+    arrow and caption for its angle and composites it over the rotated snapshot.
+    Frames are made, and PNG-compressed, on a thread pool and handed to the writer in
+    order through a window of 2 x workers, so only that many frames are in memory. That
+    bound on memory is the gain: compression dominates, so on one core this takes about as
+    long as a full render per angle, and extra threads only help with extra cores.
+    """
+    def __init__(self, source, backend, workers=SWEEP_WORKERS):
+        if recon_raster is None:
+            raise RuntimeError('sweep export needs NumPy')
+        self.source, self.backend = source, backend
+        self.workers = max(1, int(workers))
+
+    def frames(self, job, angles):
+        """Yield side x side x 3 uint8 frames for each angle, in order."""
+        return self._generate(job, angles, lambda i, frame: frame)
+
+    def _generate(self, job, angles, finish):
+        """Yield finish(index, frame) per angle in order; finish runs on the frame thread."""
+        snap = self.source.render(job.lat, job.lon, job.meters, job.map_type, quality_px(job.quality))
+        side, meters = int(min(snap.size)), int(job.meters)
+        fixed = Image.new('RGBA', (side, side), (0, 0, 0, 0))
+        self.backend.draw_fixed_overlays(ImageDraw.Draw(fixed), side, side, 4, True)
+        chip = self.backend.address_chip(side, side, job.address) if job.address else None
+
+        def frame(i, deg):
+            base = self.backend.rotate_fill_square(snap, deg, cache=False)   # one-off angles
+            layer = fixed.copy()
+            caption = overlay_caption(job.map_type, meters, job.lat, job.lon, deg)
+            self.backend.draw_heading_overlays(ImageDraw.Draw(layer), side, side, meters, deg, caption,
+                                               _geo(job.lat, job.lon, meters, side, deg))
+            out = Image.alpha_composite(base.convert('RGBA'), layer)
+            if chip is not None:
+                out.alpha_composite(chip[0], dest=chip[1])
+            return finish(i, np.asarray(out.convert('RGB')))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for i, deg in enumerate(angles):
+                pending.append(pool.submit(frame, i, deg))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def render_to_file(self, job, path, step=SWEEP_STEP_DEG, fps=SWEEP_FPS, frames_only=False, png_level=1):
+        """Write an APNG at path, or with frames_only a directory of frame_NNNN.png (e.g. for ffmpeg).
+
+        -> {'frames', 'px', 'seconds', 'frames_per_s', 'bytes'}; frames_per_s counts frames
+        generated and encoded per second of wall time.
+        """
+        t0 = time.perf_counter()
+        angles = sweep_angles(step, job.rotation)
+        if frames_only:
+            if not os.path.isdir(path):
+                os.makedirs(path)
+
+            def finish(i, frame):
+                fpath = os.path.join(path, f'frame_{i:04d}.png')
+                with recon_raster.StreamingPNGWriter(fpath, frame.shape[1], frame.shape[0], 3, png_level) as png:
+                    png.write_rows(frame)
+                return frame.shape[1], os.path.getsize(fpath)
+            side, nbytes = 0, 0
+            for side, n in self._generate(job, angles, finish):
+                nbytes += n
+        else:
+            out = None
+            try:
+                for side, data in self._generate(job, angles,
+                                                 lambda i, f: (f.shape[1], recon_raster.encode_png_frame(f, png_level))):
+                    if out is None:
+                        out = recon_raster.StreamingAPNGWriter(path, side, side, len(angles), fps, 3, png_level)
+                    out.add_encoded_frame(data)
+                out.close()
+            except Exception:
+                if out is not None:
+                    out.__exit__(Exception, None, None)   # close the file without the frame-count check
+                raise
+            nbytes = os.path.getsize(path)
+        wall = time.perf_counter() - t0
+        return {'frames': len(angles), 'px': side, 'seconds': wall,
+                'frames_per_s': len(angles) / wall if wall else 0.0, 'bytes': nbytes}
+
+_worker_renderer = None
+
+def _init_worker(source_spec, backend_name):
+    global _worker_renderer
+    _worker_renderer = HeadlessRenderer(make_source(source_spec), BACKENDS[backend_name]())
+
+def _render_in_worker(args):
+    return _worker_renderer.render_to_file(*args)
+
+def render_batch(jobs, out_dir, source_spec='synthetic', backend='pillow', workers=None, fmt='png',
+                 quality=90, png_level=1, tiled_px=None):
+    """Render jobs across a process pool -> {'images', 'seconds', 'images_per_s', 'latency', 'paths'}."""
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+    workers = workers or os.cpu_count() or 1
+    tasks = [(job, out_dir, fmt, quality, png_level, tiled_px) for job in jobs]
+    t0 = time.perf_counter()
+    if workers == 1:
+        _init_worker(source_spec, backend)
+        results = [_render_in_worker(t) for t in tasks]
+    else:
+        chunk = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(source_spec, backend)) as pool:
+            results = list(pool.map(_render_in_worker, tasks, chunksize=chunk))
+    wall = time.perf_counter() - t0
+    return {'images': len(results), 'workers': workers, 'seconds': wall,
+            'images_per_s': len(results) / wall if wall else 0.0,
+            'latency': percentiles([dt for _, dt in results]),
+            'paths': [p for p, _ in results]}
+
+def load_jobs(path):
+    """CSV with a header row, or JSON lines, -> [BatchJob]."""
+    fields = BatchJob._fields
+    def coerce(row):
+        row = {k.strip().lower(): v for k, v in row.items() if k and v not in (None, '')}
+        kw = {k: row[k] for k in fields if k in row}
+        kw['lat'], kw['lon'] = float(kw['lat']), float(kw['lon'])
+        for k in ('meters', 'rotation'):
+            if k in kw:
+                kw[k] = float(kw[k])
+        if kw.get('map_type') and kw['map_type'] not in MAP_TYPES:
+            raise ValueError(f'unknown map_type {kw["map_type"]!r}')
+        return BatchJob(**kw)
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith(('.jsonl', '.json')):
+            return [coerce(json.loads(line)) for line in f if line.strip()]
+        return [coerce(row) for row in csv.DictReader(f)]
+
+def _print_report(st):
+    lat = st['latency']
+    print(f"{st['images']} images in {st['seconds']:.2f}s with {st['workers']} worker(s): "
+          f"{st['images_per_s']:.2f} images/s  (per image p50 {lat['p50']*1000:.0f} ms, "
+          f"p95 {lat['p95']*1000:.0f} ms)")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Headless batch renderer for satellite recon snapshots.')
+    ap.add_argument('jobs', help='CSV or JSON-lines job list')
+    ap.add_argument('--out', default='renders', help='output directory')
+    ap.add_argument('--source', default='synthetic', help="'synthetic', 'fixtures:<dir>' or 'tiles:<dir>'")
+    ap.add_argument('--backend', default='pillow', choices=sorted(BACKENDS))
+    ap.add_argument('--workers', type=int, default=None, help='process count (default: all cores)')
+    ap.add_argument('--format', default='png', choices=['png', 'jpeg', 'webp'])
+    ap.add_argument('--quality', type=int, default=90, help='JPEG / WebP quality (1-100)')
+    ap.add_argument('--png-level', type=int, default=1, choices=range(10), metavar='0-9',
+                    help='PNG zlib level (1 = fast)')
+    ap.add_argument('--tiled-px', type=int, default=None, metavar='PX',
+                    help='tiled PNG export at PX (e.g. 8192 or 16384), stitched from sub-snapshots')
+    ap.add_argument('--scaling', default=None, help='comma-separated worker counts to compare, e.g. 1,2,4')
+    ap.add_argument('--sweep', type=float, default=None, metavar='DEG',
+                    help='rotation sweep per job in DEG steps, as an APNG (--workers = frame threads)')
+    ap.add_argument('--fps', type=float, default=SWEEP_FPS, help='sweep playback rate')
+    ap.add_argument('--sweep-frames', action='store_true', help='write sweep frames as PNG files instead')
+    args = ap.parse_args(argv)
+    jobs = load_jobs(args.jobs)
+    if args.sweep:
+        if not os.path.isdir(args.out):
+            os.makedirs(args.out)
+        r = HeadlessRenderer(make_source(args.source), BACKENDS[args.backend]())
+        for job in jobs:
+            path, st = r.render_sweep_to_file(job, args.out, args.sweep, args.fps, args.sweep_frames,
+                                              args.png_level, args.workers)
+            print(f"{path}: {st['frames']} frames at {st['px']} px in {st['seconds']:.2f}s "
+                  f"({st['frames_per_s']:.1f} frames/s, {st['bytes'] / 1e6:.1f} MB)")
+    elif args.scaling:
+        base = None
+        for n in [int(x) for x in args.scaling.split(',')]:
+            st = render_batch(jobs, args.out, args.source, args.backend, n, args.format,
+                              args.quality, args.png_level, args.tiled_px)
+            base = base or st['images_per_s']
+            _print_report(st)
+            print(f"  speedup vs first run: {st['images_per_s'] / base:.2f}x")
+    else:
+        _print_report(render_batch(jobs, args.out, args.source, args.backend, args.workers, args.format,
+                                  args.quality, args.png_level, args.tiled_px))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# coding: utf-8
+# Satellite Recon — georeferencing for rendered views (NumPy)
+# GeoTransform maps pixel coordinates of the final image (rotated and fill-scaled snapshot)
+# to lat/lon and back, whole arrays per call, and gives the true ground resolution at any
+# pixel for the scale bar. grid_labels() feeds coordinate labels on grid intersections.
+
+import math
+
+import numpy as np
+
+from recon_core import EARTH_RADIUS_M, TILE_SIZE, ground_mpp, latlon_to_world_px, rotation_fill_scale
+
+MAX_LAT = 85.05112878   # Web Mercator limit
+
+class GeoTransform(object):
+    """Pixel <-> lat/lon for one rendered view.
+
+    The snapshot is a Web Mercator image centred on (lat, lon), `meters` wide at its centre
+    over img_w pixels. The output is that snapshot rotated clockwise by rotation_deg and
+    scaled by rotation_fill_scale() onto a square, out_w pixels wide (default img_w; pass
+    the drawn size for proxies and tiled exports). Pixel coordinates are continuous:
+    (0, 0) is the top-left corner, pixel centres sit at i + 0.5, y grows downwards.
+    """
+    def __init__(self, lat, lon, meters, img_w, rotation_deg=0.0, out_w=None):
+        self.lat, self.lon, self.meters = float(lat), float(lon), float(meters)
+        self.img_w = float(img_w)
+        self.out_w = float(out_w or img_w)
+        self.rotation_deg = float(rotation_deg)
+        # Fractional zoom at which one snapshot pixel is one world pixel.
+        self.zoom = math.log2(ground_mpp(self.lat, 0) * self.img_w / self.meters)
+        self._n = TILE_SIZE * 2.0 ** self.zoom
+        self.cx, self.cy = latlon_to_world_px(self.lat, self.lon, self.zoom)
+        th = math.radians(self.rotation_deg)
+        ct, st = math.cos(th), math.sin(th)
+        f = self.img_w / (self.out_w * rotation_fill_scale(self.rotation_deg))   # world px per output px
+        self._f = f
+        self._to_world = (f * ct, f * st, -f * st, f * ct)       # output offset -> world offset
+        self._to_pixel = (ct / f, -st / f, st / f, ct / f)       # world offset -> output offset
+
+    def pixel_to_world(self, x, y):
+        a, b, c, d = self._to_world
+        dx = np.asarray(x, dtype=np.float64) - self.out_w / 2.0
+        dy = np.asarray(y, dtype=np.float64) - self.out_w / 2.0
+        return self.cx + a * dx + b * dy, self.cy + c * dx + d * dy
+
+    def pixel_to_latlon(self, x, y):
+        """Arrays (or scalars) of output pixel coordinates -> (lat, lon) arrays in degrees."""
+        wx, wy = self.pixel_to_world(x, y)
+        lon = wx * (360.0 / self._n) - 180.0
+        lon = (lon + 180.0) % 360.0 - 180.0
+        lat = np.degrees(np.arctan(np.sinh(math.pi * (1.0 - 2.0 * wy / self._n))))
+        return lat, lon
+
+    def latlon_to_pixel(self, lat, lon):
+        """Arrays (or scalars) of lat/lon -> (x, y) output pixel coordinates; inverse of pixel_to_latlon."""
+        lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_LAT, MAX_LAT)
+        s = np.sin(np.radians(lat))
+        wx = (np.asarray(lon, dtype=np.float64) + 180.0) * (self._n / 360.0)
+        wy = (0.5 - np.log((1 + s) / (1 - s)) / (4 * math.pi)) * self._n
+        dx = (wx - self.cx + self._n / 2.0) % self._n - self._n / 2.0   # nearest copy across the antimeridian
+        dy = wy - self.cy
+        a, b, c, d = self._to_pixel
+        return self.out_w / 2.0 + a * dx + b * dy, self.out_w / 2.0 + c * dx + d * dy
+
+    def mpp_at(self, x, y):
+        """Ground metres per output pixel at (x, y); Mercator scale is the same in every direction."""
+        lat, _ = self.pixel_to_latlon(x, y)
+        mpp = np.cos(np.radians(lat)) * (2 * math.pi * EARTH_RADIUS_M / self._n) * self._f
+        return float(mpp) if mpp.ndim == 0 else mpp
+
+    def grid_points(self, divisions):
+        """Interior intersections of a divisions x divisions grid -> (x, y, lat, lon) flat arrays."""
+        ticks = np.arange(1, divisions) * (self.out_w / float(divisions))
+        xs, ys = np.meshgrid(ticks, ticks)
+        xs, ys = xs.ravel(), ys.ravel()
+        lat, lon = self.pixel_to_latlon(xs, ys)
+        return xs, ys, lat, lon
+
+    def grid_labels(self, divisions):
+        """[(x, y, 'lat, lon')] for the grid intersections, with just enough decimals to tell
+        neighbouring labels apart."""
+        if divisions < 2:
+            return []
+        xs, ys, lat, lon = self.grid_points(divisions)
+        spacing_deg = self.mpp_at(self.out_w / 2.0, self.out_w / 2.0) * self.out_w / divisions / 111195.0
+        digits = max(0, min(6, int(math.ceil(-math.log10(spacing_deg))) + 1))
+        fmt = f'%.{digits}f'
+        text = np.char.add(np.char.add(np.char.mod(fmt, lat), ', '), np.char.mod(fmt, lon))
+        return list(zip(xs.tolist(), ys.tolist(), text.tolist()))
@@ -0,0 +1,166 @@
+# coding: utf-8
+# Satellite Recon — render pipeline instrumentation (no Pythonista imports)
+# Spans around pipeline stages feed rolling latency histograms; counters and registered
+# stats sources (cache hit/miss) are merged into snapshot(); events export as JSON lines.
+# Disabled (the default) span() returns one shared no-op object: one flag test per call.
+
+import json, threading, time
+from collections import deque
+
+from recon_core import percentiles
+
+TRACE_ENABLED = False
+HISTOGRAM_WINDOW = 512      # most recent samples kept per stage
+EVENT_BUFFER = 4096         # most recent span events kept for export
+
+class RollingHistogram(object):
+    """Latency samples for one stage: last `window` values plus lifetime count / total / max."""
+    __slots__ = ('samples', 'count', 'total', 'max')
+
+    def __init__(self, window=HISTOGRAM_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count, self.total, self.max = 0, 0.0, 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def summary(self):
+        st = percentiles(list(self.samples), (50, 95, 99))
+        st.update(count=self.count, total_s=self.total, max_s=self.max)
+        return st
+
+class _NullSpan(object):
+    __slots__ = ()
+    tag = None
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+    def set(self, tag=None, **attrs): pass
+
+_NULL_SPAN = _NullSpan()
+
+class Span(object):
+    """Times a with-block into histogram `name` (and `name.tag` when a tag is set)."""
+    __slots__ = ('_inst', 'name', 'tag', 'attrs', 't0')
+
+    def __init__(self, inst, name, tag=None, attrs=None):
+        self._inst, self.name, self.tag, self.attrs = inst, name, tag, attrs
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        dt = time.perf_counter() - self.t0
+        if exc_type is not None:
+            self.set(error=exc_type.__name__)
+        self._inst.record(self.name, dt, self.tag, self.attrs, t_end=time.time())
+        return False
+
+    def set(self, tag=None, **attrs):
+        """Attach a tag (e.g. cache hit/miss, geocode source) or attributes before the block ends."""
+        if tag is not None:
+            self.tag = tag
+        if attrs:
+            self.attrs = dict(self.attrs or (), **attrs)
+
+class Instrumentation(object):
+    """Per-stage spans, rolling histograms, counters and stats sources; thread-safe."""
+    def __init__(self, enabled=TRACE_ENABLED, window=HISTOGRAM_WINDOW, events=EVENT_BUFFER):
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._hists = {}
+        self._counters = {}
+        self._sources = {}
+        self._events = deque(maxlen=events)
+
+    def span(self, name, tag=None, **attrs):
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, tag, attrs or None)
+
+    def record(self, name, seconds, tag=None, attrs=None, t_end=None):
+        if not self.enabled:
+            return
+        keys = (name,) if tag is None else (name, f'{name}.{tag}')
+        with self._lock:
+            for k in keys:
+                h = self._hists.get(k)
+                if h is None:
+                    h = self._hists[k] = RollingHistogram(self.window)
+                h.add(seconds)
+            ev = {'ts': t_end or time.time(), 'stage': name, 'ms': round(seconds * 1000.0, 3),
+                  'thread': threading.current_thread().name}
+            if tag is not None:
+                ev['tag'] = tag
+            if attrs:
+                ev.update(attrs)
+            self._events.append(ev)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self._lock:
+                self._counters[name] = self._counters.get(name, 0) + n
+
+    def add_source(self, name, fn):
+        """fn() -> dict merged into snapshot()['sources'][name] (e.g. cache stats)."""
+        self._sources[name] = fn
+
+    def snapshot(self):
+        with self._lock:
+            hists = {k: h.summary() for k, h in self._hists.items()}
+            counters = dict(self._counters)
+        sources = {}
+        for name, fn in list(self._sources.items()):
+            try:
+                sources[name] = fn()
+            except Exception as e:
+                sources[name] = {'error': str(e)}
+        return {'stages': hists, 'counters': counters, 'sources': sources}
+
+    def last(self, stage):
+        """Most recent sample for stage, in seconds, or None."""
+        with self._lock:
+            h = self._hists.get(stage)
+            return h.samples[-1] if h is not None and h.samples else None
+
+    def export_jsonl(self, path, clear=True):
+        """Append buffered span events plus one summary line to path; returns the event count."""
+        with self._lock:
+            events = list(self._events)
+            if clear:
+                self._events.clear()
+        summary = dict(self.snapshot(), type='summary', ts=time.time())
+        with open(path, 'a', encoding='utf-8') as f:
+            for ev in events:
+                f.write(json.dumps(dict(ev, type='span'), default=str) + '\n')
+            f.write(json.dumps(summary, default=str) + '\n')
+        return len(events)
+
+    def reset(self):
+        with self._lock:
+            self._hists.clear(); self._counters.clear(); self._events.clear()
+
+    def report_lines(self, stages=None):
+        """Short 'stage  last  p50  p95' text lines for an on-screen overlay."""
+        with self._lock:
+            names = stages or sorted(self._hists)
+            rows = [(n, self._hists[n]) for n in names if n in self._hists]
+            out = []
+            for n, h in rows:
+                st = percentiles(list(h.samples), (50, 95))
+                out.append(f'{n:<16}{h.samples[-1] * 1000:>7.0f}{st["p50"] * 1000:>7.0f}'
+                           f'{st["p95"] * 1000:>7.0f} ms')
+        return out
+
+metrics = Instrumentation()
+
+def span(name, tag=None, **attrs):
+    """Module-level shortcut for metrics.span(); a shared no-op when instrumentation is off."""
+    if not metrics.enabled:
+        return _NULL_SPAN
+    return Span(metrics, name, tag, attrs or None)
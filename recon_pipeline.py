@@ -0,0 +1,1827 @@
+# coding: utf-8
+# Satellite Recon — app core: caches, persistent stores, location, geocoding, snapshots,
+# compositing, render scheduling and export. No view code: satellite_recon.py is the MapStudio
+# shell on top. Importing this module does no font metrics, opens no files and leaves NumPy,
+# concurrent.futures, requests and the export modules to their first use.
+
+import ui, location, os, time, math, threading, sqlite3, heapq
+import mmap, struct, zlib
+from collections import deque
+
+from recon_core import (
+    GRID_ALPHA, GRID_LABEL_ALPHA, CHIP_ALPHA, CROSSHAIR_ALPHA, WHITE, RED,
+    FONT_CHIP, FONT_CAPTION, FONT_SCALE, FONT_NORTH, FONT_GRID,
+    LRUCache, TextMetrics, image_nbytes, percentiles,
+    rotation_fill_scale, sweep_angles,
+    overlay_caption, scale_bar_label, scale_bar_geometry, north_arrow_rect, north_arrow_triangle,
+    caption_box, grid_label_box, wrap_text, address_chip_layout, pixel_rect,
+    pyramid_cover, pyramid_tile_view, contact_sheet_layout,
+    _format_compact_apple, _format_compact_osm,
+)
+from recon_metrics import metrics, span
+
+GRID_LABELS = False          # lat/lon labels on every grid intersection
+
+# ===== Deferred imports =====
+class LazyThreadPool(object):
+    """ThreadPoolExecutor created, and concurrent.futures imported, on first use."""
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def submit(self, fn, *args, **kwargs):
+        return self.executor().submit(fn, *args, **kwargs)
+
+    def map(self, fn, *iterables):
+        return self.executor().map(fn, *iterables)
+
+def _geo(lat, lon, meters, w, rotation_deg):
+    from recon_georef import GeoTransform   # NumPy: first composite, or preload()
+    return GeoTransform(lat, lon, meters, w, rotation_deg)
+
+def preload():
+    """Import what the first render would otherwise pay for; run on a background thread once
+    the view is up, while the user is still picking a location."""
+    import concurrent.futures, recon_georef   # noqa: F401
+
+# ===== Fonts & text metrics =====
+CHIP_LINE_H = None   # address chip line height, measured on first use
+
+def _chip_line_h():
+    global CHIP_LINE_H
+    if CHIP_LINE_H is None:
+        CHIP_LINE_H = max(18, ui.measure_string('Ag', font=FONT_CHIP)[1])
+    return CHIP_LINE_H
+
+# ===== Caches =====
+SNAPSHOT_CACHE_BYTES = 192 * 1024 * 1024   # ~12 Ultra (2048 px) or ~48 Standard snapshots
+ROTATION_CACHE_BYTES = 128 * 1024 * 1024
+
+_snapshot_cache = LRUCache(max_bytes=SNAPSHOT_CACHE_BYTES)  # {snapshot_key: ui.Image}
+_rotation_cache = LRUCache(max_bytes=ROTATION_CACHE_BYTES)  # {(snapshot_key, deg): (src|None, rotated)}
+_text_metrics = {}        # {font: TextMetrics}; glyph advances + bounded real-measure LRU
+
+# ===== Persistent geocode store =====
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.recon_cache')
+GEOCODE_DB_PATH = os.path.join(CACHE_DIR, 'geocode.sqlite3')
+GEOCODE_TTL = 30 * 24 * 3600.0      # positive results: addresses rarely change
+GEOCODE_NEG_TTL = 15 * 60.0         # both providers failed: retry after a while
+GEOCODE_MAX_ROWS = 20000
+GEOCODE_MEM_ENTRIES = 2048
+GEOCODE_REUSE_RADIUS_M = 15.0       # reuse a cached address this close to the query point
+
+M_PER_DEG_LAT = 111195.0            # mean metres per degree of latitude
+
+class GeoPointIndex(object):
+    """Grid-bucketed point index: 'nearest stored point within N metres'.
+
+    Points are bucketed into square cells of cell_m metres of latitude; a query
+    scans only the cells overlapping the search radius (widened in longitude by
+    1/cos(lat)), so lookups stay O(points per cell) regardless of index size.
+    """
+    def __init__(self, cell_m=50.0):
+        self.cell_deg = cell_m / M_PER_DEG_LAT
+        self._cells = {}   # (ci, cj) -> {key: (lat, lon)}
+        self._where = {}   # key -> (ci, cj)
+
+    def __len__(self):
+        return len(self._where)
+
+    def _cell(self, lat, lon):
+        return (int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg)))
+
+    def add(self, key, lat, lon):
+        self.remove(key)
+        c = self._cell(lat, lon)
+        self._cells.setdefault(c, {})[key] = (lat, lon)
+        self._where[key] = c
+
+    def remove(self, key):
+        c = self._where.pop(key, None)
+        if c is not None:
+            bucket = self._cells[c]
+            del bucket[key]
+            if not bucket:
+                del self._cells[c]
+
+    def clear(self):
+        self._cells.clear(); self._where.clear()
+
+    def nearest(self, lat, lon, radius_m):
+        """Return (key, distance_m) of the closest point within radius_m, or None."""
+        coslat = max(1e-6, math.cos(math.radians(lat)))
+        rdeg = radius_m / M_PER_DEG_LAT
+        ni = int(math.ceil(rdeg / self.cell_deg))
+        nj = int(math.ceil(rdeg / coslat / self.cell_deg))
+        ci, cj = self._cell(lat, lon)
+        best, best_d2 = None, radius_m * radius_m
+        kx, ky = M_PER_DEG_LAT * coslat, M_PER_DEG_LAT
+        for i in range(ci - ni, ci + ni + 1):
+            for j in range(cj - nj, cj + nj + 1):
+                bucket = self._cells.get((i, j))
+                if not bucket:
+                    continue
+                for key, (plat, plon) in bucket.items():
+                    dx = (plon - lon) * kx; dy = (plat - lat) * ky
+                    d2 = dx*dx + dy*dy
+                    if d2 <= best_d2:
+                        best, best_d2 = key, d2
+        return (best, math.sqrt(best_d2)) if best is not None else None
+
+def geocode_key(lat, lon):
+    """Quantize to 5 decimals (~1.1 m) as integers so keys compare exactly."""
+    return (int(round(lat * 1e5)), int(round(lon * 1e5)))
+
+class GeocodeStore(object):
+    """SQLite-backed reverse-geocode cache with TTL, row cap and an in-memory LRU front.
+
+    Rows hold the compact address text (NULL for negative results), its source
+    ('apple', 'osm' or 'none'), creation time and expiry. If the database cannot
+    be opened the store silently degrades to memory only.
+    """
+    def __init__(self, path=GEOCODE_DB_PATH, ttl=GEOCODE_TTL, neg_ttl=GEOCODE_NEG_TTL,
+                 max_rows=GEOCODE_MAX_ROWS, mem_entries=GEOCODE_MEM_ENTRIES):
+        self.path = path
+        self.ttl, self.neg_ttl, self.max_rows = ttl, neg_ttl, max_rows
+        self._mem = LRUCache(max_entries=mem_entries)   # {key: (text, source, expires)}
+        self._lock = threading.RLock()
+        self._db = None
+        self._rows = 0
+        self._disabled = path is None
+        self._index = None            # GeoPointIndex over positive rows, built on first nearest()
+        self.disk_hits = self.negative_hits = self.proximity_hits = 0
+
+    def _conn(self):
+        if self._db is None and not self._disabled:
+            try:
+                d = os.path.dirname(self.path)
+                if d and not os.path.isdir(d):
+                    os.makedirs(d)
+                db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                db.execute('CREATE TABLE IF NOT EXISTS geocode ('
+                           'lat_q INTEGER NOT NULL, lon_q INTEGER NOT NULL, source TEXT NOT NULL, '
+                           'text TEXT, created REAL NOT NULL, expires REAL NOT NULL, used REAL NOT NULL, '
+                           'PRIMARY KEY (lat_q, lon_q))')
+                db.execute('CREATE INDEX IF NOT EXISTS geocode_used ON geocode(used)')
+                db.execute('DELETE FROM geocode WHERE expires <= ?', (time.time(),))
+                db.commit()
+                self._rows = db.execute('SELECT COUNT(*) FROM geocode').fetchone()[0]
+                self._db = db
+            except (sqlite3.Error, OSError):
+                self._disabled = True
+        return self._db
+
+    def get(self, key):
+        """Return (found, text); text is None for a cached negative result."""
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                if entry[2] > now:
+                    if entry[0] is None:
+                        self.negative_hits += 1
+                    return True, entry[0]
+                self._mem.discard(key)
+            db = self._conn()
+            if db is None:
+                return False, None
+            try:
+                row = db.execute('SELECT text, source, expires FROM geocode '
+                                 'WHERE lat_q = ? AND lon_q = ? AND expires > ?',
+                                 (key[0], key[1], now)).fetchone()
+                if row is None:
+                    return False, None
+                db.execute('UPDATE geocode SET used = ? WHERE lat_q = ? AND lon_q = ?',
+                           (now, key[0], key[1]))
+                db.commit()
+            except sqlite3.Error:
+                return False, None
+            self._mem.put(key, row)
+            self.disk_hits += 1
+            if row[0] is None:
+                self.negative_hits += 1
+            return True, row[0]
+
+    def _load_index(self, now):
+        self._index = GeoPointIndex()
+        db = self._conn()
+        keys = []
+        if db is not None:
+            try:
+                keys = db.execute('SELECT lat_q, lon_q FROM geocode '
+                                  'WHERE text IS NOT NULL AND expires > ?', (now,)).fetchall()
+            except sqlite3.Error:
+                pass
+        for k in keys:
+            self._index.add(tuple(k), k[0] / 1e5, k[1] / 1e5)
+        for k, (text, _, expires) in self._mem.items():
+            if text and expires > now:
+                self._index.add(k, k[0] / 1e5, k[1] / 1e5)
+
+    def nearest(self, lat, lon, radius_m=GEOCODE_REUSE_RADIUS_M):
+        """Return the cached address of the closest positive entry within radius_m, or None."""
+        with self._lock:
+            if self._index is None:
+                self._load_index(time.time())
+            while True:
+                hit = self._index.nearest(lat, lon, radius_m)
+                if hit is None:
+                    return None
+                found, text = self.get(hit[0])
+                if found and text:
+                    self.proximity_hits += 1
+                    return text
+                self._index.remove(hit[0])   # expired or evicted since indexing
+
+    def put(self, key, text, source):
+        now = time.time()
+        expires = now + (self.ttl if text else self.neg_ttl)
+        if not text:
+            text, source = None, 'none'
+        with self._lock:
+            self._mem.put(key, (text, source, expires))
+            if self._index is not None:
+                if text:
+                    self._index.add(key, key[0] / 1e5, key[1] / 1e5)
+                else:
+                    self._index.remove(key)
+            db = self._conn()
+            if db is None:
+                return
+            try:
+                db.execute('INSERT OR REPLACE INTO geocode '
+                           '(lat_q, lon_q, source, text, created, expires, used) '
+                           'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                           (key[0], key[1], source, text, now, expires, now))
+                self._rows += 1   # may over-count replacements; _evict recounts
+                if self._rows > self.max_rows:
+                    self._evict(db, now)
+                db.commit()
+            except sqlite3.Error:
+                pass
+
+    def _evict(self, db, now):
+        db.execute('DELETE FROM geocode WHERE expires <= ?', (now,))
+        self._rows = db.execute('SELECT COUNT(*) FROM geocode').fetchone()[0]
+        excess = self._rows - self.max_rows
+        if excess > 0:
+            db.execute('DELETE FROM geocode WHERE rowid IN '
+                       '(SELECT rowid FROM geocode ORDER BY used LIMIT ?)', (excess,))
+            self._rows -= excess
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            if self._index is not None:
+                self._index.clear()
+            db = self._conn()
+            if db is not None:
+                db.execute('DELETE FROM geocode'); db.commit()
+                self._rows = 0
+
+    def stats(self):
+        st = self._mem.stats()
+        st.update({'rows': self._rows, 'disk_hits': self.disk_hits,
+                   'negative_hits': self.negative_hits, 'proximity_hits': self.proximity_hits,
+                   'persistent': not self._disabled})
+        return st
+
+_geocode_store = GeocodeStore()
+
+# ===== Persistent snapshot store =====
+SNAPSHOT_STORE_DIR = os.path.join(CACHE_DIR, 'snapshots')
+SNAPSHOT_STORE_MAX_BYTES = 768 * 1024 * 1024   # ~48 Ultra (2048 px) or ~190 Standard snapshots
+SNAPSHOT_STORE_ENABLED = True
+
+_SNAP_MAGIC = b'RSNP'
+_SNAP_HEADER = struct.Struct('<4sHHIIfI8x')    # magic, version, channels, width, height, scale, crc32
+_SNAP_VERSION = 1
+
+class StoredPixels(object):
+    """A stored snapshot: width x height RGBA pixels in buf (a memoryview of the copy-on-write mapped file)."""
+    __slots__ = ('width', 'height', 'scale', 'buf')
+
+    def __init__(self, width, height, scale, buf):
+        self.width, self.height, self.scale, self.buf = width, height, scale, buf
+
+class SnapshotStore(object):
+    """Disk store of raw snapshot pixels that survives restarts, keyed by snapshot_key.
+
+    Blobs are content addressed (<sha1 of pixels>.rgba: a 32-byte header with size,
+    scale and CRC-32, then tightly packed RGBA rows), written atomically via rename
+    and memory-mapped on load, so a hit costs the page-ins plus a CRC pass. A SQLite
+    index maps keys to blobs and records last use; the total size is capped with
+    least-recently-used eviction. Corrupt or missing blobs are dropped and reported
+    as misses. All index access is serialised, so render and prefetch threads can
+    share one store; if the directory or database is unusable it turns itself off.
+    """
+    def __init__(self, root=SNAPSHOT_STORE_DIR, max_bytes=SNAPSHOT_STORE_MAX_BYTES, verify=True):
+        self.root, self.max_bytes, self.verify = root, max_bytes, verify
+        self._lock = threading.RLock()
+        self._db = None
+        self._bytes = 0
+        self._disabled = root is None
+        self.counts = {'hits': 0, 'misses': 0, 'writes': 0, 'deduped': 0, 'evicted': 0, 'corrupt': 0}
+
+    @property
+    def enabled(self):
+        return not self._disabled
+
+    @staticmethod
+    def _key(key):
+        return '|'.join(str(k) for k in key)
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest + '.rgba')
+
+    def _conn(self):
+        if self._db is None and not self._disabled:
+            try:
+                if not os.path.isdir(self.root):
+                    os.makedirs(self.root)
+                db = sqlite3.connect(os.path.join(self.root, 'index.sqlite3'), timeout=5, check_same_thread=False)
+                db.execute('CREATE TABLE IF NOT EXISTS snapshots ('
+                           'key TEXT PRIMARY KEY, digest TEXT NOT NULL, nbytes INTEGER NOT NULL, '
+                           'used REAL NOT NULL)')
+                db.execute('CREATE INDEX IF NOT EXISTS snapshots_used ON snapshots(used)')
+                db.commit()
+                self._db = db
+                self._bytes = self._total(db)
+            except (sqlite3.Error, OSError):
+                self._disabled = True
+        return self._db
+
+    @staticmethod
+    def _total(db):
+        return db.execute('SELECT COALESCE(SUM(nbytes), 0) FROM '
+                          '(SELECT DISTINCT digest, nbytes FROM snapshots)').fetchone()[0]
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def get(self, key):
+        """-> StoredPixels, or None on a miss / integrity failure."""
+        k = self._key(key)
+        with self._lock:
+            db = self._conn()
+            if db is None:
+                return None
+            try:
+                row = db.execute('SELECT digest FROM snapshots WHERE key = ?', (k,)).fetchone()
+                if row is not None:
+                    db.execute('UPDATE snapshots SET used = ? WHERE key = ?', (time.time(), k))
+                    db.commit()
+            except sqlite3.Error:
+                return None
+        if row is None:
+            self._count('misses')
+            return None
+        px = self._read(row[0])
+        if px is None:
+            self._count('corrupt')
+            self._drop(k, row[0])
+            return None
+        self._count('hits')
+        return px
+
+    def _read(self, digest):
+        try:
+            with open(self._path(digest), 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)   # copy-on-write: wrappable by ctypes
+        except (OSError, ValueError):
+            return None
+        if len(mm) < _SNAP_HEADER.size:
+            return None
+        magic, version, channels, w, h, scale, crc = _SNAP_HEADER.unpack_from(mm)
+        body = memoryview(mm)[_SNAP_HEADER.size:]
+        if (magic != _SNAP_MAGIC or version != _SNAP_VERSION or channels != 4 or len(body) != w * h * 4
+                or (self.verify and zlib.crc32(body) != crc)):
+            return None
+        return StoredPixels(w, h, scale, body)
+
+    def put(self, key, width, height, pixels, scale=1.0):
+        """Store width x height RGBA pixels (bytes-like) under key -> digest, or None if disabled."""
+        body = memoryview(pixels).cast('B')
+        if len(body) != width * height * 4:
+            raise ValueError(f'{len(body)} bytes for a {width}x{height} RGBA snapshot')
+        from hashlib import sha1
+        digest = sha1(body).hexdigest()
+        path = self._path(digest)
+        nbytes = _SNAP_HEADER.size + len(body)
+        # Blobs are only removed under the lock (_drop), so checking for one and indexing it
+        # happen in one locked step; the new blob is written to a temp file outside the lock
+        # and renamed into place inside it.
+        with self._lock:
+            db = self._conn()
+            if db is None:
+                return None
+            if os.path.exists(path):
+                return self._index(db, key, digest, nbytes, 'deduped')
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(_SNAP_HEADER.pack(_SNAP_MAGIC, _SNAP_VERSION, 4, width, height, scale,
+                                          zlib.crc32(body)))
+                f.write(body)
+            with self._lock:
+                os.replace(tmp, path)
+                return self._index(db, key, digest, nbytes, 'writes')
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return None
+
+    def _index(self, db, key, digest, nbytes, outcome):
+        """Point key at the blob on disk; called with the lock held -> digest or None."""
+        try:
+            db.execute('INSERT OR REPLACE INTO snapshots (key, digest, nbytes, used) VALUES (?, ?, ?, ?)',
+                       (self._key(key), digest, nbytes, time.time()))
+            db.commit()
+            self.counts[outcome] += 1
+            self._bytes = self._total(db)
+            if self._bytes > self.max_bytes:
+                self._evict(db)
+        except sqlite3.Error:
+            return None
+        return digest
+
+    def _evict(self, db):
+        rows = db.execute('SELECT key, digest, nbytes FROM snapshots ORDER BY used').fetchall()
+        for k, digest, _ in rows[:-1]:      # never evict the newest entry
+            if self._bytes <= self.max_bytes:
+                break
+            self._drop(k, digest)
+            self.counts['evicted'] += 1
+
+    def _drop(self, k, digest):
+        with self._lock:
+            db = self._conn()
+            if db is None:
+                return
+            try:
+                db.execute('DELETE FROM snapshots WHERE key = ?', (k,))
+                shared = db.execute('SELECT 1 FROM snapshots WHERE digest = ? LIMIT 1', (digest,)).fetchone()
+                db.commit()
+                if not shared:
+                    try:
+                        os.remove(self._path(digest))
+                    except OSError:
+                        pass
+                self._bytes = self._total(db)
+            except sqlite3.Error:
+                pass
+
+    def __contains__(self, key):
+        with self._lock:
+            db = self._conn()
+            if db is None:
+                return False
+            return db.execute('SELECT 1 FROM snapshots WHERE key = ?', (self._key(key),)).fetchone() is not None
+
+    def clear(self):
+        with self._lock:
+            db = self._conn()
+            if db is None:
+                return
+            for k, digest in db.execute('SELECT key, digest FROM snapshots').fetchall():
+                self._drop(k, digest)
+
+    def stats(self):
+        with self._lock:
+            db = self._conn()
+            entries = db.execute('SELECT COUNT(*) FROM snapshots').fetchone()[0] if db is not None else 0
+        return dict(self.counts, entries=entries, bytes=self._bytes, max_bytes=self.max_bytes,
+                    persistent=not self._disabled)
+
+_snapshot_store = SnapshotStore() if SNAPSHOT_STORE_ENABLED else SnapshotStore(root=None)
+
+def cache_stats():
+    return {'snapshot': _snapshot_cache.stats(), 'rotation': _rotation_cache.stats(),
+            'overlay': _overlay_cache.stats(), 'composite': _composite_cache.stats(),
+            'geocode': _geocode_store.stats(), 'geocoder': _geocoder.stats(),
+            'disk': _snapshot_store.stats(), 'pyramid': _pyramid.stats(),
+            'prefetch': _prefetcher.stats(), 'location': _location.stats(),
+            'text': {f'{f[0]} {f[1]}': m.stats() for f, m in list(_text_metrics.items())}}
+
+# ---------- Location (last known fix, early exit on accuracy) ----------
+LOCATION_MAX_AGE = 30.0          # s; a cached fix at least this fresh is returned at once
+LOCATION_ACCURACY_M = 65.0       # horizontal accuracy good enough to stop waiting
+LOCATION_TIMEOUT = 6.0
+LOCATION_SAMPLE_INTERVAL = 0.05  # s between provider reads while updates are running
+LOCATION_KEEP_WARM = False       # keep updates running while the studio is on screen
+
+class LocationService(object):
+    """Last-known-fix cache over a location provider (the location module by default).
+
+    While anyone holds it (a waiting get() or keep_warm()), updates run and a
+    sampler thread publishes each new fix to waiters, so get() returns as soon
+    as a fix is accurate enough instead of on a poll tick; updates stop when
+    the last hold is released. A fix is (lat, lon, accuracy_m, monotonic stamp).
+    """
+    def __init__(self, provider=None, sample_interval=LOCATION_SAMPLE_INTERVAL):
+        self.provider = provider or location
+        self.sample_interval = sample_interval
+        self._cond = threading.Condition()
+        self._fix = None
+        self._fix_id = None
+        self._holds = 0
+        self._thread = None
+        self.counts = {'cached': 0, 'accurate': 0, 'coarse': 0, 'timeout': 0, 'fixes': 0, 'starts': 0}
+
+    def last_fix(self):
+        """-> {'lat', 'lon', 'accuracy', 'age'} or None."""
+        with self._cond:
+            fix = self._fix
+        if fix is None:
+            return None
+        return {'lat': fix[0], 'lon': fix[1], 'accuracy': fix[2], 'age': time.monotonic() - fix[3]}
+
+    def get(self, max_age=LOCATION_MAX_AGE, accuracy=LOCATION_ACCURACY_M, timeout=LOCATION_TIMEOUT):
+        """-> (lat, lon) or None.
+
+        Returns the cached fix if it is fresh and accurate enough, otherwise the
+        first new fix within accuracy; on timeout, the best new fix seen (if any).
+        """
+        with span('location') as sp, self._cond:
+            if self._good(self._fix, max_age, accuracy):
+                sp.set('cached'); self.counts['cached'] += 1
+                return self._fix[:2]
+            t0 = time.monotonic()
+            deadline, best = t0 + timeout, None
+            self._hold()
+            try:
+                while True:
+                    fix = self._fix
+                    if fix is not None and fix[3] >= t0 - max_age and (best is None or fix[2] < best[2]):
+                        best = fix
+                    if self._good(best, max_age, accuracy):
+                        self.counts['accurate'] += 1
+                        return best[:2]
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+            finally:
+                self._release()
+            sp.set('coarse' if best else 'timeout')
+            self.counts['coarse' if best else 'timeout'] += 1
+            return best[:2] if best else None
+
+    def keep_warm(self, on=True):
+        """Hold (or release) updates so the next get() can be answered from cache."""
+        with self._cond:
+            if on:
+                self._hold()
+            else:
+                self._release()
+
+    def stats(self):
+        fix = self.last_fix()
+        with self._cond:
+            return dict(self.counts, holds=self._holds,
+                        fix_age=None if fix is None else round(fix['age'], 2),
+                        fix_accuracy=None if fix is None else fix['accuracy'])
+
+    @staticmethod
+    def _good(fix, max_age, accuracy):
+        return fix is not None and fix[2] <= accuracy and time.monotonic() - fix[3] <= max_age
+
+    def _hold(self):
+        self._holds += 1
+        if self._thread is None:
+            self.provider.start_updates()
+            self.counts['starts'] += 1
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+
+    def _release(self):
+        self._holds = max(0, self._holds - 1)
+
+    def _sample(self):
+        while True:
+            loc = self.provider.get_location()
+            with self._cond:
+                if not self._holds:
+                    self._thread = None
+                    self.provider.stop_updates()
+                    return
+                self._publish(loc)
+            time.sleep(self.sample_interval)
+
+    def _publish(self, loc):
+        if not loc or 'latitude' not in loc or 'longitude' not in loc:
+            return
+        acc = loc.get('horizontal_accuracy')
+        if acc is not None and acc < 0:   # CoreLocation: negative accuracy = invalid fix
+            return
+        ident = (loc.get('timestamp'), loc['latitude'], loc['longitude'], acc)
+        if ident == self._fix_id:
+            return
+        now = time.monotonic()
+        ts = loc.get('timestamp')
+        stamp = now - max(0.0, time.time() - ts) if ts else now
+        self._fix_id = ident
+        self._fix = (float(loc['latitude']), float(loc['longitude']),
+                     float('inf') if acc is None else float(acc), stamp)
+        self.counts['fixes'] += 1
+        self._cond.notify_all()
+
+_location = LocationService()
+
+def request_location(timeout=LOCATION_TIMEOUT):
+    return _location.get(timeout=timeout)
+
+# ---------- Fast measurement with cache ----------
+def _metrics(font):
+    m = _text_metrics.get(font)
+    if m is None:
+        m = _text_metrics.setdefault(font, TextMetrics(lambda t: ui.measure_string(t, font=font)))
+    return m
+
+def _measure(text, font):
+    return _metrics(font).measure(text)
+
+# ---------- Imaging ----------
+def rotate_image_fill_square(img, degrees, cache_key=None):
+    """Rotate around center on a square canvas; skip or reuse when possible.
+
+    Pass the snapshot key as cache_key so rotations survive across snapshots;
+    without it, entries are keyed by the source image identity.
+    """
+    if abs(degrees) < 0.01:
+        return img
+    key = (cache_key if cache_key is not None else id(img), round(degrees, 2))
+    hit = _rotation_cache.get(key)
+    if hit is not None and (cache_key is not None or hit[0] is img):
+        metrics.count('rotate.hit')
+        return hit[1]
+    w, h = img.size
+    side = int(min(w, h))
+    theta = math.radians(degrees)
+    scale = rotation_fill_scale(degrees)
+    with span('rotate', px=side), ui.ImageContext(side, side) as ctx:
+        ui.concat_ctm(ui.Transform.translation(side/2.0, side/2.0))
+        ui.concat_ctm(ui.Transform.rotation(theta))
+        img.draw(-side*scale/2.0, -side*scale/2.0, side*scale, side*scale)
+        out = ctx.get_image()
+    # Only identity-keyed entries need to pin the source image for the `is` check.
+    _rotation_cache.put(key, (None if cache_key is not None else img, out), image_nbytes(out))
+    return out
+
+# ---------- Caption ----------
+def _caption_box(w, h, caption_text):
+    return caption_box(w, h, caption_text, _metrics(FONT_CAPTION))
+
+def draw_caption_bottom_right(w, h, caption_text):
+    cap_pad = 8
+    (bx, by, box_w, box_h), (text_w, text_h) = _caption_box(w, h, caption_text)
+    ui.set_color((0, 0, 0, CHIP_ALPHA))
+    ui.Path.rounded_rect(bx, by, box_w, box_h, 8).fill()
+    ui.draw_string(caption_text,
+                   rect=(bx + cap_pad, by + cap_pad, text_w, text_h),
+                   font=FONT_CAPTION, color=WHITE, alignment=ui.ALIGN_LEFT,
+                   line_break_mode=ui.LB_TRUNCATE_TAIL)
+    return (bx, by, box_w, box_h)
+
+# ---------- Multiline address chip (wrapping) ----------
+def _wrap_text_to_width(text, font, max_text_w):
+    return wrap_text(text, max_text_w, _metrics(font))
+
+def _address_chip_layout(w, h, addr_text):
+    """Wrap the address and size its chip -> (lines, max_text_w, (bx, by, box_w, box_h))."""
+    return address_chip_layout(w, h, addr_text, _metrics(FONT_CHIP), _chip_line_h())
+
+def draw_address_top_left(w, h, addr_text):
+    """Draw compact two-line address chip at top-left with wrapping."""
+    cap_pad = 8
+    lines, max_text_w, (bx, by, box_w, box_h) = _address_chip_layout(w, h, addr_text)
+    line_h = _chip_line_h()
+
+    ui.set_color((0, 0, 0, CHIP_ALPHA))
+    ui.Path.rounded_rect(bx, by, box_w, box_h, 8).fill()
+
+    ui.set_color(WHITE)
+    tx, ty = bx + cap_pad, by + cap_pad
+    for line in lines:
+        ui.draw_string(line, rect=(tx, ty, max_text_w, line_h),
+                       font=FONT_CHIP, color=WHITE, alignment=ui.ALIGN_LEFT,
+                       line_break_mode=ui.LB_TRUNCATE_TAIL)
+        ty += line_h
+
+    return (bx, by, box_w, box_h)
+
+# ---------- Overlays ----------
+# Every static overlay is rendered once into its own small layer image, cached by the
+# inputs that affect it, and blitted onto the rotated base. The finished composite
+# (base + static layers) is cached too. The address chip that arrives later is a cached
+# layer of its own, shown over the composite; it is flattened into a full-size copy
+# (ui.Image is immutable) only for export.
+OVERLAY_CACHE_BYTES = 64 * 1024 * 1024
+COMPOSITE_CACHE_BYTES = 96 * 1024 * 1024
+_overlay_cache = LRUCache(max_bytes=OVERLAY_CACHE_BYTES)      # {layer key: ui.Image}
+_composite_cache = LRUCache(max_bytes=COMPOSITE_CACHE_BYTES)  # {(snap key, deg, layer keys): ui.Image}
+
+def _cached_layer(key, rect, draw, *args):
+    """Render draw(*args), which uses full-canvas coordinates, into a rect-sized cached image."""
+    layer = _overlay_cache.get(key)
+    if layer is None:
+        x, y, lw, lh = rect
+        with ui.ImageContext(lw, lh) as ctx:
+            ui.concat_ctm(ui.Transform.translation(-x, -y))
+            draw(*args)
+            layer = ctx.get_image()
+        _overlay_cache.put(key, layer, image_nbytes(layer))
+    return layer
+
+def _draw_grid_crosshair(w, h, grid_divisions, show_crosshair):
+    if grid_divisions > 0:
+        ui.set_color((1, 1, 1, GRID_ALPHA))
+        for i in range(1, grid_divisions):
+            x = i * (w / grid_divisions)
+            p = ui.Path(); p.move_to(x, 0); p.line_to(x, h)
+            p.line_width = 0.8; p.stroke()
+        for i in range(1, grid_divisions):
+            y = i * (h / grid_divisions)
+            p = ui.Path(); p.move_to(0, y); p.line_to(w, y)
+            p.line_width = 0.8; p.stroke()
+    if show_crosshair:
+        cx, cy = w/2.0, h/2.0
+        ui.set_color((1, 1, 1, CROSSHAIR_ALPHA))
+        for (x1, y1, x2, y2) in [(cx-18, cy, cx+18, cy), (cx, cy-18, cx, cy+18)]:
+            p = ui.Path(); p.move_to(x1, y1); p.line_to(x2, y2)
+            p.line_width = 1.2; p.stroke()
+        ui.Path.oval(cx-2, cy-2, 4, 4).fill()
+
+def _draw_scale_bar(w, h, bar):
+    bar_len_m, bar_len_px, x_bar, y_bar = bar
+    ui.set_color(WHITE)
+    ui.Path.rect(x_bar, y_bar, bar_len_px, 6).fill()
+    ui.draw_string(scale_bar_label(bar_len_m), rect=(x_bar, y_bar - 18, bar_len_px, 18),
+                   font=FONT_SCALE, color=WHITE, alignment=ui.ALIGN_CENTER)
+
+def _draw_north_arrow(w, h, rotation_deg):
+    na_x, na_y, na_size, _ = north_arrow_rect(w, h)
+    ui.set_color(WHITE)
+    p1, p2, p3 = north_arrow_triangle(w, h, rotation_deg)
+    p = ui.Path(); p.move_to(*p1); p.line_to(*p2); p.line_to(*p3); p.close(); p.fill()
+    ui.draw_string('N', rect=(na_x, na_y + na_size - 18, na_size, 18),
+                   font=FONT_NORTH, color=RED, alignment=ui.ALIGN_CENTER)
+
+def _draw_grid_labels(w, h, labels):
+    """labels: [(x, y, text)] from GeoTransform.grid_labels, one small chip per intersection."""
+    for x, y, text in labels:
+        tw, th = _measure(text, FONT_GRID)
+        lx, ly, lw, lh = grid_label_box(x, y, tw, th)
+        ui.set_color((0, 0, 0, GRID_LABEL_ALPHA))
+        ui.Path.rect(lx, ly, lw, lh).fill()
+        ui.draw_string(text, rect=(lx + 3, ly + 1, tw, th), font=FONT_GRID, color=WHITE)
+
+def overlay_layers(w, h, meters, rotation_deg=0.0, show_grid=True, show_crosshair=True,
+                   grid_divisions=4, caption=None, geo=None):
+    """Return [(key, layer_image, rect)] for the static overlays, each cached by its inputs.
+
+    geo (GeoTransform of the view) gives the scale bar its true ground resolution, which
+    depends on latitude and on the rotation fill scale; without it meters / w is used.
+    """
+    w, h = int(w), int(h)
+    specs = []
+    divs = grid_divisions if show_grid else 0
+    if divs > 0 or show_crosshair:
+        specs.append((('grid', w, h, divs, bool(show_crosshair)), (0, 0, w, h),
+                      _draw_grid_crosshair, (w, h, divs, show_crosshair)))
+    bar = scale_bar_geometry(w, h, meters, geo.mpp_at if geo is not None else None)
+    _, bar_len_px, x_bar, y_bar = bar
+    specs.append((('scale', w, h, bar[0], round(bar_len_px, 1)), pixel_rect(x_bar, y_bar - 18, bar_len_px, 24),
+                  _draw_scale_bar, (w, h, bar)))
+    specs.append((('north', w, h, round(rotation_deg, 2)), pixel_rect(*north_arrow_rect(w, h)),
+                  _draw_north_arrow, (w, h, rotation_deg)))
+    if caption:
+        specs.append((('caption', w, h, caption), pixel_rect(*_caption_box(w, h, caption)[0]),
+                      draw_caption_bottom_right, (w, h, caption)))
+    return [(key, _cached_layer(key, rect, draw, *args), rect) for key, rect, draw, args in specs]
+
+def compose_overlays(base_img, meters, map_type, lat, lon,
+                     rotation_deg=0.0, show_grid=True,
+                     show_crosshair=True, grid_divisions=4, show_caption=True, cache_key=None,
+                     show_grid_labels=None):
+    """Rotated base + all static overlays (no address chip).
+
+    With cache_key (the snapshot key) the composite itself is cached, so a re-render
+    of the same view, or the later address update, skips straight to the chip.
+    show_grid_labels (default GRID_LABELS) adds lat/lon at every grid intersection.
+    """
+    w, h = base_img.size
+    geo = _geo(lat, lon, meters, w, rotation_deg)
+    caption = overlay_caption(map_type, meters, lat, lon, rotation_deg) if show_caption else None
+    layers = overlay_layers(w, h, meters, rotation_deg, show_grid, show_crosshair, grid_divisions, caption, geo)
+    labeled = GRID_LABELS if show_grid_labels is None else show_grid_labels
+    labels = geo.grid_labels(grid_divisions) if labeled and show_grid else []
+    ckey = None
+    if cache_key is not None:
+        ckey = (cache_key, round(rotation_deg, 2), tuple(k for k, _, _ in layers), bool(labels))
+        hit = _composite_cache.get(ckey)
+        if hit is not None:
+            metrics.count('overlays.hit')
+            return hit
+    with span('overlays', px=int(w)), ui.ImageContext(w, h) as ctx:
+        base_img.draw(0, 0, w, h)
+        for _, layer, (x, y, lw, lh) in layers:
+            layer.draw(x, y, lw, lh)
+        _draw_grid_labels(w, h, labels)
+        out = ctx.get_image()
+    if ckey is not None:
+        _composite_cache.put(ckey, out, image_nbytes(out))
+    return out
+
+def address_chip_layer(w, h, addr_text):
+    """The address chip for a w x h canvas -> (layer image, rect). The layer is rendered once
+    per canvas size and address (shared with the sweep); the app shows it in its own view."""
+    with span('address_chip'):
+        rect = pixel_rect(*_address_chip_layout(w, h, addr_text)[2])
+        key = ('chip', int(w), int(h), addr_text)
+        return _cached_layer(key, rect, draw_address_top_left, w, h, addr_text), rect
+
+def flatten_layer(composite, layer):
+    """composite with a (layer image, rect) drawn over it: a new full-size image."""
+    w, h = composite.size
+    img, rect = layer
+    with span('flatten', px=int(w)), ui.ImageContext(w, h) as ctx:
+        composite.draw(0, 0, w, h)
+        img.draw(*rect)
+        return ctx.get_image()
+
+def apply_address_chip(composite, addr_text):
+    """Composite + address chip in one image: a full-size copy of the composite and a blit of
+    the cached chip layer. For exports; on screen the chip layer is shown as is."""
+    return flatten_layer(composite, address_chip_layer(*composite.size, addr_text))
+
+def draw_overlays(base_img, meters, map_type, lat, lon,
+                  rotation_deg=0.0, show_grid=True,
+                  show_crosshair=True, grid_divisions=4, show_caption=True, full_addr=None):
+    out = compose_overlays(base_img, meters, map_type, lat, lon, rotation_deg=rotation_deg,
+                           show_grid=show_grid, show_crosshair=show_crosshair,
+                           grid_divisions=grid_divisions, show_caption=show_caption)
+    return apply_address_chip(out, full_addr) if full_addr else out
+
+# ---------- Geocoding client (pooled, rate-limited, coalescing, hedged) ----------
+NOMINATIM_URL = 'https://nominatim.openstreetmap.org/reverse'
+NOMINATIM_USER_AGENT = 'MapSnapshotStudio/1.0 (contact: you@example.com)'
+NOMINATIM_RATE = 1.0        # requests per second (Nominatim usage policy)
+GEOCODE_TIMEOUT = 6.0
+GEOCODE_HEDGE_DELAY = 1.5   # launch OSM if Apple hasn't answered by then; None = strictly after Apple
+
+class TokenBucket(object):
+    """Blocking token-bucket rate limiter."""
+    def __init__(self, rate, capacity=1.0):
+        self.rate, self.capacity = float(rate), float(capacity)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Take one token, sleeping as needed; False if it would take longer than timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                need = (1.0 - self._tokens) / self.rate
+            if deadline is not None and now + need > deadline:
+                return False
+            time.sleep(need)
+
+class SingleFlight(object):
+    """Coalesce concurrent calls for the same key into one execution."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}   # key -> [event, result, exc]
+        self.coalesced = 0
+
+    def do(self, key, fn, *args):
+        """Run fn(*args) once per key in flight; return (result, shared)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+            else:
+                self.coalesced += 1
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1], True
+        try:
+            call[1] = fn(*args)
+        except BaseException as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+        return call[1], False
+
+class GeocodeClient(object):
+    """Apple/OSM reverse geocoder with a pooled HTTP session and hedged requests.
+
+    Identical concurrent lookups share one request, Nominatim calls pass a
+    token bucket, and when hedge_delay is set the OSM request is started if
+    Apple has not answered by then; the first valid result wins. apple_fn and
+    osm_url can point at fakes / a local stub server.
+
+    Each provider answers with the address, '' when it answered but has no
+    address for the point, or None when it failed (error, timeout, offline,
+    rate limit); only the first is a result and only '' from all is a negative.
+    """
+    def __init__(self, apple_fn=None, osm_url=NOMINATIM_URL, user_agent=NOMINATIM_USER_AGENT,
+                 rate=NOMINATIM_RATE, hedge_delay=GEOCODE_HEDGE_DELAY, timeout=GEOCODE_TIMEOUT,
+                 use_apple=True, max_workers=4):
+        self.apple_fn = apple_fn
+        self.osm_url, self.user_agent = osm_url, user_agent
+        self.hedge_delay, self.timeout = hedge_delay, timeout
+        self.use_apple = use_apple
+        self.max_workers = max_workers
+        self.limiter = TokenBucket(rate)
+        self.flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._pool = None
+        self._session = None
+        self.latency = {'apple': deque(maxlen=512), 'osm': deque(maxlen=512), 'lookup': deque(maxlen=512)}
+        self.counts = {'apple': 0, 'osm': 0, 'none': 0, 'failed': 0, 'hedged': 0, 'rate_limited': 0}
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                sess = requests.Session()
+                sess.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers))
+                sess.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers))
+                sess.headers['User-Agent'] = self.user_agent
+                self._session = sess
+            return self._session
+
+    def _timed(self, name, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.latency[name].append(time.perf_counter() - t0)
+
+    def _apple(self, lat, lon):
+        fn = self.apple_fn or location.reverse_geocode
+        try:
+            arr = fn({'latitude': lat, 'longitude': lon})
+        except Exception:
+            return None
+        if arr is None:                      # CLGeocoder error (offline, throttled)
+            return None
+        return (_format_compact_apple(arr[0]) if arr else None) or ''
+
+    def _osm(self, lat, lon):
+        if not self.limiter.acquire(timeout=self.timeout):
+            self.counts['rate_limited'] += 1
+            return None
+        try:
+            params = {'format': 'json', 'lat': lat, 'lon': lon, 'zoom': 18, 'addressdetails': 1}
+            r = self.session().get(self.osm_url, params=params, timeout=self.timeout)
+            if r.ok:
+                data = r.json()
+                return (_format_compact_osm(data) if isinstance(data, dict) else None) or ''
+        except Exception:
+            pass
+        return None
+
+    def _resolve(self, lat, lon):
+        from concurrent.futures import wait, FIRST_COMPLETED
+        pool = self._executor()
+        futures = {}
+        answered_empty = True
+        if self.use_apple:
+            fa = pool.submit(self._timed, 'apple', self._apple, lat, lon)
+            futures[fa] = 'apple'
+            wait([fa], timeout=self.hedge_delay)
+            if fa.done():
+                if fa.result():
+                    return fa.result(), 'apple'
+                answered_empty = fa.result() == ''
+                del futures[fa]
+            else:
+                self.counts['hedged'] += 1
+        futures[pool.submit(self._timed, 'osm', self._osm, lat, lon)] = 'osm'
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.result():
+                    return f.result(), futures[f]
+                answered_empty &= f.result() == ''
+        return None, ('none' if answered_empty else None)
+
+    def lookup(self, lat, lon, key=None):
+        """Return (text, source, shared). source is 'none' when every provider answered
+        without an address, None when the lookup failed (and should not be cached).
+
+        shared is True when the result came from another caller's in-flight request.
+        """
+        key = key if key is not None else geocode_key(lat, lon)
+        (txt, source), shared = self.flights.do(key, self._timed, 'lookup', self._resolve, lat, lon)
+        if not shared:
+            self.counts[source or 'failed'] += 1
+        return txt, source, shared
+
+    def stats(self):
+        st = dict(self.counts, coalesced=self.flights.coalesced)
+        st['latency'] = {k: percentiles(v) for k, v in self.latency.items()}
+        return st
+
+_geocoder = GeocodeClient()
+
+# ---------- Geocoding (Apple first, OSM fallback) ----------
+def reverse_geocode_compact(lat, lon, reuse_radius_m=GEOCODE_REUSE_RADIUS_M):
+    """Return compact two-line address string or None.
+
+    Cached on disk by quantized coords. A point both providers answered with no
+    address is cached briefly as a negative; a failed lookup (offline, timeout,
+    rate limit) is not cached at all. A cached address within reuse_radius_m
+    metres is reused (GPS jitter).
+    """
+    key = geocode_key(lat, lon)
+    with span('geocode') as sp:
+        found, txt = _geocode_store.get(key)
+        if found:
+            sp.set('store')
+            return txt
+        if reuse_radius_m:
+            txt = _geocode_store.nearest(lat, lon, reuse_radius_m)
+            if txt:
+                sp.set('nearby')
+                return txt
+        txt, source, shared = _geocoder.lookup(lat, lon, key)
+        sp.set(source, shared=shared)
+    if not shared and source is not None:
+        _geocode_store.put(key, txt, source)
+    return txt
+
+# ---------- Snapshot (with cache) ----------
+def snapshot_key(lat, lon, meters, map_type, img_w):
+    return (round(lat, 5), round(lon, 5), int(meters), map_type, int(img_w))
+
+_snapshot_flight = SingleFlight()   # a render waiting on an in-flight prefetch of the same view shares it
+_snapshot_writer = LazyThreadPool(1)   # disk-store writes, off the render path
+
+_CG = {}
+
+def _cg(name):
+    """CoreGraphics function with its ctypes signature set."""
+    fn = _CG.get(name)
+    if fn is None:
+        from ctypes import c_void_p, c_size_t, c_uint32, c_bool, c_int
+        from objc_util import c, CGRect
+        restype, argtypes = {
+            'CGColorSpaceCreateDeviceRGB': (c_void_p, []),
+            'CGBitmapContextCreate': (c_void_p, [c_void_p, c_size_t, c_size_t, c_size_t, c_size_t, c_void_p, c_uint32]),
+            'CGContextDrawImage': (None, [c_void_p, CGRect, c_void_p]),
+            'CGImageGetWidth': (c_size_t, [c_void_p]),
+            'CGImageGetHeight': (c_size_t, [c_void_p]),
+            'CGDataProviderCreateWithData': (c_void_p, [c_void_p, c_void_p, c_size_t, c_void_p]),
+            'CGImageCreate': (c_void_p, [c_size_t, c_size_t, c_size_t, c_size_t, c_size_t, c_void_p, c_uint32,
+                                         c_void_p, c_void_p, c_bool, c_int]),
+            'CFRelease': (None, [c_void_p]),
+        }[name]
+        fn = getattr(c, name)
+        fn.restype, fn.argtypes = restype, argtypes
+        _CG[name] = fn
+    return fn
+
+_ALPHA_PREMULTIPLIED_LAST = 1   # kCGImageAlphaPremultipliedLast: RGBA byte order
+
+def ui_image_to_rgba(img):
+    """ui.Image -> (width, height, RGBA bytearray, scale), drawn into a CoreGraphics bitmap."""
+    from ctypes import c_char
+    from objc_util import ObjCInstance, CGRect, CGPoint, CGSize
+    cg = ObjCInstance(img).CGImage()
+    w, h = _cg('CGImageGetWidth')(cg), _cg('CGImageGetHeight')(cg)
+    buf = bytearray(w * h * 4)
+    cs = _cg('CGColorSpaceCreateDeviceRGB')()
+    ctx = _cg('CGBitmapContextCreate')((c_char * len(buf)).from_buffer(buf), w, h, 8, w * 4, cs,
+                                       _ALPHA_PREMULTIPLIED_LAST)
+    try:
+        _cg('CGContextDrawImage')(ctx, CGRect(CGPoint(0, 0), CGSize(w, h)), cg)
+    finally:
+        _cg('CFRelease')(ctx); _cg('CFRelease')(cs)
+    return w, h, buf, img.scale
+
+def rgba_to_ui_image(px):
+    """StoredPixels -> ui.Image; the mapped pixels are wrapped, not copied, until drawn."""
+    from ctypes import c_char
+    from objc_util import ObjCClass, CGRect, CGPoint, CGSize
+    w, h, n = px.width, px.height, len(px.buf)
+    cs = _cg('CGColorSpaceCreateDeviceRGB')()
+    provider = _cg('CGDataProviderCreateWithData')(None, (c_char * n).from_buffer(px.buf), n, None)
+    cgimg = _cg('CGImageCreate')(w, h, 8, 32, w * 4, cs, _ALPHA_PREMULTIPLIED_LAST, provider, None, False, 0)
+    try:
+        uiimg = ObjCClass('UIImage').imageWithCGImage_scale_orientation_(cgimg, px.scale, 0)
+        pw, ph = w / px.scale, h / px.scale
+        with ui.ImageContext(pw, ph, px.scale) as ctx:
+            uiimg.drawInRect_(CGRect(CGPoint(0, 0), CGSize(pw, ph)))
+            return ctx.get_image()
+    finally:
+        _cg('CFRelease')(cgimg); _cg('CFRelease')(provider); _cg('CFRelease')(cs)
+
+def _load_stored_snapshot(key):
+    try:
+        with span('snapshot.disk'):
+            px = _snapshot_store.get(key)
+            return rgba_to_ui_image(px) if px is not None else None
+    except Exception:
+        return None
+
+def _store_snapshot(key, snap):
+    try:
+        w, h, buf, scale = ui_image_to_rgba(snap)
+        _snapshot_store.put(key, w, h, buf, scale)
+    except Exception:
+        pass
+
+def _render_snapshot(key, lat, lon, meters, map_type, img_w):
+    snap = _pyramid.render(lat, lon, meters, map_type, img_w) if _pyramid.enabled else _load_stored_snapshot(key)
+    if snap is not None:
+        metrics.count('snapshot.pyramid' if _pyramid.enabled else 'snapshot.disk')
+    else:
+        snap = location.render_map_snapshot(
+            lat, lon,
+            width=int(meters), height=int(meters),
+            map_type=map_type,
+            img_width=int(img_w), img_height=int(img_w)
+        )
+        if _snapshot_store.enabled:
+            _snapshot_writer.submit(_store_snapshot, key, snap)
+    _snapshot_cache.put(key, snap, image_nbytes(snap))
+    return snap
+
+def get_snapshot(lat, lon, meters, map_type, img_w):
+    key = snapshot_key(lat, lon, meters, map_type, img_w)
+    snap = _snapshot_cache.get(key)
+    if snap is None:
+        with span('snapshot', px=int(img_w)) as sp:
+            snap, shared = _snapshot_flight.do(key, _render_snapshot, key, lat, lon, meters, map_type, img_w)
+            sp.set('shared' if shared else 'miss')
+    else:
+        metrics.count('snapshot.hit')
+    _prefetcher.claim(key)
+    return snap
+
+# ---------- Tile pyramid (opt-in; overlapping views share tiles) ----------
+TILE_PYRAMID_ENABLED = False
+PYRAMID_TILE_PX = 1024                       # px per tile snapshot (slippy addressing at this tile size)
+PYRAMID_ZOOMS = range(8, 20)
+PYRAMID_CACHE_BYTES = 128 * 1024 * 1024      # decoded tiles in memory; the disk store keeps them too
+PYRAMID_WORKERS = 3
+
+class TilePyramid(object):
+    """Assembles square views from fixed-zoom map tiles, fetching only the tiles it lacks.
+
+    Views map to the zoom nearest their resolution (pyramid_cover); each tile is one
+    render_map_snapshot of its own ground square, kept in a memory LRU and in the disk
+    snapshot store, and coalesced while in flight. A missing tile whose four children
+    are cached is downsampled from them instead of fetched. Missing tiles are fetched in
+    parallel, then all tiles are drawn cropped and scaled onto the view. Map labels
+    are cut at tile edges, so this suits satellite imagery best.
+    """
+    def __init__(self, render_fn=None, tile_px=PYRAMID_TILE_PX, zooms=PYRAMID_ZOOMS,
+                 cache_bytes=PYRAMID_CACHE_BYTES, workers=PYRAMID_WORKERS, enabled=TILE_PYRAMID_ENABLED):
+        self.render_fn = render_fn
+        self.tile_px, self.zooms, self.enabled = tile_px, zooms, enabled
+        self._tiles = LRUCache(max_bytes=cache_bytes)   # {(map_type, z, tx, ty, tile_px): ui.Image}
+        self._flight = SingleFlight()
+        self._pool = LazyThreadPool(workers)
+        self._lock = threading.Lock()
+        self.counts = {'views': 0, 'tiles': 0, 'memory_hits': 0, 'disk_hits': 0, 'composed': 0, 'fetched': 0,
+                       'shared': 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def _from_children(self, key):
+        """Downsample the four cached tiles one zoom deeper into this tile, or None."""
+        map_type, z, tx, ty, tile_px = key
+        kids = [self._tiles.get((map_type, z + 1, 2 * tx + i, 2 * ty + j, tile_px)) for j in (0, 1) for i in (0, 1)]
+        if any(k is None for k in kids):
+            return None
+        half = tile_px / 2.0
+        with ui.ImageContext(tile_px, tile_px, kids[0].scale) as ctx:   # keep the tiles' pixel density
+            for n, kid in enumerate(kids):
+                kid.draw((n % 2) * half, (n // 2) * half, half, half)
+            return ctx.get_image()
+
+    def _fetch(self, key):
+        map_type, z, tx, ty, tile_px = key
+        img = self._from_children(key)
+        if img is not None:
+            self._count('composed')
+            self._tiles.put(key, img, image_nbytes(img))
+            return img
+        img = _load_stored_snapshot(('tile',) + key)
+        if img is not None:
+            self._count('disk_hits')
+        else:
+            lat, lon, meters = pyramid_tile_view(tx, ty, z, tile_px)
+            with span('pyramid.tile', z=z):
+                img = (self.render_fn or location.render_map_snapshot)(
+                    lat, lon, width=meters, height=meters, map_type=map_type,
+                    img_width=tile_px, img_height=tile_px)
+            self._count('fetched')
+            if _snapshot_store.enabled:
+                _snapshot_writer.submit(_store_snapshot, ('tile',) + key, img)
+        self._tiles.put(key, img, image_nbytes(img))
+        return img
+
+    def _tile(self, key):
+        img = self._tiles.get(key)
+        if img is not None:
+            self._count('memory_hits')
+            return img
+        img, shared = self._flight.do(key, self._fetch, key)
+        if shared:
+            self._count('shared')
+        return img
+
+    def render(self, lat, lon, meters, map_type, img_w):
+        """-> ui.Image of img_w px covering meters x meters around (lat, lon), north up."""
+        img_w = int(img_w)
+        z, cover = pyramid_cover(lat, lon, meters, img_w, self.tile_px, self.zooms)
+        keys = [(map_type, z, tx, ty, self.tile_px) for tx, ty, _, _, _ in cover]
+        self._count('views'); self._count('tiles', len(keys))
+        tiles = list(self._pool.map(self._tile, keys))
+        # same point size and scale as the render_map_snapshot it stands in for (the tiles come
+        # from render_map_snapshot too), so a 2x / 3x device gets the same pixel count
+        with ui.ImageContext(img_w, img_w, tiles[0].scale) as ctx:
+            for img, (_, _, dx, dy, dsize) in zip(tiles, cover):
+                img.draw(dx, dy, dsize, dsize)
+            return ctx.get_image()
+
+    def clear(self):
+        self._tiles.clear()
+
+    def stats(self):
+        with self._lock:
+            st = dict(self.counts)
+        reused = st['memory_hits'] + st['disk_hits'] + st['composed'] + st['shared']
+        st['hit_rate'] = reused / float(st['tiles']) if st['tiles'] else 0.0
+        st['cache'] = self._tiles.stats()
+        return st
+
+_pyramid = TilePyramid()
+
+# ---------- Snapshot prefetch (opt-in) ----------
+PREFETCH_ENABLED = False
+PREFETCH_WORKERS = 2
+PREFETCH_MAX_BYTES = 64 * 1024 * 1024   # snapshot bytes one prefetch round may add
+PREFETCH_IDLE_DELAY = 0.6               # s of quiet after the final image before prefetching
+
+def _prefetch_snapshot(lat, lon, meters, map_type, img_w):
+    """Fill the snapshot cache for one view -> nbytes, or None if it was already cached / in flight."""
+    key = snapshot_key(lat, lon, meters, map_type, img_w)
+    if key in _snapshot_cache:
+        return None
+    snap, shared = _snapshot_flight.do(key, _render_snapshot, key, lat, lon, meters, map_type, img_w)
+    return None if shared else image_nbytes(snap)
+
+class SnapshotPrefetcher(object):
+    """Speculatively renders likely next views into the snapshot cache.
+
+    schedule() replaces the queue with prioritised views; after idle_delay a small pool fetches
+    them best-first until the round has added max_bytes of snapshots. cancel() drops
+    the queue at once (fetches already running finish and stay cached). claim() is called on
+    every snapshot lookup so stats() can report how many prefetches were used.
+    """
+    def __init__(self, fetch=_prefetch_snapshot, workers=PREFETCH_WORKERS,
+                 max_bytes=PREFETCH_MAX_BYTES, idle_delay=PREFETCH_IDLE_DELAY):
+        self._fetch = fetch
+        self.workers, self.max_bytes, self.idle_delay = workers, max_bytes, idle_delay
+        self._pool = LazyThreadPool(workers)
+        self._lock = threading.Lock()
+        self._gen = 0
+        self._heap = []
+        self._timer = None
+        self._round_bytes = 0
+        self._keys = {}   # snapshot_key -> 'inflight' | 'claimed' | nbytes (prefetched, unused)
+        self.counts = {'scheduled': 0, 'fetched': 0, 'hits': 0, 'cached': 0, 'dropped': 0,
+                       'over_budget': 0, 'evicted_unused': 0, 'failed': 0}
+
+    def schedule(self, views):
+        """views: [(lat, lon, meters, map_type, img_w)], most likely first."""
+        with self._lock:
+            gen = self._cancel_locked()
+            self._heap = [(prio, view) for prio, view in enumerate(views)]
+            heapq.heapify(self._heap)
+            self._round_bytes = 0
+            self.counts['scheduled'] += len(views)
+            self._timer = threading.Timer(self.idle_delay, self._start, (gen,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def cancel(self):
+        with self._lock:
+            self._cancel_locked()
+
+    def _cancel_locked(self):
+        self._gen += 1
+        self.counts['dropped'] += len(self._heap)
+        self._heap = []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return self._gen
+
+    def claim(self, key):
+        with self._lock:
+            state = self._keys.get(key)
+            if state == 'inflight':
+                self._keys[key] = 'claimed'   # counted when the fetch lands, if it was ours
+            elif isinstance(state, int):
+                del self._keys[key]
+                self.counts['hits'] += 1
+
+    def _unused_bytes(self):
+        total = 0
+        for key, state in list(self._keys.items()):
+            if isinstance(state, int):
+                if key in _snapshot_cache:
+                    total += state
+                else:
+                    del self._keys[key]
+                    self.counts['evicted_unused'] += 1
+        return total
+
+    def _start(self, gen):
+        with self._lock:
+            n = min(self.workers, len(self._heap)) if gen == self._gen else 0
+        for _ in range(n):
+            self._pool.submit(self._drain, gen)
+
+    def _drain(self, gen):
+        while True:
+            with self._lock:
+                if gen != self._gen or not self._heap:
+                    return
+                _, view = heapq.heappop(self._heap)
+                est = view[4] * view[4] * 4
+                if self._round_bytes + est > self.max_bytes:
+                    self.counts['over_budget'] += 1
+                    continue
+                key = snapshot_key(*view)
+                if key in self._keys:
+                    continue
+                self._keys[key] = 'inflight'
+            try:
+                nbytes, outcome = self._fetch(*view), None
+            except Exception:
+                nbytes, outcome = None, 'failed'
+            with self._lock:
+                claimed = self._keys.pop(key, None) == 'claimed'
+                if nbytes is None:
+                    self.counts[outcome or 'cached'] += 1
+                    continue
+                self.counts['fetched'] += 1
+                if gen == self._gen:
+                    self._round_bytes += nbytes
+                if claimed:
+                    self.counts['hits'] += 1
+                else:
+                    self._keys[key] = nbytes
+
+    def stats(self):
+        with self._lock:
+            st = dict(self.counts, unused_bytes=self._unused_bytes(), queued=len(self._heap))
+        st['hit_rate'] = st['hits'] / float(st['fetched']) if st['fetched'] else 0.0
+        return st
+
+_prefetcher = SnapshotPrefetcher()
+
+# ---------- Render scheduling ----------
+SLIDER_DEBOUNCE = 0.12   # s of slider quiet time before the trailing preview render
+
+class RenderCancelled(Exception):
+    """Raised at a job checkpoint once a newer job has been submitted."""
+
+class RenderJob(object):
+    def __init__(self, scheduler, job_id, fn, args, not_before):
+        self.scheduler = scheduler
+        self.job_id = job_id
+        self.fn, self.args = fn, args
+        self.not_before = not_before
+
+    def cancelled(self):
+        return self.job_id != self.scheduler.generation
+
+    def check(self):
+        """Checkpoint: abandon the job if it has been superseded."""
+        if self.cancelled():
+            raise RenderCancelled()
+
+class RenderScheduler(object):
+    """Single worker thread that only ever runs the newest submitted job.
+
+    submit() hands out monotonically increasing job ids; a queued job that is
+    superseded before it starts is dropped, a running one sees check() raise
+    RenderCancelled at its next checkpoint. A delay debounces bursts (slider
+    drags): the job starts only once nothing newer arrived for that long.
+    apply() runs a view update on the UI thread only if its job is still the
+    latest, so stale results can never overwrite newer ones.
+    """
+    def __init__(self, dispatch=None):
+        self.dispatch = dispatch or (lambda fn: ui.delay(fn, 0.0))
+        self.generation = 0
+        self._cv = threading.Condition()
+        self._pending = None
+        self._thread = None
+        self.counts = {'submitted': 0, 'run': 0, 'dropped': 0, 'cancelled': 0, 'completed': 0, 'failed': 0}
+
+    def submit(self, fn, *args, delay=0.0):
+        """Queue fn(job, *args) as the newest job, superseding everything before it."""
+        with self._cv:
+            self.generation += 1
+            job = RenderJob(self, self.generation, fn, args, time.monotonic() + delay)
+            if self._pending is not None:
+                self.counts['dropped'] += 1
+            self._pending = job
+            self.counts['submitted'] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+            self._cv.notify()
+        return job
+
+    def cancel(self):
+        """Supersede every queued and running job without submitting a new one."""
+        with self._cv:
+            self.generation += 1
+            if self._pending is not None:
+                self.counts['dropped'] += 1
+                self._pending = None
+
+    def is_current(self, job):
+        return job.job_id == self.generation
+
+    def apply(self, job, fn):
+        self.dispatch(lambda: fn() if self.is_current(job) else None)
+
+    def _next(self):
+        with self._cv:
+            while True:
+                job = self._pending
+                if job is None:
+                    self._cv.wait()
+                    continue
+                remaining = job.not_before - time.monotonic()
+                if remaining > 0:
+                    self._cv.wait(remaining)   # woken early if a newer job replaces it
+                    continue
+                self._pending = None
+                return job
+
+    def _loop(self):
+        while True:
+            job = self._next()
+            if job.cancelled():
+                self.counts['dropped'] += 1
+                continue
+            self.counts['run'] += 1
+            try:
+                job.fn(job, *job.args)
+                self.counts['completed'] += 1
+            except RenderCancelled:
+                self.counts['cancelled'] += 1
+            except Exception:
+                self.counts['failed'] += 1
+
+# ---------- Export (background pre-encode straight to a temp file) ----------
+EXPORT_FORMATS = [('PNG', '.png'), ('JPEG', '.jpg'), ('WebP', '.webp')]
+EXPORT_QUALITY = 0.9      # JPEG / WebP quality, 0..1
+EXPORT_PNG_LEVEL = None   # None: native ImageIO PNG; 0-9: streamed zlib level (1 = fast, larger file)
+EXPORT_BAND_ROWS = 64     # rows per band for the streamed PNG
+_IMAGEIO_UTI = {'PNG': 'public.png', 'JPEG': 'public.jpeg'}
+
+def _imageio_write(img, path, uti, quality=None):
+    """Encode a ui.Image with ImageIO (CGImageDestination) directly into path; no encoded buffer in Python."""
+    from ctypes import c_void_p, c_size_t, c_bool
+    from objc_util import ObjCInstance, c, ns, nsurl
+    create = c.CGImageDestinationCreateWithURL
+    create.restype, create.argtypes = c_void_p, [c_void_p, c_void_p, c_size_t, c_void_p]
+    add = c.CGImageDestinationAddImage
+    add.restype, add.argtypes = None, [c_void_p, c_void_p, c_void_p]
+    finalize = c.CGImageDestinationFinalize
+    finalize.restype, finalize.argtypes = c_bool, [c_void_p]
+    release = c.CFRelease
+    release.restype, release.argtypes = None, [c_void_p]
+    dest = create(nsurl(path), ns(uti), 1, None)
+    if not dest:
+        raise IOError(f'ImageIO cannot write {uti}')
+    try:
+        props = ns({'kCGImageDestinationLossyCompressionQuality': quality}) if quality is not None else None
+        add(dest, ObjCInstance(img).CGImage(), props)
+        if not finalize(dest):
+            raise IOError(f'ImageIO failed to encode {uti}')
+    finally:
+        release(dest)
+
+def encode_image_file(img, path, fmt='PNG', quality=EXPORT_QUALITY, png_level=EXPORT_PNG_LEVEL):
+    """Write a ui.Image to path as PNG / JPEG / WebP.
+
+    PNG and JPEG go through ImageIO, which streams into the file. WebP and leveled PNG start
+    from the raw CoreGraphics pixels (ui_image_to_rgba, no PNG round trip): Pillow wraps them
+    without a copy for WebP, leveled PNG streams them through StreamingPNGWriter in bands of
+    EXPORT_BAND_ROWS rows. Composites are opaque, so alpha is dropped as in the sweep frames.
+    to_png()/to_jpeg() is the ImageIO fallback.
+    """
+    if fmt == 'WebP' or (fmt == 'PNG' and png_level is not None):
+        w, h, buf, _ = ui_image_to_rgba(img)
+        if fmt == 'WebP':
+            from PIL import Image
+            pil = Image.frombuffer('RGBX', (w, h), buf, 'raw', 'RGBX', 0, 1)
+            with open(path, 'wb') as f:
+                pil.save(f, 'WEBP', quality=int(round(quality * 100)))
+        else:
+            import numpy as np
+            from recon_raster import StreamingPNGWriter
+            px = np.frombuffer(buf, dtype=np.uint8).reshape(h, w, 4)
+            with StreamingPNGWriter(path, w, h, channels=3, level=int(png_level)) as out:
+                for y in range(0, h, EXPORT_BAND_ROWS):
+                    out.write_rows(px[y:y + EXPORT_BAND_ROWS, :, :3])
+        return
+    try:
+        _imageio_write(img, path, _IMAGEIO_UTI[fmt], quality if fmt == 'JPEG' else None)
+    except Exception:
+        data = img.to_png() if fmt == 'PNG' else img.to_jpeg(quality)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+class BackgroundExporter(object):
+    """Encodes the latest image on one worker thread as soon as it lands.
+
+    The temp file is reused by Save and Share until the image or export settings change;
+    superseded files are deleted. A layer (image, rect), such as the address chip, is
+    flattened onto the image on the worker before encoding. stats holds the last encode
+    time and size per format.
+    """
+    def __init__(self):
+        self._pool = LazyThreadPool(1)
+        self._lock = threading.Lock()
+        self._img = self._layer = None
+        self._key = None
+        self._future = None
+        self.stats = {}   # fmt -> {'seconds', 'bytes', 'px'}
+
+    def prepare(self, img, fmt='PNG', quality=EXPORT_QUALITY, png_level=EXPORT_PNG_LEVEL, layer=None):
+        """Start (or reuse) the encode of img, with layer drawn over it; returns its future."""
+        key = (fmt, quality, png_level)
+        with self._lock:
+            if self._future is not None and self._img is img and self._layer is layer and self._key == key:
+                return self._future
+            self._discard(self._future)
+            self._img, self._layer, self._key = img, layer, key
+            self._future = self._pool.submit(self._encode, img, fmt, quality, png_level, layer)
+            return self._future
+
+    def path(self, img, fmt='PNG', quality=EXPORT_QUALITY, png_level=EXPORT_PNG_LEVEL, layer=None):
+        """Encoded file for img, waiting for the background encode if it is still running."""
+        return self.prepare(img, fmt, quality, png_level, layer).result()
+
+    def invalidate(self):
+        with self._lock:
+            self._discard(self._future)
+            self._img = self._layer = self._key = self._future = None
+
+    def _discard(self, fut):
+        if fut is not None and not fut.cancel():
+            fut.add_done_callback(_remove_export_file)
+
+    def _encode(self, img, fmt, quality, png_level, layer):
+        import tempfile
+        t0 = time.perf_counter()
+        fd, path = tempfile.mkstemp(suffix=dict(EXPORT_FORMATS)[fmt])
+        os.close(fd)
+        try:
+            if layer is not None:
+                img = flatten_layer(img, layer)
+            with span('export.encode', fmt):
+                encode_image_file(img, path, fmt, quality, png_level)
+        except Exception:
+            _remove_export_file(path)
+            raise
+        self.stats[fmt] = {'seconds': time.perf_counter() - t0, 'bytes': os.path.getsize(path),
+                           'px': int(img.size[0] * img.scale)}
+        return path
+
+def _remove_export_file(fut_or_path):
+    try:
+        path = fut_or_path if isinstance(fut_or_path, str) else fut_or_path.result()
+        os.remove(path)
+    except Exception:
+        pass
+
+# ---------- Rotation sweep export (one snapshot -> animated PNG) ----------
+SWEEP_STEP_DEG = 10.0
+SWEEP_FPS = 12.0
+SWEEP_WORKERS = min(2, os.cpu_count() or 1)   # frame threads; frames in flight (and in memory) are 2x this
+
+def _sweep_frame(snap, deg, side, meters, map_type, lat, lon, chip):
+    """One frame, drawn (snapshot rotated plus cached overlay layers, one context) and PNG-compressed.
+
+    -> (width, height, encoded frame data)
+    """
+    import numpy as np
+    from recon_raster import encode_png_frame
+    scale = rotation_fill_scale(deg)
+    caption = overlay_caption(map_type, meters, lat, lon, deg)
+    geo = _geo(lat, lon, meters, side, deg)
+    layers = overlay_layers(side, side, meters, deg, caption=caption, geo=geo)   # the grid layer hits the cache
+    if chip is not None:
+        layers.append(chip)
+    # at the snapshot's scale, so a frame has the pixels of the app's rotate + overlay render
+    with span('sweep.frame', px=side), ui.ImageContext(side, side, snap.scale) as ctx:
+        with ui.GState():
+            ui.concat_ctm(ui.Transform.translation(side/2.0, side/2.0))
+            ui.concat_ctm(ui.Transform.rotation(math.radians(deg)))
+            snap.draw(-side*scale/2.0, -side*scale/2.0, side*scale, side*scale)
+        for _, layer, (x, y, lw, lh) in layers:
+            layer.draw(x, y, lw, lh)
+        if GRID_LABELS:
+            _draw_grid_labels(side, side, geo.grid_labels(4))
+        w, h, buf, _ = ui_image_to_rgba(ctx.get_image())
+    with span('sweep.encode', px=side):
+        return w, h, encode_png_frame(np.frombuffer(buf, dtype=np.uint8).reshape(h, w, 4)[:, :, :3])
+
+def export_rotation_sweep(lat, lon, meters, map_type, img_w, path, addr_text=None, start_deg=0.0,
+                          step=SWEEP_STEP_DEG, fps=SWEEP_FPS, workers=SWEEP_WORKERS, progress=None):
+    """Write a rotating reveal (start_deg, + step, ... round to 360°) of one view as an APNG.
+
+    The snapshot is fetched once; frames are drawn from it and the overlay layer cache and
+    compressed on a thread pool, then appended to the file in order, so only a few frames
+    are alive at a time. That saves memory rather than time: on one core it is about as
+    slow as a render per angle. progress(done, total) is called after each frame.
+    -> {'frames', 'px', 'seconds', 'frames_per_s', 'bytes'}
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from recon_raster import StreamingAPNGWriter
+    t0 = time.perf_counter()
+    angles = sweep_angles(step, start_deg)
+    snap = get_snapshot(lat, lon, meters, map_type, img_w)
+    side = int(min(snap.size))
+    chip = None
+    if addr_text:
+        rect = pixel_rect(*_address_chip_layout(side, side, addr_text)[2])
+        key = ('chip', side, side, addr_text)
+        chip = (key, _cached_layer(key, rect, draw_address_top_left, side, side, addr_text), rect)
+    out = None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque(pool.submit(_sweep_frame, snap, deg, side, meters, map_type, lat, lon, chip)
+                        for deg in angles[:2 * workers])
+        try:
+            for i in range(len(angles)):
+                w, h, data = pending.popleft().result()
+                if i + len(pending) + 1 < len(angles):
+                    pending.append(pool.submit(_sweep_frame, snap, angles[i + len(pending) + 1], side, meters,
+                                               map_type, lat, lon, chip))
+                if out is None:
+                    out = StreamingAPNGWriter(path, w, h, len(angles), fps, 3)
+                out.add_encoded_frame(data)
+                if progress:
+                    progress(i + 1, len(angles))
+            out.close()
+        except Exception:
+            for fut in pending:
+                fut.cancel()
+            if out is not None:
+                out.__exit__(Exception, None, None)
+            raise
+    wall = time.perf_counter() - t0
+    return {'frames': len(angles), 'px': out.width, 'seconds': wall,
+            'frames_per_s': len(angles) / wall if wall else 0.0, 'bytes': os.path.getsize(path)}
+
+# ---------- Atlas export (site list -> paged PDF contact sheet) ----------
+ATLAS_WORKERS = 3            # sites rendered at once; at most 2x this many finished sites wait in memory
+ATLAS_GEOCODE_WORKERS = 2
+ATLAS_JPEG_QUALITY = 0.85
+ATLAS_PAGE = (612.0, 792.0)  # points (US Letter)
+ATLAS_GRID = (2, 3)          # columns, rows per page
+
+def _atlas_site(site, img_w, address, quality):
+    """Snapshot -> rotate -> overlays and address chip -> JPEG; -> (jpeg data, px, seconds)."""
+    t0 = time.perf_counter()
+    with span('atlas.site', px=int(img_w)):
+        key = snapshot_key(site.lat, site.lon, site.meters, site.map_type, img_w)
+        snap = get_snapshot(site.lat, site.lon, site.meters, site.map_type, img_w)
+        rotated = rotate_image_fill_square(snap, site.rotation, cache_key=key)
+        img = draw_overlays(rotated, site.meters, site.map_type, site.lat, site.lon, rotation_deg=site.rotation,
+                            full_addr=address.result() if address is not None else None)
+        data = img.to_jpeg(quality)
+    return data, int(img.size[0] * img.scale), time.perf_counter() - t0
+
+def export_atlas(sites, path, img_w=1024, title='Atlas', workers=ATLAS_WORKERS, geocode=True,
+                 quality=ATLAS_JPEG_QUALITY, progress=None):
+    """Render sites ([AtlasSite]) into a paged PDF contact sheet at path.
+
+    Addresses are looked up once per geocode_key on a small pool of their own while the
+    snapshots render. Sites render on `workers` threads through the shared snapshot, rotation
+    and overlay caches, at most 2x workers ahead of the page being written, and are placed
+    in list order, so the PDF streams out and memory stays bounded. A site that fails leaves
+    a grey cell and is listed in 'failed'. progress(done, total) is called after each site.
+    -> {'sites', 'rendered', 'failed', 'pages', 'seconds', 'sites_per_s', 'latency', 'geocode', 'bytes'}
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from recon_raster import StreamingPDFWriter
+    t0 = time.perf_counter()
+    sites = list(sites)
+    (page_w, page_h), (cols, rows) = ATLAS_PAGE, ATLAS_GRID
+    cells = contact_sheet_layout(len(sites), page_w, page_h, cols, rows)
+    pages = -(-len(sites) // (cols * rows))
+    latencies, failed = [], []
+    gpool = ThreadPoolExecutor(max_workers=ATLAS_GEOCODE_WORKERS)
+    addresses = {}
+    if geocode:
+        for site in sites:
+            key = geocode_key(site.lat, site.lon)
+            if key not in addresses:
+                addresses[key] = gpool.submit(reverse_geocode_compact, site.lat, site.lon)
+
+    def _submit(pool, i):
+        site = sites[i]
+        return pool.submit(_atlas_site, site, img_w, addresses.get(geocode_key(site.lat, site.lon)), quality)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, StreamingPDFWriter(path, page_w, page_h) as pdf:
+        pending = deque(_submit(pool, i) for i in range(min(len(sites), 2 * workers)))
+        try:
+            for i, site in enumerate(sites):
+                fut = pending.popleft()
+                if i + len(pending) + 1 < len(sites):
+                    pending.append(_submit(pool, i + len(pending) + 1))
+                page, x, y, size = cells[i]
+                if page == pdf.pages:
+                    pdf.begin_page()
+                    pdf.add_text(f'{title}  •  {len(sites)} sites  •  page {page + 1}/{pages}', 36, 48, 11)
+                name = site.name or f'{site.lat:.5f}, {site.lon:.5f}'
+                try:
+                    data, px, seconds = fut.result()
+                except Exception as e:
+                    failed.append((i, name, str(e)))
+                    pdf.add_rect(x, y, size, size)
+                    pdf.add_text(f'failed: {e}'[:60], x + 6, y + 14, 7, 0.3)
+                else:
+                    latencies.append(seconds)
+                    pdf.add_jpeg(data, px, px, x, y, size, size)
+                pdf.add_text(f'{i + 1}. {name}', x, y + size + 10, 9)
+                pdf.add_text(overlay_caption(site.map_type, site.meters, site.lat, site.lon, site.rotation),
+                             x, y + size + 19, 6.5, 0.35)
+                if progress:
+                    progress(i + 1, len(sites))
+        except Exception:
+            for f in pending:
+                f.cancel()
+            raise
+        finally:
+            gpool.shutdown(wait=False, cancel_futures=True)
+    wall = time.perf_counter() - t0
+    return {'sites': len(sites), 'rendered': len(latencies), 'failed': failed, 'pages': pages, 'seconds': wall,
+            'sites_per_s': len(latencies) / wall if wall else 0.0, 'latency': percentiles(latencies),
+            'geocode': {'lookups': len(addresses), 'deduplicated': len(sites) - len(addresses) if geocode else 0},
+            'bytes': os.path.getsize(path)}
+
+# ---------- Instrumentation ----------
+TRACE_PATH = os.path.join(CACHE_DIR, 'trace.jsonl')
+
+metrics.add_source('caches', cache_stats)
+
+def export_trace(path=TRACE_PATH):
+    """Append buffered stage spans and a summary (histograms, cache counters) as JSON lines."""
+    d = os.path.dirname(path)
+    if d and not os.path.isdir(d):
+        os.makedirs(d)
+    return metrics.export_jsonl(path)
@@ -0,0 +1,428 @@
+# coding: utf-8
+# Satellite Recon — NumPy raster kernels (work on plain H x W x C uint8 pixel buffers)
+# rotate_fill_square: inverse-mapped affine resampler with cached coordinate maps, so
+# rotating many images by the same angle is a single gather per image.
+# sample_tiles / StreamingPNGWriter: the same resampling strip by strip over a grid of
+# source tiles, streamed into a PNG, for exports too large to hold in memory.
+# StreamingAPNGWriter: the same encoder, one whole frame at a time, for rotation sweeps.
+# StreamingPDFWriter: paged JPEG contact sheets (atlas export), a page at a time.
+
+import math
+import struct
+import threading
+import zlib
+from fractions import Fraction
+
+import numpy as np
+
+from recon_core import LRUCache, rotation_fill_scale
+
+COORD_MAP_CACHE_BYTES = 256 * 1024 * 1024
+RESAMPLE_MODES = ('nearest', 'bilinear')
+
+_coord_maps = LRUCache(max_bytes=COORD_MAP_CACHE_BYTES)   # {(src_h, src_w, side, deg, mode): CoordMap}
+_scratch = threading.local()
+
+class CoordMap(object):
+    """Precomputed source sampling positions for every output pixel of one rotation.
+
+    nearest:  idx = flat source index per output pixel.
+    bilinear: idx = flat index of the top-left neighbour; weights = (4, n, 1) uint16
+              fixed-point weights (sum 256) for the 2x2 neighbourhood.
+    """
+    __slots__ = ('side', 'src_w', 'mode', 'idx', 'weights', 'nbytes')
+
+    def __init__(self, side, src_w, mode, idx, weights=None):
+        self.side, self.src_w, self.mode = side, src_w, mode
+        self.idx, self.weights = idx, weights
+        self.nbytes = idx.nbytes + (weights.nbytes if weights is not None else 0)
+
+def _source_coords(src_h, src_w, side, degrees, y0=0, y1=None):
+    """Continuous source pixel coordinates (x, y) for each output pixel centre in rows [y0, y1), float32."""
+    th = math.radians(degrees)
+    k = 1.0 / rotation_fill_scale(degrees)
+    kx, ky = k * src_w / float(side), k * src_h / float(side)
+    ct, st = math.cos(th), math.sin(th)
+    c = np.arange(side, dtype=np.float32) + np.float32(0.5 - side / 2.0)   # output centres, origin at middle
+    r = c[y0:y1]
+    # Inverse of a clockwise rotation (y down): in = R(-theta) * out / scale
+    xs = (kx * ct) * c[None, :] + (kx * st) * r[:, None]
+    ys = (-ky * st) * c[None, :] + (ky * ct) * r[:, None]
+    xs += np.float32(src_w / 2.0 - 0.5)
+    ys += np.float32(src_h / 2.0 - 0.5)
+    return xs.ravel(), ys.ravel()
+
+def coordinate_map(src_h, src_w, side, degrees, mode='bilinear', cache=True):
+    """Cached CoordMap for rotating a src_h x src_w buffer onto a side x side square.
+
+    cache=False still reuses a cached map but does not store a new one (one-off angles).
+    """
+    if mode not in RESAMPLE_MODES:
+        raise ValueError(f'unknown resample mode {mode!r}; expected one of {RESAMPLE_MODES}')
+    key = (int(src_h), int(src_w), int(side), round(float(degrees) % 360.0, 3), mode)
+    cmap = _coord_maps.get(key)
+    if cmap is not None:
+        return cmap
+    xs, ys = _source_coords(src_h, src_w, side, degrees)
+    if mode == 'nearest':
+        xi = np.clip(np.rint(xs), 0, src_w - 1).astype(np.int32)
+        yi = np.clip(np.rint(ys), 0, src_h - 1).astype(np.int32)
+        yi *= src_w; yi += xi
+        cmap = CoordMap(side, src_w, mode, yi)
+    else:
+        idx, yi, weights = _bilinear_setup(xs, ys, src_w, src_h)
+        yi *= src_w; idx += yi
+        cmap = CoordMap(side, src_w, mode, idx, weights)
+    if cache:
+        _coord_maps.put(key, cmap, cmap.nbytes)
+    return cmap
+
+def _bilinear_setup(xs, ys, src_w, src_h):
+    """-> (x0, y0) int32 top-left neighbours and (4, n, 1) uint16 weights; xs / ys are consumed."""
+    # Clamp so the 2x2 neighbourhood always lies inside the source.
+    np.clip(xs, 0, src_w - 1.001, out=xs)
+    np.clip(ys, 0, src_h - 1.001, out=ys)
+    x0 = np.floor(xs); y0 = np.floor(ys)
+    xs -= x0; ys -= y0
+    fx = np.rint(xs * 256).astype(np.uint32); fy = np.rint(ys * 256).astype(np.uint32)
+    w11 = (fx * fy + 128) >> 8
+    weights = np.empty((4, fx.shape[0], 1), dtype=np.uint16)
+    weights[0, :, 0] = 256 - fx - fy + w11
+    weights[1, :, 0] = fx - w11
+    weights[2, :, 0] = fy - w11
+    weights[3, :, 0] = w11
+    return x0.astype(np.int32), y0.astype(np.int32), weights
+
+def _scratch_index(n):
+    buf = getattr(_scratch, 'idx', None)
+    if buf is None or buf.shape[0] != n:
+        buf = _scratch.idx = np.empty(n, dtype=np.int32)
+    return buf
+
+def _take(flat, packed, idx):
+    # RGBA uint8 is gathered as one uint32 per pixel: a quarter of the index work.
+    if packed is not None:
+        return np.take(packed, idx).view(flat.dtype).reshape(-1, flat.shape[1])
+    return np.take(flat, idx, axis=0)
+
+def _gather_bilinear(flat, idx, wts, w, out):
+    """Fixed-point bilinear: uint16 accumulators, weights sum to 256, so nothing overflows."""
+    packed = flat.view(np.uint32).ravel() if flat.shape[1] == 4 and flat.dtype == np.uint8 else None
+    s = _scratch_index(idx.shape[0])
+    acc = _take(flat, packed, idx) * wts[0]
+    for k, off in ((1, 1), (2, w), (3, w + 1)):
+        np.add(idx, off, out=s)
+        acc += _take(flat, packed, s) * wts[k]
+    acc += 128
+    acc >>= 8
+    np.copyto(out, acc, casting='unsafe')
+    return out
+
+def rotate_fill_square(src, degrees, mode='bilinear', out=None, cache=True):
+    """Rotate an H x W (x C) uint8 buffer clockwise onto a min(H, W) square with no empty corners.
+
+    Same geometry as recon_pipeline.rotate_image_fill_square: the source is scaled by
+    |cos| + |sin| about its centre. Pass out (side x side x C) to reuse a buffer, and
+    cache=False for angles that will not come back (see coordinate_map).
+    """
+    src = np.ascontiguousarray(src)
+    if src.dtype != np.uint8:
+        raise TypeError('rotate_fill_square expects uint8 pixels')
+    squeeze = src.ndim == 2
+    if squeeze:
+        src = src[:, :, None]
+    h, w, c = src.shape
+    side = min(h, w)
+    if abs(degrees) < 0.01 and h == w:
+        return src[:, :, 0] if squeeze else src
+    cmap = coordinate_map(h, w, side, degrees, mode, cache)
+    if out is None:
+        out = np.empty((side, side, c), dtype=src.dtype)
+    flat = src.reshape(-1, c)
+    dst = out.reshape(-1, c)
+    if mode == 'nearest':
+        np.take(flat, cmap.idx, axis=0, out=dst)
+    else:
+        _gather_bilinear(flat, cmap.idx, cmap.weights, cmap.src_w, dst)
+    return out[:, :, 0] if squeeze else out
+
+def coord_map_stats():
+    return _coord_maps.stats()
+
+# ---------- Tiled sampling and streaming PNG (bounded-memory exports) ----------
+PNG_CHUNK_BYTES = 1 << 20   # compressed bytes buffered per IDAT chunk
+
+def strip_coords(size, degrees, y0, y1):
+    """Source coordinates for output rows [y0, y1) of rotate_fill_square on a size x size source."""
+    return _source_coords(size, size, size, degrees, y0, y1)
+
+def sample_tiles(xs, ys, size, step, cols, tile, out):
+    """Bilinear-sample a tiled size x size source at (xs, ys) into out (n x C uint8).
+
+    The source is a cols x cols grid; tile(c, r) returns the buffer covering source
+    pixels [c*step, c*step + step] on each axis, i.e. one column / row shared with the
+    next tile, so every 2x2 neighbourhood lies inside a single tile. xs / ys are
+    consumed. Returns the number of tiles touched.
+    """
+    xi, yi, wts = _bilinear_setup(xs, ys, size, size)
+    ti = xi // step; tj = yi // step
+    xi -= ti * step; yi -= tj * step
+    key = tj; key *= cols; key += ti
+    counts = np.bincount(key, minlength=cols * cols)
+    used = np.flatnonzero(counts)
+    if len(used) == 1:
+        t = tile(used[0] % cols, used[0] // cols)
+        yi *= t.shape[1]; yi += xi
+        _gather_bilinear(t.reshape(-1, t.shape[2]), yi, wts, t.shape[1], out)
+        return 1
+    order = np.argsort(key.astype(np.int16 if cols * cols < 1 << 15 else np.int32), kind='stable')
+    ends = np.cumsum(counts)
+    for k in used:
+        sel = order[ends[k] - counts[k]:ends[k]]
+        t = tile(k % cols, k // cols)
+        tw = t.shape[1]
+        idx = yi[sel]; idx *= tw; idx += xi[sel]
+        out[sel] = _gather_bilinear(t.reshape(-1, t.shape[2]), idx, wts[:, sel], tw,
+                                    np.empty((len(sel), out.shape[1]), dtype=out.dtype))
+    return len(used)
+
+def _up_filter(flat, prev=None):
+    """(h, row bytes) -> (h, 1 + row bytes) scanlines with filter byte 2 (Up); prev is the row above."""
+    buf = np.empty((flat.shape[0], flat.shape[1] + 1), dtype=np.uint8)
+    buf[:, 0] = 2
+    np.subtract(flat[1:], flat[:-1], out=buf[1:, 1:])
+    if prev is None:
+        buf[0, 1:] = flat[0]
+    else:
+        np.subtract(flat[0], prev, out=buf[0, 1:])
+    return buf
+
+def encode_png_frame(pixels, level=1):
+    """Filtered, zlib-compressed image data for a whole (h, w, c) uint8 frame.
+
+    Frames are independent streams, so this can run on worker threads (zlib releases the
+    GIL) while one writer appends the results in order with add_encoded_frame().
+    """
+    h = pixels.shape[0]
+    return zlib.compress(_up_filter(np.ascontiguousarray(pixels).reshape(h, -1)).data, level)
+
+class StreamingPNGWriter(object):
+    """Write a PNG a band of rows at a time; memory is one band plus the zlib state.
+
+    Rows use the PNG 'Up' filter (difference to the row above), computed per band with
+    the previous band's last row carried over.
+    """
+    _COLOR_TYPES = {1: 0, 2: 4, 3: 2, 4: 6}   # grey, grey+alpha, RGB, RGBA
+
+    def __init__(self, path, width, height, channels=3, level=1):
+        self.width, self.height, self.channels = int(width), int(height), int(channels)
+        self.level = level
+        self.rows = 0
+        self._z = zlib.compressobj(level)
+        self._pending, self._pending_bytes = [], 0
+        self._prev = None
+        self._f = open(path, 'wb')
+        self._f.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 8,
+                                         self._COLOR_TYPES[self.channels], 0, 0, 0))
+
+    def _chunk(self, tag, data):
+        self._f.write(struct.pack('>I', len(data)) + tag + data)
+        self._f.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(tag)) & 0xffffffff))
+
+    def _emit(self, data, force=False):
+        if data:
+            self._pending.append(data); self._pending_bytes += len(data)
+        if self._pending_bytes >= PNG_CHUNK_BYTES or (force and self._pending):
+            self._data_chunk(b''.join(self._pending))
+            self._pending, self._pending_bytes = [], 0
+
+    def _data_chunk(self, data):
+        self._chunk(b'IDAT', data)
+
+    def write_rows(self, rows):
+        """Append rows, an (h, width, channels) uint8 array."""
+        h = rows.shape[0]
+        if rows.shape[1:] != (self.width, self.channels) or rows.dtype != np.uint8:
+            raise ValueError(f'expected (h, {self.width}, {self.channels}) uint8 rows, got {rows.shape} {rows.dtype}')
+        if self.rows + h > self.height:
+            raise ValueError(f'{self.rows + h} rows written to a {self.height}-row PNG')
+        flat = rows.reshape(h, -1)
+        buf = _up_filter(flat, self._prev)
+        self._prev = flat[-1].copy()
+        self._emit(self._z.compress(buf.data))
+        self.rows += h
+
+    def close(self):
+        if self._f is None:
+            return
+        try:
+            if self.rows != self.height:
+                raise ValueError(f'PNG closed after {self.rows} of {self.height} rows')
+            self._emit(self._z.flush(), force=True)
+            self._chunk(b'IEND', b'')
+        finally:
+            self._f.close()
+            self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._f is not None:
+            self._f.close()
+            self._f = None
+        return False
+
+class StreamingAPNGWriter(StreamingPNGWriter):
+    """Animated PNG written a frame at a time; memory is one frame plus the zlib state.
+
+    The first frame goes out as IDAT, so viewers without APNG support show it as a still;
+    later frames are fdAT chunks. frames must be known up front (the acTL chunk comes first).
+    """
+    def __init__(self, path, width, height, frames, fps=12.0, channels=3, level=1, loops=0):
+        super(StreamingAPNGWriter, self).__init__(path, width, height, channels, level)
+        self.frames, self.frame = int(frames), 0
+        delay = Fraction(1.0 / fps).limit_denominator(1000)
+        self._delay = (delay.numerator, delay.denominator)
+        self._seq = 0
+        self._chunk(b'acTL', struct.pack('>II', self.frames, int(loops)))
+
+    def _next_seq(self):
+        self._seq += 1
+        return self._seq - 1
+
+    def _data_chunk(self, data):
+        if self.frame == 0:
+            self._chunk(b'IDAT', data)
+        else:
+            self._chunk(b'fdAT', struct.pack('>I', self._next_seq()) + data)
+
+    def add_frame(self, pixels):
+        """Append one full frame, a (height, width, channels) uint8 array."""
+        if pixels.shape != (self.height, self.width, self.channels) or pixels.dtype != np.uint8:
+            raise ValueError(f'expected ({self.height}, {self.width}, {self.channels}) uint8 frame, '
+                             f'got {pixels.shape} {pixels.dtype}')
+        self.add_encoded_frame(encode_png_frame(pixels, self.level))
+
+    def add_encoded_frame(self, data):
+        """Append one frame already encoded by encode_png_frame() at this writer's size."""
+        if self.frame >= self.frames:
+            raise ValueError(f'APNG declared {self.frames} frames')
+        self._chunk(b'fcTL', struct.pack('>IIIIIHHBB', self._next_seq(), self.width, self.height, 0, 0,
+                                         self._delay[0], self._delay[1], 0, 0))
+        for i in range(0, len(data), PNG_CHUNK_BYTES):
+            self._data_chunk(data[i:i + PNG_CHUNK_BYTES])
+        self.frame += 1
+
+    def close(self):
+        if self._f is None:
+            return
+        try:
+            if self.frame != self.frames:
+                raise ValueError(f'APNG closed after {self.frame} of {self.frames} frames')
+            self._chunk(b'IEND', b'')
+        finally:
+            self._f.close()
+            self._f = None
+
+# ---------- Streaming PDF (paged contact sheets) ----------
+class StreamingPDFWriter(object):
+    """Multi-page PDF of JPEG images and Helvetica labels, written a page at a time.
+
+    JPEG data is embedded as-is (DCTDecode, RGB), so nothing is decoded, and each image is
+    written as soon as it is placed; memory is the open page's drawing operators plus one
+    offset per object. Coordinates are points from the page's top-left corner.
+    """
+    _PAGES, _FONT = 1, 2   # reserved object numbers; the page tree is written by close()
+
+    def __init__(self, path, page_w=612.0, page_h=792.0):
+        self.page_w, self.page_h = float(page_w), float(page_h)
+        self.pages = 0
+        self._offsets = {}
+        self._next = 3
+        self._kids = []
+        self._ops = self._images = None
+        self._f = open(path, 'wb')
+        self._f.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+        self._object(self._FONT, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                                 b'/Encoding /WinAnsiEncoding >>')
+
+    def _alloc(self):
+        self._next += 1
+        return self._next - 1
+
+    def _object(self, num, body, stream=None):
+        self._offsets[num] = self._f.tell()
+        self._f.write(b'%d 0 obj\n' % num + body)
+        if stream is not None:
+            self._f.write(b'\nstream\n')
+            self._f.write(stream)
+            self._f.write(b'\nendstream')
+        self._f.write(b'\nendobj\n')
+
+    def begin_page(self):
+        if self._ops is not None:
+            self.end_page()
+        self._ops, self._images = [], []
+
+    def add_jpeg(self, data, px_w, px_h, x, y, w, h):
+        """Place a px_w x px_h JPEG in the w x h point box whose top-left is (x, y)."""
+        num = self._alloc()
+        self._object(num, b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB '
+                          b'/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>' % (px_w, px_h, len(data)), data)
+        self._images.append(num)
+        self._ops.append(b'q %.2f 0 0 %.2f %.2f %.2f cm /Im%d Do Q' % (w, h, x, self.page_h - y - h, num))
+
+    def add_rect(self, x, y, w, h, gray=0.9):
+        self._ops.append(b'%.2f g %.2f %.2f %.2f %.2f re f' % (gray, x, self.page_h - y - h, w, h))
+
+    def add_text(self, text, x, y, size=9.0, gray=0.0):
+        """One line of text with its baseline at (x, y); characters outside cp1252 become '?'."""
+        s = text.encode('cp1252', 'replace').replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+        self._ops.append(b'BT %.2f g /F1 %.1f Tf %.2f %.2f Td (%s) Tj ET' % (gray, size, x, self.page_h - y, s))
+
+    def end_page(self):
+        content = b'\n'.join(self._ops)
+        cnum = self._alloc()
+        self._object(cnum, b'<< /Length %d >>' % len(content), content)
+        images = b' '.join(b'/Im%d %d 0 R' % (n, n) for n in self._images)
+        pnum = self._alloc()
+        self._object(pnum, b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] /Contents %d 0 R '
+                           b'/Resources << /Font << /F1 %d 0 R >> /XObject << %s >> >> >>'
+                     % (self._PAGES, self.page_w, self.page_h, cnum, self._FONT, images))
+        self._kids.append(pnum)
+        self.pages += 1
+        self._ops = self._images = None
+
+    def close(self):
+        if self._f is None:
+            return
+        try:
+            if self._ops is not None:
+                self.end_page()
+            self._object(self._PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>'
+                         % (b' '.join(b'%d 0 R' % k for k in self._kids), len(self._kids)))
+            root = self._alloc()
+            self._object(root, b'<< /Type /Catalog /Pages %d 0 R >>' % self._PAGES)
+            xref = self._f.tell()
+            self._f.write(b'xref\n0 %d\n0000000000 65535 f \n' % self._next)
+            self._f.write(b''.join(b'%010d 00000 n \n' % self._offsets[i] for i in range(1, self._next)))
+            self._f.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                          % (self._next, root, xref))
+        finally:
+            self._f.close()
+            self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._f is not None:
+            self._f.close()
+            self._f = None
+        return False
@@ -2,365 +2,40 @@
 # Map Snapshot Studio — Compact Address (Address, City, ZIP, Country) — ZIP fix, no county leakage
 # Optimized: snapshot/rotation/text caches + async geocoding
 # Pythonista 3 (iPhone 14 Pro Max, portrait)
-
-import ui, location, photos, dialogs, tempfile, os, time, math, console, requests, threading
-
-# ===== Appearance =====
-GRID_ALPHA       = 0.10
-CHIP_ALPHA       = 0.06
-CROSSHAIR_ALPHA  = 0.85
-WHITE            = (1, 1, 1, 1)
-RED              = (1, 0.2, 0.2, 1)
-CAPTION_OFFSET_Y = 26
-
-MAP_TYPES = ['standard', 'satellite', 'hybrid']
-QUALITY_PRESETS = [
-    ('Standard', 1024),
-    ('High', 1536),
-    ('Ultra', 2048),
-]
+#
+# The view shell. Pythonista compiles the script it runs on every launch, so the pipeline
+# (caches, stores, geocoding, compositing, export) lives in recon_pipeline.py, which loads
+# from cached bytecode; photos, dialogs and console are imported by the actions that use them.
+
+import ui, os, time, threading
+
+from recon_core import (
+    MAP_TYPES, QUALITY_PRESETS, meters_label, cov_slider_to_meters, meters_to_cov_slider,
+    rot_slider_to_degrees, degrees_to_rot_slider, neighbor_views, load_sites,
+)
+from recon_metrics import metrics, span
+from recon_pipeline import (
+    EXPORT_FORMATS, LOCATION_KEEP_WARM, PREFETCH_ENABLED, SLIDER_DEBOUNCE,
+    BackgroundExporter, RenderScheduler, RenderCancelled,
+    request_location, snapshot_key, get_snapshot, rotate_image_fill_square, compose_overlays,
+    address_chip_layer, reverse_geocode_compact, export_rotation_sweep, export_atlas, export_trace, preload,
+    _location, _prefetcher, _remove_export_file,
+)
+
+PROXY_SIZE = 384             # px; progressive preview and live slider previews
+PROGRESSIVE_RENDER = True
+DEBUG_OVERLAY = False        # on-screen stage timings over the preview (turns instrumentation on)
+TRACE_ON_CLOSE = True        # with instrumentation on, append the session's spans to TRACE_PATH on close
+DEBUG_STAGES = ('render.proxy', 'render.full', 'snapshot', 'snapshot.disk', 'rotate', 'overlays',
+                'address_chip', 'geocode', 'flatten', 'export.encode')
 
 SCREEN_W, SCREEN_H = 430, 932
-MIN_METERS, MAX_METERS = 150.0, 6000.0
 DEFAULT_METERS = 800.0
-COVERAGE_STEP = 50.0
-ROT_STEP = 1.0
-
-# ===== Fonts & text metrics =====
-FONT_CHIP = ('<System>', 12)
-FONT_CAPTION = ('<System>', 12)
-FONT_SCALE = ('<System>', 13)
-_, _chip_lh = ui.measure_string('Ag', font=FONT_CHIP)
-CHIP_LINE_H = max(18, _chip_lh)
-
-# ===== Caches =====
-_last_snap_key = None
-_last_snap_img = None
-_last_rot_src = None
-_last_rot_deg = None
-_last_rot_img = None
-_geocode_cache = {}       # {(lat5,lon5): "compact two-line address"}
-_measure_cache = {}       # {(font_name, size, text): (w,h)}
-
-# ---------- Utilities ----------
-def request_location(timeout=6.0, poll=0.5):
-    location.start_updates()
-    t0 = time.time()
-    try:
-        while time.time() - t0 < timeout:
-            loc = location.get_location()
-            if loc and 'latitude' in loc and 'longitude' in loc:
-                return (float(loc['latitude']), float(loc['longitude']))
-            time.sleep(poll)
-        return None
-    finally:
-        location.stop_updates()
-
-def meters_label(m):
-    return f'{int(m)} m' if m < 1000 else f'{m/1000.0:.1f} km'
-
-def nice_scale_length(mpp, max_px=140):
-    for L in [25,50,100,200,250,500,1000,2000,2500,5000,10000,20000][::-1]:
-        if L / mpp <= max_px:
-            return L
-    return 25
-
-def cov_slider_to_meters(v):
-    m = MIN_METERS + v * (MAX_METERS - MIN_METERS)
-    return max(MIN_METERS, min(MAX_METERS, round(m / COVERAGE_STEP) * COVERAGE_STEP))
-
-def meters_to_cov_slider(m):
-    m = max(MIN_METERS, min(MAX_METERS, m))
-    return (m - MIN_METERS) / (MAX_METERS - MIN_METERS)
-
-def rot_slider_to_degrees(v):
-    d = round((v * 360.0) / ROT_STEP) * ROT_STEP
-    return max(0.0, min(360.0, d))
-
-def degrees_to_rot_slider(d):
-    return max(0.0, min(360.0, d)) / 360.0
-
-# ---------- Fast measurement with cache ----------
-def _measure(text, font):
-    key = (font[0], font[1], text)
-    m = _measure_cache.get(key)
-    if m:
-        return m
-    w, h = ui.measure_string(text, font=font)
-    _measure_cache[key] = (w, h)
-    return w, h
-
-# ---------- Imaging ----------
-def rotate_image_fill_square(img, degrees):
-    """Rotate around center on a square canvas; skip or reuse when possible."""
-    global _last_rot_src, _last_rot_deg, _last_rot_img
-    if abs(degrees) < 0.01:
-        return img
-    if _last_rot_src is img and _last_rot_deg == degrees and _last_rot_img is not None:
-        return _last_rot_img
-    w, h = img.size
-    side = int(min(w, h))
-    theta = math.radians(degrees)
-    scale = abs(math.cos(theta)) + abs(math.sin(theta))
-    with ui.ImageContext(side, side) as ctx:
-        ui.concat_ctm(ui.Transform.translation(side/2.0, side/2.0))
-        ui.concat_ctm(ui.Transform.rotation(theta))
-        img.draw(-side*scale/2.0, -side*scale/2.0, side*scale, side*scale)
-        out = ctx.get_image()
-    _last_rot_src, _last_rot_deg, _last_rot_img = img, degrees, out
-    return out
-
-# ---------- Caption ----------
-def draw_caption_bottom_right(w, h, caption_text):
-    pad = 14
-    cap_pad = 8
-    text_w, text_h = _measure(caption_text, FONT_CAPTION)
-    text_h = max(18, text_h)
-    box_w, box_h = text_w + 2*cap_pad, text_h + 2*cap_pad
-    bx, by = w - box_w - pad, h - box_h - pad - CAPTION_OFFSET_Y
-    ui.set_color((0, 0, 0, CHIP_ALPHA))
-    ui.Path.rounded_rect(bx, by, box_w, box_h, 8).fill()
-    ui.draw_string(caption_text,
-                   rect=(bx + cap_pad, by + cap_pad, text_w, text_h),
-                   font=FONT_CAPTION, color=WHITE, alignment=ui.ALIGN_LEFT,
-                   line_break_mode=ui.LB_TRUNCATE_TAIL)
-    return (bx, by, box_w, box_h)
-
-# ---------- Multiline address chip (wrapping) ----------
-def _wrap_text_to_width(text, font, max_text_w):
-    words = text.split()
-    lines, cur = [], ''
-    for w in words:
-        trial = (cur + ' ' + w).strip()
-        tw, _ = _measure(trial, font)
-        if tw <= max_text_w or not cur:
-            cur = trial
-        else:
-            lines.append(cur)
-            # Hard-break long words by binary search
-            while True:
-                tw, _ = _measure(w, font)
-                if tw <= max_text_w:
-                    break
-                lo, hi = 1, len(w); fit = 1
-                while lo <= hi:
-                    mid = (lo + hi) // 2
-                    ttw, _ = _measure(w[:mid], font)
-                    if ttw <= max_text_w:
-                        fit = mid; lo = mid + 1
-                    else:
-                        hi = mid - 1
-                lines.append(w[:fit]); w = w[fit:]
-                if not w: break
-            cur = w if w else ''
-    if cur:
-        lines.append(cur)
-    return lines
-
-def draw_address_top_left(w, h, addr_text):
-    """Draw compact two-line address chip at top-left with wrapping."""
-    pad = 14
-    cap_pad = 8
-    max_chip_w = min(int(w * 0.80), 320)
-    max_text_w = max_chip_w - 2 * cap_pad
-
-    paragraphs = [p.strip() for p in addr_text.split('\n') if p.strip()]
-    lines = []
-    for para in paragraphs:
-        lines.extend(_wrap_text_to_width(para, FONT_CHIP, max_text_w))
-
-    text_w = 0
-    for line in lines:
-        lw, _ = _measure(line, FONT_CHIP)
-        text_w = max(text_w, min(lw, max_text_w))
-    text_h = CHIP_LINE_H * max(1, len(lines))
-
-    box_w, box_h = min(max_chip_w, text_w + 2*cap_pad), text_h + 2*cap_pad
-    bx, by = pad, pad
-
-    ui.set_color((0, 0, 0, CHIP_ALPHA))
-    ui.Path.rounded_rect(bx, by, box_w, box_h, 8).fill()
-
-    ui.set_color(WHITE)
-    tx, ty = bx + cap_pad, by + cap_pad
-    for line in lines:
-        ui.draw_string(line, rect=(tx, ty, max_text_w, CHIP_LINE_H),
-                       font=FONT_CHIP, color=WHITE, alignment=ui.ALIGN_LEFT,
-                       line_break_mode=ui.LB_TRUNCATE_TAIL)
-        ty += CHIP_LINE_H
-
-    return (bx, by, box_w, box_h)
-
-# ---------- Overlays ----------
-def draw_overlays(base_img, meters, map_type, lat, lon,
-                  rotation_deg=0.0, show_grid=True,
-                  show_crosshair=True, grid_divisions=4, show_caption=True, full_addr=None):
-    w, h = base_img.size
-    mpp = meters / float(w)
-    pad = 14
-    with ui.ImageContext(w, h) as ctx:
-        base_img.draw(0, 0, w, h)
-
-        if full_addr:
-            draw_address_top_left(w, h, full_addr)
-
-        if show_grid and grid_divisions > 0:
-            ui.set_color((1, 1, 1, GRID_ALPHA))
-            for i in range(1, grid_divisions):
-                x = i * (w / grid_divisions)
-                p = ui.Path(); p.move_to(x, 0); p.line_to(x, h)
-                p.line_width = 0.8; p.stroke()
-            for i in range(1, grid_divisions):
-                y = i * (h / grid_divisions)
-                p = ui.Path(); p.move_to(0, y); p.line_to(w, y)
-                p.line_width = 0.8; p.stroke()
-
-        # Scale bar
-        bar_len_m = nice_scale_length(mpp, max_px=min(180, int(w*0.4)))
-        bar_len_px = bar_len_m / mpp
-        y_bar = h - 20 - pad
-        ui.set_color(WHITE)
-        ui.Path.rect(pad*1.5, y_bar, bar_len_px, 6).fill()
-        title = f'{int(bar_len_m)} m' if bar_len_m < 1000 else f'{bar_len_m/1000:.1f} km'
-        ui.draw_string(title, rect=(pad*1.5, y_bar - 18, bar_len_px, 18),
-                       font=FONT_SCALE, color=WHITE, alignment=ui.ALIGN_CENTER)
-
-        # North arrow
-        na_size = 44; na_x = w - na_size - pad; na_y = pad
-        ui.set_color(WHITE)
-        cx0, cy0, r = na_x + na_size/2.0, na_y + na_size/2.0, na_size*0.36
-        tri = [(0, -r), (-r*0.72, r*0.72), (r*0.72, r*0.72)]
-        th = math.radians(rotation_deg); ct, st = math.cos(th), math.sin(th)
-        def rot(pt): return (pt[0]*ct - pt[1]*st + cx0, pt[0]*st + pt[1]*ct + cy0)
-        p1, p2, p3 = map(rot, tri)
-        p = ui.Path(); p.move_to(*p1); p.line_to(*p2); p.line_to(*p3); p.close(); p.fill()
-        ui.draw_string('N', rect=(na_x, na_y + na_size - 18, na_size, 18),
-                       font=('<System-Bold>', 14), color=RED, alignment=ui.ALIGN_CENTER)
-
-        if show_caption:
-            rot_txt = f' • Rot {rotation_deg:.0f}°' if abs(rotation_deg) >= 1.0 else ''
-            caption = f'{map_type.capitalize()} • {meters_label(meters)} • Lat {lat:.5f}, Lon {lon:.5f}{rot_txt}'
-            draw_caption_bottom_right(w, h, caption)
-
-        if show_crosshair:
-            cx, cy = w/2.0, h/2.0
-            ui.set_color((1, 1, 1, CROSSHAIR_ALPHA))
-            for (x1, y1, x2, y2) in [(cx-18, cy, cx+18, cy), (cx, cy-18, cx, cy+18)]:
-                p = ui.Path(); p.move_to(x1, y1); p.line_to(x2, y2)
-                p.line_width = 1.2; p.stroke()
-            ui.Path.oval(cx-2, cy-2, 4, 4).fill()
-
-        return ctx.get_image()
-
-# ---------- Address formatting (Address, City, ZIP, Country ONLY) ----------
-def _fmt_nonempty(parts, sep=' '):
-    return sep.join([p for p in parts if p])
-
-def _first_nonempty(*vals):
-    for v in vals:
-        if v:
-            return v
-    return None
-
-def _format_compact_apple(d):
-    """Apple placemark -> 'house+street' on first line, 'City ZIP, Country' on second."""
-    # Street/house
-    house = _first_nonempty(d.get('SubThoroughfare'), d.get('HouseNumber'))
-    street = _first_nonempty(d.get('Thoroughfare'), d.get('Street'))
-    addr_line = _fmt_nonempty([house, street])
-
-    # City: prefer Locality/City; avoid county (SubAdministrativeArea) unless nothing else exists.
-    city = _first_nonempty(
-        d.get('Locality'),
-        d.get('City'),
-        d.get('SubLocality'),            # neighborhoods like Mitte (only if no City)
-        None                             # explicit stop: don't auto-pick county/state below
-    )
-    if not city:
-        # Last-resort fallback — if there's absolutely no city; still avoid showing county if possible
-        city = _first_nonempty(d.get('AdministrativeArea')) or _first_nonempty(d.get('SubAdministrativeArea'))
-
-    # ZIP: Apple may use PostalCode or legacy ZIP
-    zipc = _first_nonempty(d.get('PostalCode'), d.get('ZIP'))
-
-    country = d.get('Country')
-
-    top = addr_line or ''
-    city_zip = _fmt_nonempty([city, zipc]) if (city or zipc) else ''
-    bottom = _fmt_nonempty([city_zip, country], sep=', ')
-    text = (top + '\n' + bottom).strip()
-    return text if text else None
-
-def _format_compact_osm(data):
-    """OSM -> same two-line format."""
-    a = data.get('address') or {}
-    # Address line
-    house = a.get('house_number')
-    road = _first_nonempty(a.get('road'), a.get('pedestrian'), a.get('footway'), a.get('path'))
-    addr_line = _fmt_nonempty([house, road])
-
-    # City
-    city = _first_nonempty(a.get('city'), a.get('town'), a.get('village'), a.get('hamlet'),
-                           a.get('municipality'), a.get('suburb'))
-
-    # ZIP
-    zipc = a.get('postcode')
-
-    country = a.get('country')
-
-    top = addr_line or ''
-    city_zip = _fmt_nonempty([city, zipc]) if (city or zipc) else ''
-    bottom = _fmt_nonempty([city_zip, country], sep=', ')
-    text = (top + '\n' + bottom).strip()
-    return text if text else None
-
-# ---------- Geocoding (Apple first, OSM fallback) ----------
-def reverse_geocode_compact(lat, lon):
-    """Return compact two-line address string or None. Cached by rounded coords."""
-    key = (round(lat, 5), round(lon, 5))
-    if key in _geocode_cache:
-        return _geocode_cache[key]
-    # Apple
-    try:
-        arr = location.reverse_geocode({'latitude': lat, 'longitude': lon})
-        if arr:
-            txt = _format_compact_apple(arr[0]) or None
-            if txt:
-                _geocode_cache[key] = txt
-                return txt
-    except Exception:
-        pass
-    # OSM fallback
-    try:
-        url = "https://nominatim.openstreetmap.org/reverse"
-        headers = {'User-Agent': 'MapSnapshotStudio/1.0 (contact: you@example.com)'}
-        params = {'format': 'json', 'lat': lat, 'lon': lon, 'zoom': 18, 'addressdetails': 1}
-        r = requests.get(url, headers=headers, params=params, timeout=6)
-        if r.ok:
-            data = r.json()
-            txt = _format_compact_osm(data)
-            if txt:
-                _geocode_cache[key] = txt
-                return txt
-    except Exception:
-        pass
-    return None
-
-# ---------- Snapshot (with cache) ----------
-def get_snapshot(lat, lon, meters, map_type, img_w):
-    global _last_snap_key, _last_snap_img, _last_rot_src, _last_rot_deg, _last_rot_img
-    key = (round(lat, 5), round(lon, 5), int(meters), map_type, int(img_w))
-    if key == _last_snap_key and _last_snap_img is not None:
-        return _last_snap_img
-    snap = location.render_map_snapshot(
-        lat, lon,
-        width=int(meters), height=int(meters),
-        map_type=map_type,
-        img_width=int(img_w), img_height=int(img_w)
-    )
-    _last_snap_key, _last_snap_img = key, snap
-    _last_rot_src = None; _last_rot_deg = None; _last_rot_img = None
-    return snap
+ATLAS_DOCUMENT_TYPES = ['public.comma-separated-values-text', 'public.json', 'public.data']
+
+def _alert(title, message):
+    import dialogs
+    dialogs.alert(title, message, 'OK', hide_cancel_button=True)
 
 # ---------- App ----------
 class MapStudio(ui.View):
@@ -372,8 +47,25 @@ class MapStudio(ui.View):
         self.rotation = 0.0
         self.quality_index = 1  # default to High
         self.last_render_image = None
-        self.last_tempfile = None
+        self.last_render_chip = None   # (chip layer, rect) shown over last_render_image; flattened on export
+        self.export_format = EXPORT_FORMATS[0][0]
+        self.exporter = BackgroundExporter()
         self.current_map_type = MAP_TYPES[1]
+        self.progressive = PROGRESSIVE_RENDER
+        self.prefetch = PREFETCH_ENABLED
+        self.debug_overlay = DEBUG_OVERLAY
+        if self.debug_overlay:
+            metrics.enabled = True
+        self.last_render_timings = {}   # {'first_image_s', 'final_image_s', 'proxy_px', 'final_px'}
+        self.scheduler = RenderScheduler()
+        self._full_job = None          # full render whose final image is not shown yet; previews wait for it
+        self._latest_full = None       # newest full render; its address may land after a preview
+        self._preview_waiting = False
+        self._preview_shown = False    # the view shows a slider preview, not last_render_image
+        self._sweeping = False         # sweep export thread running
+        self.location_warm = LOCATION_KEEP_WARM
+        if self.location_warm:
+            _location.keep_warm(True)
         self._build()
         self._layout()
 
@@ -394,6 +86,10 @@ class MapStudio(ui.View):
         self.quality_seg.selected_index = self.quality_index
         self.quality_seg.action = self.on_quality
 
+        self.format_seg = ui.SegmentedControl(segments=[f[0] for f in EXPORT_FORMATS])
+        self.format_seg.selected_index = 0
+        self.format_seg.action = self.on_format
+
         self.m_slider = ui.Slider(action=self.on_cov)
         self.m_slider.value = meters_to_cov_slider(self.meters)
         self.m_label = ui.Label(text=f'Coverage: {meters_label(self.meters)} × {meters_label(self.meters)}', alignment=1)
@@ -409,6 +105,11 @@ class MapStudio(ui.View):
         self.render_btn.background_color = '#0a84ff'; self.render_btn.tint_color = 'white'
         self.render_btn.corner_radius = 8
 
+        self.atlas_btn = ui.Button(title='Atlas…', action=self.on_atlas)
+        self.atlas_btn.font = ('<System-Bold>',17); self.atlas_btn.corner_radius = 8
+        self.atlas_btn.border_width = 1; self.atlas_btn.border_color = '#0a84ff'
+        self.atlas_btn.tint_color = '#0a84ff'
+
         self.save_btn = ui.Button(title='Save to Photos', action=self.on_save)
         self.save_btn.enabled = False; self.save_btn.corner_radius = 8
         self.save_btn.border_width = 1; self.save_btn.border_color = '#0a84ff'
@@ -419,6 +120,11 @@ class MapStudio(ui.View):
         self.share_btn.border_width = 1; self.share_btn.border_color = '#34c759'
         self.share_btn.tint_color = '#34c759'
 
+        self.sweep_btn = ui.Button(title='Sweep 360°', action=self.on_sweep)
+        self.sweep_btn.enabled = False; self.sweep_btn.corner_radius = 8
+        self.sweep_btn.border_width = 1; self.sweep_btn.border_color = '#af52de'
+        self.sweep_btn.tint_color = '#af52de'
+
         self.preview_hint = ui.Label(text='Pinch, pan, and double-tap the preview to inspect every pixel.', alignment=1)
         self.preview_hint.font = ('<System>',12)
         self.preview_hint.text_color = '#888'
@@ -426,9 +132,19 @@ class MapStudio(ui.View):
         self.imgv = ui.ImageView(content_mode=ui.CONTENT_SCALE_ASPECT_FIT)
         self.imgv.bg_color = (0.97,0.97,0.97)
 
-        for v in (self.loc_btn,self.coord_lbl,self.type_seg,self.quality_lbl,self.quality_seg,
-                  self.m_slider,self.m_label,self.rot_slider,self.rot_label,self.render_btn,
-                  self.save_btn,self.share_btn,self.preview_hint,self.imgv):
+        # The address chip sits in its own view over the image: showing it costs no full-size copy
+        self.chip_view = ui.ImageView(hidden=True)
+        self._chip_rect = None
+        self.imgv.add_subview(self.chip_view)
+
+        self.debug_lbl = ui.Label(number_of_lines=0, alignment=0)
+        self.debug_lbl.font = ('Menlo',10); self.debug_lbl.text_color = 'white'
+        self.debug_lbl.bg_color = (0,0,0,0.55); self.debug_lbl.hidden = not self.debug_overlay
+        self.imgv.add_subview(self.debug_lbl)
+
+        for v in (self.loc_btn,self.coord_lbl,self.type_seg,self.quality_lbl,self.quality_seg,self.format_seg,
+                  self.m_slider,self.m_label,self.rot_slider,self.rot_label,self.render_btn,self.atlas_btn,
+                  self.save_btn,self.share_btn,self.sweep_btn,self.preview_hint,self.imgv):
             self.add_subview(v); v.flex = 'W'
 
         self._update_quality_label()
@@ -440,21 +156,37 @@ class MapStudio(ui.View):
         self.type_seg.frame = (pad,y,self.width-2*pad,32); y+=40
         self.quality_lbl.frame = (pad,y,self.width-2*pad,20); y+=24
         self.quality_seg.frame = (pad,y,self.width-2*pad,32); y+=40
+        self.format_seg.frame = (pad,y,self.width-2*pad,28); y+=36
         self.m_slider.frame = (pad,y,self.width-2*pad,24); y+=28
         self.m_label.frame = (pad,y,self.width-2*pad,20); y+=28
         self.rot_slider.frame = (pad,y,self.width-2*pad,24); y+=28
         self.rot_label.frame = (pad,y,self.width-2*pad,20); y+=28
-        self.render_btn.frame = (pad,y,self.width-2*pad,40); y+=48
-        self.save_btn.frame = (pad,y,(self.width-2*pad-8)//2,36)
-        self.share_btn.frame = (self.save_btn.x+self.save_btn.width+8,y,self.save_btn.width,36); y+=44
+        self.render_btn.frame = (pad,y,(self.width-2*pad-8)*2//3,40)
+        self.atlas_btn.frame = (self.render_btn.x+self.render_btn.width+8,y,self.width-2*pad-8-self.render_btn.width,40); y+=48
+        self.save_btn.frame = (pad,y,(self.width-2*pad-16)//3,36)
+        self.share_btn.frame = (self.save_btn.x+self.save_btn.width+8,y,self.save_btn.width,36)
+        self.sweep_btn.frame = (self.share_btn.x+self.share_btn.width+8,y,self.save_btn.width,36); y+=44
         self.preview_hint.frame = (pad,y,self.width-2*pad,18); y+=24
         size = self.width-2*pad
         self.imgv.frame = (pad,y,size,min(size,self.height-y-pad))
+        self.debug_lbl.frame = (0,0,self.imgv.width,14*(len(DEBUG_STAGES)+2))
+        self._place_chip()
 
     def layout(self): self._layout()
 
+    def will_close(self):
+        if self.location_warm:
+            _location.keep_warm(False)
+        if TRACE_ON_CLOSE and metrics.enabled:
+            try:
+                export_trace()
+            except OSError:
+                pass
+
     # ---------- Actions ----------
+    @ui.in_background
     def on_pick(self, s):
+        self.coord_lbl.text = 'Locating…'
         loc = request_location()
         if loc:
             self.latlon = loc
@@ -473,95 +205,324 @@ class MapStudio(ui.View):
         self.quality_index = self.quality_seg.selected_index
         self._update_quality_label()
 
+    def on_format(self, s):
+        self.export_format = EXPORT_FORMATS[self.format_seg.selected_index][0]
+        if self.last_render_image is not None:
+            self._prepare_export()
+
     def on_cov(self, s):
         self.meters = cov_slider_to_meters(s.value)
         self.m_label.text = f'Coverage: {meters_label(self.meters)} × {meters_label(self.meters)}'
+        self._request_preview()
 
     def on_rot(self, s):
         self.rotation = rot_slider_to_degrees(s.value)
         self.rot_label.text = f'Rotation: {self.rotation:.0f}°'
+        self._request_preview()
+
+    def _request_preview(self):
+        """Debounced proxy re-render for the current slider values (trailing edge).
+
+        A preview never supersedes a full render before its final image is shown; it runs
+        right after. The address lookup that follows does not hold it up.
+        """
+        if self._full_job is not None and self.scheduler.is_current(self._full_job):
+            self._preview_waiting = True
+            return
+        if self.progressive and self.latlon and self.imgv.image is not None:
+            _prefetcher.cancel()
+            self.scheduler.submit(self._preview_job, *self._view_params(PROXY_SIZE), delay=SLIDER_DEBOUNCE)
+
+    def _prepare_export(self):
+        self.exporter.prepare(self.last_render_image, self.export_format, layer=self.last_render_chip)
 
     def _encode_temp(self, img):
+        layer = self.last_render_chip if img is self.last_render_image else None
         try:
-            if self.last_tempfile and os.path.exists(self.last_tempfile):
-                try: os.remove(self.last_tempfile)
-                except Exception: pass
-            data = img.to_png()
-            tmp = tempfile.NamedTemporaryFile(delete=False, suffix='.png')
-            tmp.write(data); tmp.flush(); tmp.close()
-            self.last_tempfile = tmp.name
-            return tmp.name
+            with span('export.wait', self.export_format):
+                return self.exporter.path(img, self.export_format, layer=layer)
         except Exception as e:
-            dialogs.alert('Temp File Error', str(e), 'OK', hide_cancel_button=True)
+            _alert('Temp File Error', str(e))
             return None
 
     def _set_busy(self, busy=True):
-        for v in (self.loc_btn, self.type_seg, self.quality_seg, self.m_slider, self.rot_slider,
-                  self.render_btn, self.save_btn, self.share_btn):
+        # Sliders and segments stay live: the scheduler supersedes in-flight work instead.
+        for v in (self.loc_btn, self.save_btn, self.share_btn, self.sweep_btn):
             v.enabled = not busy
         self.render_btn.title = 'Rendering...' if busy else 'Render Snapshot'
+        if not busy:
+            ready = self.last_render_image is not None
+            self.save_btn.enabled = self.share_btn.enabled = ready and not self._preview_shown
+            self.sweep_btn.enabled = ready and not self._sweeping
+
+    def _render_view(self, lat, lon, meters, map_type, rotation, img_w):
+        """Snapshot -> rotate -> static overlays at img_w; returns (snap_key, snap, composite)."""
+        with span('render', 'proxy' if img_w == PROXY_SIZE else 'full', px=img_w):
+            snap_key = snapshot_key(lat, lon, meters, map_type, img_w)
+            snap = get_snapshot(lat, lon, meters, map_type, img_w)
+            rotated = rotate_image_fill_square(snap, rotation, cache_key=snap_key)
+            img = compose_overlays(rotated, meters, map_type, lat, lon,
+                                   rotation_deg=rotation, cache_key=snap_key)
+        return snap_key, snap, img
+
+    def _update_debug_overlay(self):
+        if not self.debug_overlay:
+            return
+        snap = metrics.snapshot()['sources'].get('caches', {})
+        hits = '  '.join(f'{k[:4]} {snap[k]["hit_rate"]:.0%}' for k in ('snapshot', 'rotation', 'composite')
+                         if k in snap)
+        lines = [f'{"stage":<16}{"last":>7}{"p50":>7}{"p95":>7}'] + metrics.report_lines(DEBUG_STAGES) + [hits]
+        self.debug_lbl.text = '\n'.join(lines)
 
-    def _compose_image(self, snap_img, addr_text=None):
+    def _view_params(self, img_w):
         lat, lon = self.latlon
-        rotated = rotate_image_fill_square(snap_img, self.rotation)
-        return draw_overlays(rotated, int(self.meters), self.current_map_type, lat, lon,
-                             rotation_deg=self.rotation, full_addr=addr_text)
+        return lat, lon, int(self.meters), self.current_map_type, self.rotation, img_w
 
     @ui.in_background
     def on_render(self, s):
         if not self.latlon:
-            dialogs.alert('Location Needed','Tap “Use My Location” first.','OK',hide_cancel_button=True)
+            _alert('Location Needed', 'Tap “Use My Location” first.')
             return
         self._set_busy(True)
-        self.last_render_image = None
-        self.last_tempfile = None
-        lat, lon = self.latlon
-        meters = int(self.meters)
+        _prefetcher.cancel()
         img_w = QUALITY_PRESETS[self.quality_index][1]
+        self._full_job = self._latest_full = self.scheduler.submit(self._render_job, *self._view_params(img_w))
+
+    def _release_preview_gate(self, job):
+        if job is self._full_job:
+            self._full_job = None
+            if self._preview_waiting:
+                self._preview_waiting = False
+                self._request_preview()
 
-        # 1) Show map quickly without address
+    def _finish_job(self, job):
+        def _done():
+            self._set_busy(False)
+            self._update_debug_overlay()
+            self._release_preview_gate(job)
+        self.scheduler.apply(job, _done)
+
+    def _show_image(self, img):
+        self.imgv.image = img
+        self.chip_view.hidden = True
+
+    def _show_chip(self, layer):
+        self.chip_view.image, self._chip_rect = layer
+        self.chip_view.hidden = False
+        self._place_chip()
+
+    def _place_chip(self):
+        """Lay the chip view over its rect of the aspect-fit image."""
+        img = self.imgv.image
+        if self.chip_view.hidden or img is None:
+            return
+        w, h = img.size
+        k = min(self.imgv.width / w, self.imgv.height / h)
+        ox, oy = (self.imgv.width - w * k) / 2, (self.imgv.height - h * k) / 2
+        x, y, cw, ch = self._chip_rect
+        self.chip_view.frame = (ox + x * k, oy + y * k, cw * k, ch * k)
+
+    def _preview_job(self, job, lat, lon, meters, map_type, rotation, img_w):
+        def _apply():
+            self._show_image(img)
+            self._preview_shown = True   # Save / Share would export the last render, not this
+            self.save_btn.enabled = self.share_btn.enabled = False
         try:
-            snap = get_snapshot(lat, lon, meters, self.current_map_type, img_w)
-            quick_img = self._compose_image(snap, addr_text=None)
-            self.imgv.image = quick_img
-            self.last_render_image = quick_img
-            self.save_btn.enabled = True
-            self.share_btn.enabled = True
+            _, _, img = self._render_view(lat, lon, meters, map_type, rotation, img_w)
+            job.check()
+            self.scheduler.apply(job, _apply)
+        finally:
+            self._finish_job(job)
+
+    def _render_job(self, job, lat, lon, meters, map_type, rotation, img_w):
+        t0 = time.perf_counter()
+        timings = {'final_px': img_w}
+
+        def _clear():
+            # Here rather than in on_render: only a current job may touch last_render_image.
+            self.last_render_image = self.last_render_chip = None
+            self.exporter.invalidate()
+        self.scheduler.apply(job, _clear)
+
+        def _show(img, final=False):
+            def _apply():
+                self._show_image(img)
+                self._preview_shown = False
+                if final:
+                    self.last_render_image = img
+                    self.last_render_timings = timings
+                    self._prepare_export()
+                    self._release_preview_gate(job)
+            self.scheduler.apply(job, _apply)
+
+        # 1) Show map quickly without address: proxy first, then the quality preset
+        try:
+            if self.progressive and img_w > PROXY_SIZE:
+                _, _, proxy_img = self._render_view(lat, lon, meters, map_type, rotation, PROXY_SIZE)
+                job.check()
+                _show(proxy_img)
+                timings['proxy_px'] = PROXY_SIZE
+                timings['first_image_s'] = time.perf_counter() - t0
+            _, _, quick_img = self._render_view(lat, lon, meters, map_type, rotation, img_w)
+            job.check()
+            _show(quick_img, final=True)
+            timings['final_image_s'] = time.perf_counter() - t0
+            timings.setdefault('first_image_s', timings['final_image_s'])
+            if self.prefetch:
+                sizes = (PROXY_SIZE, img_w) if self.progressive else (img_w,)
+                views = neighbor_views(lat, lon, meters, map_type, sizes)
+                self.scheduler.apply(job, lambda: _prefetcher.schedule(views))
+        except RenderCancelled:
+            self._finish_job(job)
+            raise
         except Exception as e:
-            self._set_busy(False)
-            dialogs.alert('Render Failed', str(e), 'OK', hide_cancel_button=True)
+            self._finish_job(job)
+            if self.scheduler.is_current(job):
+                _alert('Render Failed', str(e))
             return
 
-        # 2) Fetch compact address on a worker thread; then redraw bubble only
+        # 2) Fetch compact address on a worker thread (so the next render isn't blocked
+        #    behind a slow lookup). A slider preview may supersede this job meanwhile: the
+        #    chip still goes with last_render_image, and on screen unless a preview covers it.
         def _addr_worker():
-            addr = reverse_geocode_compact(lat, lon)
-            if addr:
-                img = self._compose_image(snap, addr_text=addr)
-                def _apply():
-                    self.imgv.image = img
-                    self.last_render_image = img
-                ui.delay(_apply, 0.0)
-            ui.delay(lambda: self._set_busy(False), 0.0)
+            def _apply():
+                if self.last_render_image is quick_img:   # no newer render since
+                    self.last_render_chip = layer
+                    self._prepare_export()
+                if self.imgv.image is quick_img:
+                    self._show_chip(layer)
+            try:
+                if self._latest_full is not job:
+                    return
+                addr = reverse_geocode_compact(lat, lon)
+                if addr and self._latest_full is job:
+                    layer = address_chip_layer(*quick_img.size, addr)
+                    self.scheduler.dispatch(_apply)
+            finally:
+                self._finish_job(job)
 
         threading.Thread(target=_addr_worker, daemon=True).start()
 
+    def _export_target(self):
+        """The image Save / Share export: never a slider preview of unrendered settings."""
+        return None if self._preview_shown else (self.last_render_image or self.imgv.image)
+
+    @ui.in_background
     def on_save(self, s):
-        target_img = self.last_render_image or self.imgv.image
+        target_img = self._export_target()
         if not target_img:
-            dialogs.alert('Nothing to Save','Render a snapshot first.','OK',hide_cancel_button=True); return
-        path = self.last_tempfile or self._encode_temp(target_img)
+            _alert('Nothing to Save', 'Render a snapshot first.'); return
+        path = self._encode_temp(target_img)
         if path:
-            photos.create_image_asset(path)
-            dialogs.alert('Saved','Image saved to Photos.','OK',hide_cancel_button=True)
+            import photos
+            try:
+                photos.create_image_asset(path)
+            except Exception as e:
+                _alert('Save Failed', str(e)); return
+            _alert('Saved', 'Image saved to Photos.')
 
+    @ui.in_background
     def on_share(self, s):
-        target_img = self.last_render_image or self.imgv.image
-        path = self.last_tempfile or (self._encode_temp(target_img) if target_img else None)
-        if path: console.quicklook(path)
-        else: dialogs.alert('Nothing to Share','Render a snapshot first.','OK',hide_cancel_button=True)
+        target_img = self._export_target()
+        path = self._encode_temp(target_img) if target_img else None
+        if path:
+            import console
+            console.quicklook(path)
+        else:
+            _alert('Nothing to Share', 'Render a snapshot first.')
+
+    def on_sweep(self, s):
+        """Export the current view as a 360° rotating APNG and open it in Quick Look.
+
+        Runs on its own thread: a long export must not hold up Render / Save / Share, which
+        share the ui.in_background queue.
+        """
+        if self._sweeping:
+            return
+        params = self._view_params(QUALITY_PRESETS[self.quality_index][1]) if self.latlon else None
+        self._sweeping = True
+        self.sweep_btn.enabled = False
+        threading.Thread(target=self._export_sweep, args=(params,), daemon=True).start()
+
+    def _export_sweep(self, params):
+        try:
+            self._run_sweep(params)
+        finally:
+            self._sweeping = False
+            self.sweep_btn.title = 'Sweep 360°'
+            self.sweep_btn.enabled = self.last_render_image is not None
+
+    def _run_sweep(self, params):
+        if params is None or self.last_render_image is None:
+            _alert('Nothing to Sweep', 'Render a snapshot first.'); return
+        lat, lon, meters, map_type, rotation, img_w = params
+        import tempfile
+        fd, path = tempfile.mkstemp(suffix='.png')
+        os.close(fd)
+        def _progress(done, total):
+            self.sweep_btn.title = f'{done}/{total}'
+        try:
+            st = export_rotation_sweep(lat, lon, meters, map_type, img_w, path,
+                                       addr_text=reverse_geocode_compact(lat, lon), start_deg=rotation,
+                                       progress=_progress)
+        except Exception as e:
+            _remove_export_file(path)
+            _alert('Sweep Failed', str(e)); return
+        import console, dialogs
+        dialogs.hud_alert(f"{st['frames']} frames, {st['frames_per_s']:.1f} frames/s")
+        console.quicklook(path)
+
+    def on_atlas(self, s):
+        """Render every site of a picked CSV / GeoJSON list into a paged PDF contact sheet.
+
+        The picker and the export run on a dedicated thread, like the sweep, so renders,
+        saves and shares can go ahead meanwhile.
+        """
+        self.atlas_btn.enabled = False
+        args = (self.meters, self.current_map_type, QUALITY_PRESETS[self.quality_index][1])
+        threading.Thread(target=self._export_atlas, args=args, daemon=True).start()
+
+    def _export_atlas(self, meters, map_type, img_w):
+        try:
+            self._run_atlas(meters, map_type, img_w)
+        finally:
+            self.atlas_btn.title = 'Atlas…'
+            self.atlas_btn.enabled = True
+
+    def _run_atlas(self, meters, map_type, img_w):
+        import dialogs
+        src = dialogs.pick_document(types=ATLAS_DOCUMENT_TYPES)
+        if not src:
+            return
+        try:
+            sites = load_sites(src, meters, map_type)
+        except (OSError, ValueError) as e:
+            _alert('Atlas Failed', str(e)); return
+        import tempfile
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
+        def _progress(done, total):
+            self.atlas_btn.title = f'{done}/{total}'
+        try:
+            st = export_atlas(sites, path, img_w, title=os.path.basename(src), progress=_progress)
+        except Exception as e:
+            _remove_export_file(path)
+            _alert('Atlas Failed', str(e)); return
+        lat = st['latency']
+        msg = (f"{st['rendered']} of {st['sites']} sites on {st['pages']} page(s) in {st['seconds']:.1f} s "
+               f"({st['sites_per_s']:.2f} sites/s)")
+        if lat['n']:
+            msg += f"\nPer site p50 {lat['p50'] * 1000:.0f} ms, p95 {lat['p95'] * 1000:.0f} ms"
+        msg += f"\n{st['geocode']['lookups']} address lookups for {st['sites']} sites"
+        if st['failed']:
+            msg += '\nFailed: ' + ', '.join(name for _, name, _ in st['failed'][:5])
+        _alert('Atlas Ready', msg)
+        import console
+        console.quicklook(path)
 
 def main():
     MapStudio().present('fullscreen', hide_title_bar=False)
+    threading.Thread(target=preload, daemon=True).start()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()